@@ -0,0 +1,132 @@
+# bench_browser_startup.py
+# Bandingkan mode cold (launch Chromium per job) dengan mode warm (browser_service +
+# connect_over_cdp): waktu startup browser dan latensi per halaman.
+#
+#   python benchmarks/bench_browser_startup.py [--jobs 10] [--url http://127.0.0.1:8000/]
+#
+# Tanpa --url, halaman uji disajikan dari server HTTP lokal.
+
+import argparse
+import http.server
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from playwright.sync_api import sync_playwright
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dynamic_scrapper import BROWSER_ARGS  # noqa: E402
+from browser_service import lease_browser, release_browser, service_stats  # noqa: E402
+
+TEST_PAGE = ("<html><body><div class='DailyContent'>"
+             + "".join(f"<p>Hari {i}: 30 °C, Berawan, 40%</p>" for i in range(50))
+             + "</div></body></html>").encode('utf-8')
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.end_headers()
+        self.wfile.write(TEST_PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve_test_page():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def _visit(browser, url):
+    start = time.perf_counter()
+    context = browser.new_context()
+    page = context.new_page()
+    page.goto(url, wait_until='domcontentloaded')
+    page.locator('body').inner_text()
+    context.close()
+    return time.perf_counter() - start
+
+
+def run_cold(p, url, jobs):
+    startup, latency = [], []
+    for _ in range(jobs):
+        start = time.perf_counter()
+        browser = p.chromium.launch(headless=True, channel="chrome", args=BROWSER_ARGS)
+        startup.append(time.perf_counter() - start)
+        latency.append(_visit(browser, url))
+        browser.close()
+    return startup, latency
+
+
+def run_warm(p, url, jobs, address):
+    startup, latency = [], []
+    for _ in range(jobs):
+        start = time.perf_counter()
+        lease = lease_browser(address)
+        browser = p.chromium.connect_over_cdp(lease['endpoint'])
+        startup.append(time.perf_counter() - start)
+        latency.append(_visit(browser, url))
+        browser.close()
+        release_browser(lease)
+    return startup, latency
+
+
+def _summary(values):
+    return {
+        'mean_s': round(statistics.mean(values), 4),
+        'median_s': round(statistics.median(values), 4),
+        'max_s': round(max(values), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold launch vs browser_service (warm)")
+    parser.add_argument('--jobs', type=int, default=10)
+    parser.add_argument('--url', default=None)
+    parser.add_argument('--address', default="127.0.0.1:8765")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server, url = _serve_test_page()
+
+    service = subprocess.Popen([sys.executable, os.path.join(ROOT, 'browser_service.py'), '--address', args.address],
+                               cwd=ROOT)
+    try:
+        # Tunggu service siap
+        for _ in range(100):
+            try:
+                service_stats(args.address)
+                break
+            except OSError:
+                time.sleep(0.2)
+
+        with sync_playwright() as p:
+            cold_startup, cold_latency = run_cold(p, url, args.jobs)
+            warm_startup, warm_latency = run_warm(p, url, args.jobs, args.address)
+    finally:
+        service.terminate()
+        service.wait(timeout=30)
+        if server:
+            server.shutdown()
+
+    result = {
+        'jobs': args.jobs,
+        'cold': {'startup': _summary(cold_startup), 'page': _summary(cold_latency)},
+        'warm': {'startup': _summary(warm_startup), 'page': _summary(warm_latency)},
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# bench_normalize.py
+# Benchmark normalisasi numerik pada frame sintetis 1 juta baris.
+#
+#   python benchmarks/bench_normalize.py [--rows 1000000] [--baseline-rows 100000]
+
+import argparse
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from normalize import normalize_frame  # noqa: E402
+
+DATE_LABELS = ['Sel, 02 Des', 'Rab, 03 Des', 'Kam, 04 Des', 'Wed 03', 'Thu 04', 'Dec 1', 'Nov 27', '02 Jan']
+TEMPS = [f"{t} °C" for t in range(20, 36)] + [f"{t}°" for t in range(70, 96)]
+PRECIPS = [f"{a}–{a + 15}%" for a in range(0, 85, 5)] + [f"{a}%" for a in range(0, 100, 7)] + ['N/A']
+WINDS = [f"{s} km/h {d}" for s in range(0, 40, 3) for d in ('N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW')] + ['N/A']
+
+
+def synthetic_daily_frame(rows, seed=42):
+    rng = np.random.default_rng(seed)
+    pick = lambda values: np.asarray(values, dtype=object)[rng.integers(0, len(values), rows)]
+    return pd.DataFrame({
+        'date_day': pick(DATE_LABELS),
+        'high_temp': pick(TEMPS),
+        'low_temp': pick(TEMPS),
+        'precipitation_chance': pick(PRECIPS),
+        'wind_speed': pick(WINDS),
+        'scrape_time': pd.Timestamp('2025-12-02 00:05'),
+    })
+
+
+_TEMP = re.compile(r'(-?\d+(?:\.\d+)?)\s*°?\s*([CF])?')
+
+
+def baseline_per_row(df):
+    """Pendekatan lama: regex per baris di loop Python (hanya suhu & presipitasi)."""
+    out_temp, out_precip = [], []
+    for high, precip in zip(df['high_temp'], df['precipitation_chance']):
+        m = _TEMP.search(high)
+        if m:
+            value = float(m.group(1))
+            out_temp.append((value - 32) * 5 / 9 if (m.group(2) == 'F' or (not m.group(2) and value > 50)) else value)
+        else:
+            out_temp.append(np.nan)
+        nums = re.findall(r'\d+', precip)
+        out_precip.append(int(nums[-1]) / 100 if nums else np.nan)
+    return out_temp, out_precip
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark normalize.normalize_frame pada frame sintetis")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--baseline-rows', type=int, default=100_000)
+    args = parser.parse_args()
+
+    df = synthetic_daily_frame(args.rows)
+    start = time.perf_counter()
+    result = normalize_frame('daily', df)
+    elapsed = time.perf_counter() - start
+    print(f"normalize_frame('daily'): {args.rows:,} baris dalam {elapsed:.2f}s "
+          f"({args.rows / elapsed:,.0f} baris/s)")
+    print(result[['high_temp', 'high_temp_c', 'precip_min', 'precip_max', 'wind_kmh', 'wind_dir_deg', 'target_date']].head())
+
+    if args.baseline_rows:
+        sample = df.head(args.baseline_rows)
+        start = time.perf_counter()
+        baseline_per_row(sample)
+        base_elapsed = time.perf_counter() - start
+        rate = args.baseline_rows / base_elapsed
+        print(f"baseline per-baris (2 kolom saja): {args.baseline_rows:,} baris dalam {base_elapsed:.2f}s "
+              f"({rate:,.0f} baris/s, estimasi {args.rows / rate:.1f}s untuk {args.rows:,} baris)")
+
+
+if __name__ == "__main__":
+    main()
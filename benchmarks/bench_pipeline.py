@@ -0,0 +1,293 @@
+# bench_pipeline.py
+# Benchmark offline pipeline scrape -> ekstraksi -> simpan dengan fixture rekaman.
+#
+# Fixture HTML (benchmarks/fixtures/*.html) disajikan server HTTP lokal, dan client
+# Gemini diganti stub deterministik yang mengembalikan JSON rekaman (fixtures/*.json).
+# Setiap tahap diukur terpisah, hasil ditulis ke JSON agar bisa dibandingkan antar commit.
+#
+#   python benchmarks/bench_pipeline.py [--scales 1,10,100] [--browser] [--llm-latency-ms 0]
+#                                       [--output hasil.json] [--compare baseline.json]
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+sys.path.insert(0, REPO_DIR)
+
+os.environ.setdefault("GEMINI_API_KEY", "bench-stub")  # client asli tidak pernah dipanggil
+
+import bmkg_scraper  # noqa: E402
+from dynamic_scrapper import AIScraperContext, UniversalScraperV27, COMBINED_SELECTOR, MODEL_NAME  # noqa: E402
+from extraction_broker import ExtractionBroker  # noqa: E402
+from scraper_config import schema_adapter  # noqa: E402
+from http_fetcher import TieredFetcher, html_to_texts  # noqa: E402
+from site_adapters import bmkg_adapter  # noqa: E402
+
+# path URL lokal -> nama fixture
+FIXTURES = {
+    'weathercom': 'weathercom_today',
+    'bmkg': 'bmkg_62',
+}
+STAGES = ['browser_launch', 'navigate', 'page_text', 'clean_text', 'build_prompt', 'llm',
+          'validate', 'save_results', 'bmkg_scraper', 'bmkg_adapter']
+_URL_RE = re.compile(r"--- URL Target ---\n(\S+)")
+
+
+def _load_fixtures():
+    fixtures = {}
+    for kind, name in FIXTURES.items():
+        with open(os.path.join(FIXTURES_DIR, f"{name}.html"), 'rb') as f:
+            html = f.read()
+        with open(os.path.join(FIXTURES_DIR, f"{name}.json"), 'r', encoding='utf-8') as f:
+            fixtures[kind] = (html, json.load(f))
+    return fixtures
+
+
+def _kind_of(url):
+    return 'bmkg' if '/bmkg/' in url else 'weathercom'
+
+
+def start_fixture_server(fixtures):
+    """Server HTTP lokal: /weathercom/<n> dan /bmkg/<n> menyajikan fixture HTML."""
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, sama seperti server asli
+
+        def do_GET(self):
+            kind = self.path.strip('/').split('/', 1)[0]
+            if kind not in fixtures:
+                self.send_error(404)
+                return
+            body = fixtures[kind][0]
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+class _StubResponse:
+    def __init__(self, text):
+        self.text = text
+        self.usage_metadata = None
+
+
+class StubGeminiClient:
+    """Pengganti genai.Client: respons JSON rekaman, lokasi diberi label per URL agar data tiap URL unik."""
+
+    def __init__(self, fixtures, latency_s=0.0):
+        self.models = self
+        self._fixtures = fixtures
+        self.latency_s = latency_s
+        self.calls = 0
+
+    def generate_content(self, model, contents, config=None):
+        self.calls += 1
+        match = _URL_RE.search(contents)
+        url = match.group(1) if match else ""
+        data = json.loads(json.dumps(self._fixtures[_kind_of(url)][1]))
+        data['source_url'] = url
+        tag = url.rstrip('/').rsplit('/', 1)[-1]
+        for loc in data['all_locations_forecast']:
+            loc['location_name'] = f"{loc['location_name']} #{tag}"
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return _StubResponse(json.dumps(data, ensure_ascii=False))
+
+
+def make_scraper(stub, store_root, concurrency):
+    context = AIScraperContext()
+    context.cache_path = None          # ukur LLM (stub) setiap kali, bukan cache
+    context.fetch_state_file = None    # tanpa validator ETag / tier tersimpan
+    context.domain_health_file = None  # tanpa circuit breaker per domain
+    context.template_file = None       # tanpa template induksi: semua halaman lewat LLM (stub)
+    context.store_root = store_root
+    scraper = UniversalScraperV27(context)
+    scraper.client = stub
+    scraper.broker = ExtractionBroker(stub, MODEL_NAME, rpm=None, tpm=None, max_in_flight=concurrency)
+    return scraper
+
+
+def _timed(timings, stage, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    timings.setdefault(stage, []).append(time.perf_counter() - start)
+    return result
+
+
+def run_stages(scraper, urls, use_browser, timings):
+    """Jalankan tiap tahap pipeline secara eksplisit (berurutan) untuk setiap URL."""
+    fetcher = TieredFetcher(state_file=None)
+    TargetSchema = scraper.context.TargetSchema
+    browser = playwright = None
+    if use_browser:
+        from playwright.sync_api import sync_playwright
+        playwright = sync_playwright().start()
+        browser = _timed(timings, 'browser_launch', scraper._open_browser, playwright)[0]
+
+    try:
+        for url in urls:
+            if browser is not None:
+                context = browser.new_context()
+                page = context.new_page()
+                _timed(timings, 'navigate', page.goto, url, wait_until='domcontentloaded')
+                html = page.content()
+                context.close()
+            else:
+                html = _timed(timings, 'navigate', fetcher.fetch, url, conditional=False).html
+
+            region_texts, body_text = _timed(timings, 'page_text', html_to_texts, html, COMBINED_SELECTOR)
+            text = scraper._reduce_text(region_texts, body_text)
+            cleaned = _timed(timings, 'clean_text', scraper._clean_text, text)
+            prompt = _timed(timings, 'build_prompt', scraper._build_prompt, cleaned, url)
+            response_text = _timed(timings, 'llm', scraper.broker.generate, prompt, TargetSchema, len(prompt) // 4)
+            model = _timed(timings, 'validate', schema_adapter(TargetSchema).validate_json, response_text)
+            _timed(timings, 'save_results', scraper.save_results, [model], scraper.url_tag(url))
+
+            if _kind_of(url) == 'bmkg':
+                _timed(timings, 'bmkg_scraper', bmkg_scraper.scrape_bmkg_weather, url)
+                _timed(timings, 'bmkg_adapter', bmkg_adapter, html, "https://www.bmkg.go.id/cuaca/prakiraan-cuaca/62")
+    finally:
+        if browser is not None:
+            browser.close()
+            playwright.stop()
+        fetcher.close()
+
+
+def summarize(durations):
+    if not durations:
+        return None
+    ordered = sorted(durations)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        'n': len(ordered),
+        'total_s': round(sum(ordered), 6),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+        'p50_ms': round(pick(0.50) * 1000, 3),
+        'p95_ms': round(pick(0.95) * 1000, 3),
+    }
+
+
+def run_scale(base_url, fixtures, n_urls, args):
+    urls = [f"{base_url}/{'bmkg' if i % 2 else 'weathercom'}/{i}" for i in range(n_urls)]
+    stub = StubGeminiClient(fixtures, args.llm_latency_ms / 1000.0)
+    timings = {}
+    quiet = lambda: contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scraper = make_scraper(stub, os.path.join(tmp, "stages"), args.concurrency)
+        with quiet():
+            run_stages(scraper, urls, args.browser, timings)
+
+        # End-to-end lewat jalur publik scrape_many() (tier HTTP -> AI stub), tanpa simpan
+        scraper = make_scraper(stub, os.path.join(tmp, "e2e"), args.concurrency)
+        with quiet():
+            start = time.perf_counter()
+            results = scraper.scrape_many(urls, concurrency=args.concurrency)
+            e2e_s = time.perf_counter() - start
+
+    ok = sum(1 for r in results.values() if r)
+    return {
+        'urls': n_urls,
+        'stages': {stage: summarize(timings.get(stage, [])) for stage in STAGES if timings.get(stage)},
+        'scrape_many': {
+            'wall_s': round(e2e_s, 4),
+            'ok': ok,
+            'pages_per_min': round(n_urls / e2e_s * 60, 1) if e2e_s else None,
+        },
+        'llm_calls': stub.calls,
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current, baseline_path):
+    """Cetak rasio mean per tahap terhadap file hasil sebelumnya (>1.0 = lebih lambat)."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    base_runs = {run['urls']: run for run in baseline['runs']}
+    print(f"\nPerbandingan vs {baseline_path} ({baseline.get('git_revision')}):")
+    for run in current['runs']:
+        base = base_runs.get(run['urls'])
+        if not base:
+            continue
+        for stage, stats in run['stages'].items():
+            old = base['stages'].get(stage)
+            if old and old['mean_ms']:
+                ratio = stats['mean_ms'] / old['mean_ms']
+                flag = "  <-- REGRESI" if ratio > 1.2 else ""
+                print(f"  [{run['urls']:>3} URL] {stage:<15} {old['mean_ms']:>9.3f} -> {stats['mean_ms']:>9.3f} ms  x{ratio:.2f}{flag}")
+        old_wall, new_wall = base['scrape_many']['wall_s'], run['scrape_many']['wall_s']
+        print(f"  [{run['urls']:>3} URL] {'scrape_many':<15} {old_wall:>9.3f} -> {new_wall:>9.3f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline pipeline scrape -> ekstraksi -> simpan")
+    parser.add_argument('--scales', default="1,10,100", help="jumlah URL per run, dipisah koma")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--browser', action='store_true', help="ukur launch + navigasi Chromium (butuh browser terpasang)")
+    parser.add_argument('--llm-latency-ms', type=float, default=0.0, help="latensi buatan untuk stub Gemini")
+    parser.add_argument('--output', default=None, help="file JSON hasil (default: bench_pipeline_<rev>.json)")
+    parser.add_argument('--compare', default=None, help="file JSON hasil sebelumnya untuk dibandingkan")
+    parser.add_argument('--verbose', action='store_true', help="tampilkan log scraper")
+    args = parser.parse_args()
+
+    fixtures = _load_fixtures()
+    server, base_url = start_fixture_server(fixtures)
+    revision = _git_revision()
+    report = {
+        'benchmark': 'pipeline',
+        'git_revision': revision,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'settings': {'concurrency': args.concurrency, 'browser': args.browser, 'llm_latency_ms': args.llm_latency_ms},
+        'runs': [],
+    }
+    try:
+        for n_urls in (int(x) for x in args.scales.split(',') if x.strip()):
+            run = run_scale(base_url, fixtures, n_urls, args)
+            report['runs'].append(run)
+            print(f"\n== {n_urls} URL ==  scrape_many: {run['scrape_many']['wall_s']:.3f}s "
+                  f"({run['scrape_many']['ok']}/{n_urls} ok, {run['scrape_many']['pages_per_min']} halaman/menit)")
+            for stage, stats in run['stages'].items():
+                print(f"  {stage:<15} mean {stats['mean_ms']:>9.3f} ms   p95 {stats['p95_ms']:>9.3f} ms   total {stats['total_s']:.3f}s")
+    finally:
+        server.shutdown()
+
+    output = args.output or f"bench_pipeline_{revision}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nHasil disimpan ke {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# bench_query.py
+# Cek dan benchmark forecast_query.ForecastIndex pada file JSON hasil scrape di root repo
+# (Universal_V27_Monthly_*.json). Contoh di dokumentasi, latest('Sampit', 3), harus
+# mengembalikan 3 hari: 'Sampit' cocok lewat alias ke Kotawaringin Timur (BMKG) dan lewat
+# nama ternormalisasi ke 'Sampit (Hasan) Airport' (weather.com, tanggal target lain di
+# data ini). Exit 1 jika ada cek yang tidak sesuai.
+#
+#   python benchmarks/bench_query.py [--start 2025-12-02] [--queries 10000]
+
+import argparse
+import os
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from forecast_query import ForecastIndex  # noqa: E402
+
+# (nama query, hari, jumlah tanggal target yang diharapkan) untuk data scrape 2025-12-02
+CHECKS = [
+    ('Sampit', 3, 3),
+    ('Kotawaringin Timur', 3, 3),
+    ('Palangkaraya', 3, 3),   # 'Kota Palangkaraya'
+    ('Palangka', 3, 3),       # awalan
+    ('Lokasi Tidak Ada', 3, 0),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cek + benchmark lookup lokasi ForecastIndex")
+    parser.add_argument('--start', default='2025-12-02', help="tanggal awal latest() (tanggal data fixture)")
+    parser.add_argument('--queries', type=int, default=10000)
+    args = parser.parse_args()
+
+    index = ForecastIndex.load(store_root=os.path.join(REPO_DIR, "forecast_store"),
+                               json_glob=os.path.join(REPO_DIR, "Universal_V27_Monthly_*.json"), listen=False)
+    failed = 0
+    for name, days, expected in CHECKS:
+        rows = index.latest(name, days, start=args.start)
+        dates = sorted({str(row.get('target_date'))[:10] for row in rows})
+        ok = len(dates) == expected
+        failed += 0 if ok else 1
+        print(f"{'OK ' if ok else 'GAGAL'} latest({name!r}, {days}) -> {len(dates)} hari, {len(rows)} baris "
+              f"({', '.join(sorted({row.get('location_name') for row in rows})) or '-'})")
+
+    names = [name for name, _, _ in CHECKS]
+    start = time.perf_counter()
+    for i in range(args.queries):
+        index.latest(names[i % len(names)], 3, start=args.start)
+    elapsed = time.perf_counter() - start
+    print(f"\n{args.queries} query latest(): {elapsed * 1e6 / args.queries:.1f} us/query")
+
+    if failed:
+        print(f"GAGAL: {failed} cek lookup lokasi tidak sesuai")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
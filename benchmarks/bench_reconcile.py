@@ -0,0 +1,98 @@
+# bench_reconcile.py
+# Benchmark rekonsiliasi BMKG vs weather.com pada scrape nasional sintetis
+# (514 kabupaten/kota x 10 hari referensi, nama lokasi weather.com dengan variasi ejaan).
+#
+#   python benchmarks/bench_reconcile.py [--locations 514] [--days 10] [--runs 3]
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reconcile import LocationIndex, latest_per_key, reconcile  # noqa: E402
+
+PROVINCES = ['Kalimantan Tengah', 'Jawa Barat', 'Sumatera Utara', 'Sulawesi Selatan', 'Nusa Tenggara Timur',
+             'Kalimantan Timur', 'Jawa Timur', 'Papua Barat']
+ENGLISH = {'Kalimantan Tengah': 'Central Kalimantan', 'Jawa Barat': 'West Java', 'Sumatera Utara': 'North Sumatra',
+           'Sulawesi Selatan': 'South Sulawesi', 'Nusa Tenggara Timur': 'East Nusa Tenggara',
+           'Kalimantan Timur': 'East Kalimantan', 'Jawa Timur': 'East Java', 'Papua Barat': 'West Papua'}
+SYLLABLES = ['ba', 'ri', 'to', 'ka', 'pu', 'as', 'ma', 'ra', 'wi', 'ngin', 'su', 'la', 'te', 'ga', 'lo', 'mu']
+
+
+def synthetic_national(locations, days, seed=7):
+    """(frame referensi BMKG, frame weather.com) dengan nama, tanggal, dan suhu sintetis."""
+    rng = np.random.default_rng(seed)
+    names, provinces = [], []
+    while len(names) < locations:
+        name = "".join(rng.choice(SYLLABLES, rng.integers(3, 6))).title()
+        if name not in names:
+            names.append(name)
+            provinces.append(PROVINCES[len(names) % len(PROVINCES)])
+
+    dates = pd.date_range('2025-12-02', periods=days)
+    n = locations * days
+    base = rng.uniform(22, 33, n).round()
+    scrape_time = pd.Timestamp('2025-12-02 00:05')
+    reference = pd.DataFrame({
+        'source': 'bmkg.go.id', 'scrape_time': scrape_time,
+        'parent_location': np.repeat(provinces, days),
+        'location_name': np.repeat([f"Kab. {name}" if i % 3 else f"Kota {name}" for i, name in enumerate(names)], days),
+        'target_date': np.tile(dates, locations),
+        'condition_summary': 'Hujan Ringan',
+        'high_temp_c': base + 4, 'low_temp_c': base - 3, 'precip_max': np.nan,
+    })
+
+    # weather.com: 'Nama, Provinsi (Inggris), Indonesia', sebagian dengan salah eja satu huruf
+    def variant(i, name):
+        if i % 7 == 0:
+            name = name[:-1] + ('a' if name[-1] != 'a' else 'e')
+        return f"{name}, {ENGLISH[provinces[i]]}, Indonesia"
+
+    other = pd.DataFrame({
+        'source': 'weather.com', 'scrape_time': scrape_time,
+        'parent_location': np.repeat([f"{ENGLISH[p]}, Indonesia" for p in provinces], days),
+        'location_name': np.repeat([variant(i, name) for i, name in enumerate(names)], days),
+        'target_date': np.tile(dates, locations),
+        'condition_summary': 'Rain Showers',
+        'high_temp_c': base + 4 + rng.normal(0, 1.5, n).round(1),
+        'low_temp_c': base - 3 + rng.normal(0, 1.5, n).round(1),
+        'precip_max': rng.uniform(0, 1, n).round(2),
+    })
+    return reference, other
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reconcile.reconcile pada data nasional sintetis")
+    parser.add_argument('--locations', type=int, default=514)
+    parser.add_argument('--days', type=int, default=10)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    reference, other = synthetic_national(args.locations, args.days)
+    print(f"Input: {len(reference):,} baris BMKG, {len(other):,} baris weather.com")
+
+    timings = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        ref = latest_per_key(reference)
+        index = LocationIndex(ref['location_name'].tolist(), ref['parent_location'].tolist())
+        index_s = time.perf_counter() - start
+        result = reconcile(ref, other, index)
+        timings.append((index_s, time.perf_counter() - start))
+
+    index_s, total_s = min(timings, key=lambda t: t[1])
+    matched = result['match_key'].nunique()
+    print(f"Indeks nama: {len(index)} lokasi dalam {index_s * 1000:.1f} ms")
+    print(f"Rekonsiliasi: {len(result):,} lokasi-hari ({matched}/{args.locations} lokasi cocok) "
+          f"dalam {total_s:.2f}s (terbaik dari {args.runs})")
+    print(f"|delta| rata-rata high_temp_c: {result['high_temp_c_delta'].abs().mean():.2f} °C")
+    print(result.head(3).T)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# bench_soak.py
+# Soak test memori untuk proses yang berjalan lama: ribuan job simulasi lewat jalur job
+# scheduler yang asli (scheduler.job_scraping_otomatis: scraper baru per job, tier HTTP,
+# ekstraksi, simpan) terhadap fixture lokal, dengan stub Gemini seperti bench_pipeline.py.
+# Setiap job dibungkus resource_guard.MemoryGovernor seperti di AsyncScheduler. Dilaporkan
+# RSS per interval dan pertumbuhan memori per job setelah pemanasan (regresi linier).
+#
+#   python benchmarks/bench_soak.py [--jobs 2000] [--urls 50] [--warmup 200] [--report-every 250]
+#                                   [--max-growth-kb 20] [--tracemalloc]
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+os.environ.setdefault("GEMINI_API_KEY", "bench-stub")  # client asli tidak pernah dipanggil
+
+import dynamic_scrapper  # noqa: E402
+from bench_pipeline import StubGeminiClient, start_fixture_server, _load_fixtures  # noqa: E402
+from resource_guard import MemoryGovernor, psutil  # noqa: E402
+from scheduler import ScheduledTarget, job_scraping_otomatis  # noqa: E402
+
+
+def _slope(values):
+    """Kemiringan regresi linier (unit per job) dari deret nilai per job."""
+    n = len(values)
+    if n < 2:
+        return 0.0
+    mean_x, mean_y = (n - 1) / 2, sum(values) / n
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values))
+    var = sum((x - mean_x) ** 2 for x in range(n))
+    return cov / var
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test memori job scheduler dengan fixture lokal")
+    parser.add_argument('--jobs', type=int, default=2000)
+    parser.add_argument('--urls', type=int, default=50, help="jumlah URL berbeda yang digilir")
+    parser.add_argument('--warmup', type=int, default=200, help="job awal yang tidak dihitung (cache, modul, pool)")
+    parser.add_argument('--report-every', type=int, default=250)
+    parser.add_argument('--max-growth-kb', type=float, default=None,
+                        help="gagal (exit 1) jika pertumbuhan RSS per job setelah pemanasan melewati nilai ini")
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help="tampilkan baris kode dengan alokasi Python yang paling bertambah setelah pemanasan")
+    parser.add_argument('--verbose', action='store_true', help="tampilkan log scraper")
+    args = parser.parse_args()
+
+    fixtures = _load_fixtures()
+    server, base_url = start_fixture_server(fixtures)
+    stub = StubGeminiClient(fixtures)
+    dynamic_scrapper.get_client = lambda api_key: stub  # client bersama semua scraper = stub
+    targets = [
+        ScheduledTarget(f"soak_{i}", url=f"{base_url}/{'bmkg' if i % 2 else 'weathercom'}/{i}", interval_minutes=1)
+        for i in range(args.urls)
+    ]
+    governor = MemoryGovernor(max_rss_mb=None, max_browser_mb=None)
+    quiet = lambda: contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    if psutil is None:
+        print("psutil tidak terpasang: RSS dibaca dari /proc, memori proses anak tidak diukur.")
+
+    cwd = os.getcwd()
+    tmp_dir = tempfile.TemporaryDirectory()
+    os.chdir(tmp_dir.name)  # cache, state, dan hasil simpan memakai path relatif default
+    rss, failures, snapshot = [], 0, None
+    start = time.perf_counter()
+    print(f"Soak: {args.jobs} job, {args.urls} URL, pemanasan {args.warmup} job\n")
+    print(f"{'job':>7} {'RSS MB':>8} {'+MB sejak awal':>15} {'KB/job':>8} {'job/s':>7} {'gagal':>6}")
+    try:
+        for i in range(args.jobs):
+            target = targets[i % len(targets)]
+            with governor.job(target.name) as usage:
+                with quiet():
+                    ok = job_scraping_otomatis(target)
+            failures += 0 if ok else 1
+            rss.append(usage.end_rss_mb)
+
+            if args.tracemalloc and i + 1 == args.warmup:
+                import tracemalloc
+                tracemalloc.start()
+                snapshot = tracemalloc.take_snapshot()
+            if (i + 1) % args.report_every == 0 or i + 1 == args.jobs:
+                steady = rss[args.warmup:]
+                kb_per_job = _slope(steady) * 1024 if len(steady) > 1 else float('nan')
+                print(f"{i + 1:>7} {rss[-1]:>8.1f} {rss[-1] - rss[0]:>+15.1f} {kb_per_job:>8.2f} "
+                      f"{(i + 1) / (time.perf_counter() - start):>7.1f} {failures:>6}")
+    finally:
+        os.chdir(cwd)
+        tmp_dir.cleanup()
+        server.shutdown()
+
+    steady = rss[args.warmup:]
+    kb_per_job = _slope(steady) * 1024
+    print(f"\nRSS: awal {rss[0]:.1f} MB, setelah pemanasan {steady[0] if steady else rss[-1]:.1f} MB, "
+          f"akhir {rss[-1]:.1f} MB, puncak {max(rss):.1f} MB")
+    print(f"Pertumbuhan setelah pemanasan: {kb_per_job:.2f} KB/job "
+          f"(~{kb_per_job * 1000 / 1024:.1f} MB per 1000 job), panggilan stub Gemini: {stub.calls}")
+
+    if snapshot is not None:
+        import tracemalloc
+        print("\nAlokasi Python yang paling bertambah setelah pemanasan:")
+        for stat in tracemalloc.take_snapshot().compare_to(snapshot, 'lineno')[:10]:
+            print(f"  {stat}")
+
+    if args.max_growth_kb is not None and kb_per_job > args.max_growth_kb:
+        print(f"GAGAL: pertumbuhan {kb_per_job:.2f} KB/job > batas {args.max_growth_kb} KB/job")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
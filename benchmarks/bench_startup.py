@@ -0,0 +1,80 @@
+# bench_startup.py
+# Waktu start CLI: wall-clock `python <script> --help` dan biaya impor modul (python -X importtime),
+# dibandingkan dengan interpreter kosong. Target: scheduler & jalur BMKG < 200 ms.
+#
+#   python benchmarks/bench_startup.py [--runs 5] [--top 8]
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGET_MS = 200
+
+COMMANDS = [
+    ('python (kosong)', ['-c', 'pass']),
+    ('scheduler.py --help', ['scheduler.py', '--help']),
+    ('bmkg_scraper.py --help', ['bmkg_scraper.py', '--help']),
+    ('worker_farm.py stats', ['worker_farm.py', '--queue', '{queue}', 'stats']),
+]
+MODULES = ['scheduler', 'bmkg_scraper', 'worker_farm', 'dynamic_scrapper', 'scraper_config']
+
+
+def wall_ms(args, runs):
+    """Waktu terbaik (ms) menjalankan `python args` sampai selesai."""
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def import_profile(module):
+    """[(kumulatif_us, nama)] subtree impor satu modul, dari python -X importtime."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        rows.append((int(cumulative), name.rstrip()))
+        if not name.startswith('  ') and name.strip() != module:
+            rows = []  # impor tingkat atas milik interpreter (site, encodings), bukan subtree modul
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark waktu start CLI scraper")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8, help="jumlah impor termahal yang ditampilkan per modul")
+    args = parser.parse_args()
+
+    print(f"Wall-clock (terbaik dari {args.runs}):")
+    baseline = None
+    tmp_dir = tempfile.TemporaryDirectory()
+    queue = os.path.join(tmp_dir.name, 'queue.sqlite')
+    for label, command in COMMANDS:
+        ms = wall_ms([arg.format(queue=queue) for arg in command], args.runs)
+        if baseline is None:
+            baseline = ms
+            print(f"  {label:<28} {ms:7.1f} ms")
+            continue
+        status = "OK" if ms < TARGET_MS else f"> {TARGET_MS} ms"
+        print(f"  {label:<28} {ms:7.1f} ms  (+{ms - baseline:.1f} ms di atas interpreter, {status})")
+    tmp_dir.cleanup()
+
+    for module in MODULES:
+        rows = import_profile(module)
+        total = next((us for us, name in rows if name.strip() == module), 0)
+        print(f"\nimport {module}: {total / 1000:.1f} ms kumulatif")
+        for us, name in sorted(rows, reverse=True)[1:args.top + 1]:
+            print(f"  {us / 1000:7.1f} ms {name}")
+
+
+if __name__ == "__main__":
+    main()
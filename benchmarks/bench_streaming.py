@@ -0,0 +1,154 @@
+# bench_streaming.py
+# Benchmark ekstraksi Gemini streaming (stream_extraction.py) dengan client stub yang
+# mengalirkan JSON rekaman per potongan dengan kecepatan generasi tetap.
+#
+# Skenario: respons normal (fixture BMKG & weather.com), respons yang mengulang entri per jam
+# tanpa henti, dan respons yang melanggar skema. Diukur time-to-first-record, waktu sampai
+# respons diterima/dihentikan, dan token output terbuang dibanding mode non-streaming.
+#
+#   python benchmarks/bench_streaming.py [--tokens-per-s 1000] [--chunk-chars 120] [--runaway-tokens 8000]
+
+import argparse
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from extraction_broker import ExtractionBroker  # noqa: E402
+from scraper_config import TARGET_SCHEMA, schema_adapter  # noqa: E402
+from stream_extraction import StreamingExtraction, DEFAULT_MAX_OUTPUT_TOKENS  # noqa: E402
+from text_reducer import estimate_tokens  # noqa: E402
+
+
+class _StubModels:
+    """generate_content(_stream) palsu: teks dialirkan per potongan dengan jeda sesuai token/detik."""
+
+    def __init__(self, text_fn, chunk_chars, tokens_per_s):
+        self.text_fn = text_fn
+        self.chunk_chars = chunk_chars
+        self.tokens_per_s = tokens_per_s
+        self.streamed_tokens = 0
+
+    def _chunks(self):
+        buffer = ""
+        for piece in self.text_fn():
+            buffer += piece
+            while len(buffer) >= self.chunk_chars:
+                yield buffer[:self.chunk_chars]
+                buffer = buffer[self.chunk_chars:]
+        if buffer:
+            yield buffer
+
+    def generate_content_stream(self, model, contents, config):
+        for chunk in self._chunks():
+            tokens = estimate_tokens(chunk)
+            time.sleep(tokens / self.tokens_per_s)
+            self.streamed_tokens += tokens
+            yield SimpleNamespace(text=chunk, usage_metadata=None)
+
+    def generate_content(self, model, contents, config):
+        text = "".join(chunk.text for chunk in self.generate_content_stream(model, contents, config))
+        return SimpleNamespace(text=text, usage_metadata=None)
+
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES_DIR, f"{name}.json"), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _runaway(record, max_tokens):
+    """Respons yang mulai normal lalu mengulang entri per jam terakhir sampai max_tokens."""
+    head = json.dumps({**record, 'hourly_forecasts_grouped': [], 'monthly_forecasts': []}, ensure_ascii=False)
+    head = head[:head.index('"hourly_forecasts_grouped"')]
+    group = record['hourly_forecasts_grouped'][0]
+    entries = group['hourly_entries']
+
+    def generate():
+        yield head + '"hourly_forecasts_grouped": [{"date_day_name": ' + json.dumps(group['date_day_name']) + ', "hourly_entries": ['
+        produced = 0
+        for i in range(10 ** 6):
+            entry = json.dumps(entries[min(i, len(entries) - 1)], ensure_ascii=False) + ", "
+            produced += estimate_tokens(entry)
+            if produced > max_tokens:
+                return
+            yield entry
+    return generate
+
+
+def _schema_violation(record):
+    bad = json.loads(json.dumps(record))
+    bad['hourly_forecasts_grouped'][0]['hourly_entries'][1]['temp'] = 81  # angka, skema meminta string
+    text = json.dumps(bad, ensure_ascii=False)
+    return lambda: iter([text])
+
+
+def _complete(record):
+    text = json.dumps(record, ensure_ascii=False)
+    return lambda: iter([text])
+
+
+def _run(text_fn, args, streaming):
+    stub = _StubModels(text_fn, args.chunk_chars, args.tokens_per_s)
+    broker = ExtractionBroker(SimpleNamespace(models=stub), 'stub', rpm=None, tpm=None)
+    url = "https://example.com/bench"
+    start = time.perf_counter()
+    if streaming:
+        stream = StreamingExtraction(TARGET_SCHEMA, max_output_tokens=args.max_output_tokens)
+        broker.generate_stream("prompt", TARGET_SCHEMA, 0, stream)
+        elapsed = time.perf_counter() - start
+        result = stream.result(url)
+        stats = stream.stats()
+        return {'elapsed_s': elapsed, 'first_record_s': stats['time_to_first_record_s'],
+                'tokens': stub.streamed_tokens, 'wasted': stats['wasted_tokens'],
+                'abort': stats['abort_reason'], 'records': _records(result)}
+
+    text = broker.generate("prompt", TARGET_SCHEMA, 0)
+    elapsed = time.perf_counter() - start
+    try:
+        result = schema_adapter(TARGET_SCHEMA).validate_json(text)
+        records, wasted = _records(result), 0
+    except ValueError:
+        records, wasted = 0, stub.streamed_tokens  # seluruh respons dibuang
+    return {'elapsed_s': elapsed, 'first_record_s': elapsed if records else None,
+            'tokens': stub.streamed_tokens, 'wasted': wasted, 'abort': None, 'records': records}
+
+
+def _records(result):
+    return (sum(len(loc.daily_forecasts) for loc in result.all_locations_forecast)
+            + sum(len(group.hourly_entries) for group in result.hourly_forecasts_grouped)
+            + len(result.monthly_forecasts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ekstraksi Gemini streaming vs respons utuh")
+    parser.add_argument('--tokens-per-s', type=float, default=1000.0, help="kecepatan generasi stub")
+    parser.add_argument('--chunk-chars', type=int, default=120, help="ukuran potongan stream")
+    parser.add_argument('--runaway-tokens', type=int, default=8000,
+                        help="panjang respons berulang sebelum model berhenti sendiri (batas output)")
+    parser.add_argument('--max-output-tokens', type=int, default=DEFAULT_MAX_OUTPUT_TOKENS)
+    args = parser.parse_args()
+
+    bmkg, weathercom = _fixture('bmkg_62'), _fixture('weathercom_today')
+    scenarios = [
+        ('bmkg_62 (normal)', _complete(bmkg)),
+        ('weathercom (normal)', _complete(weathercom)),
+        ('weathercom (loop per jam)', _runaway(weathercom, args.runaway_tokens)),
+        ('weathercom (skema salah)', _schema_violation(weathercom)),
+    ]
+    print(f"Stub: {args.tokens_per_s:.0f} token/detik, potongan {args.chunk_chars} karakter\n")
+    print(f"{'skenario':<28} {'mode':<7} {'item 1':>8} {'selesai':>8} {'token':>7} {'terbuang':>9} {'record':>7}  dihentikan")
+    for label, text_fn in scenarios:
+        for streaming in (False, True):
+            r = _run(text_fn, args, streaming)
+            first = '-' if r['first_record_s'] is None else f"{r['first_record_s']:.2f}s"
+            print(f"{label:<28} {'stream' if streaming else 'utuh':<7} {first:>8} {r['elapsed_s']:>7.2f}s "
+                  f"{r['tokens']:>7} {r['wasted']:>9} {r['records']:>7}  {r['abort'] or '-'}")
+
+
+if __name__ == "__main__":
+    main()
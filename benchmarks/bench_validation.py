@@ -0,0 +1,121 @@
+# bench_validation.py
+# Benchmark validasi + konversi kolumnar untuk payload Gemini besar (sintetis).
+#
+# Jalur lama : json.loads -> model_validate -> model_dump -> output_to_rows -> DataFrame
+# Jalur baru : TypeAdapter.validate_json(bytes) -> model_to_columns -> DataFrame
+#
+#   python benchmarks/bench_validation.py [--locations 50] [--days 14] [--hourly-days 10] [--monthly 5000] [--repeat 3]
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from forecast_storage import model_to_columns, output_to_rows  # noqa: E402
+from scraper_config import TARGET_SCHEMA, schema_adapter  # noqa: E402
+
+CONDITIONS = ['Hujan Ringan', 'Berawan', 'Cerah Berawan', 'Hujan Petir', 'Scattered Thunderstorms']
+
+
+def synthetic_payload(locations, days, hourly_days, monthly):
+    """Respons JSON sintetis (bytes) dengan struktur UniversalOutputV27."""
+    data = {
+        'parent_location': 'Kalimantan Tengah',
+        'source_url': 'https://www.bmkg.go.id/cuaca/prakiraan-cuaca/62',
+        'forecast_period': 'Synthetic benchmark payload',
+        'all_locations_forecast': [
+            {
+                'location_name': f"Kabupaten {i}",
+                'daily_forecasts': [
+                    {'date_day': f"Sel, {d % 28 + 1:02d} Des", 'high_temp': f"{28 + d % 6} °C", 'low_temp': f"{22 + d % 3} °C",
+                     'condition_summary': CONDITIONS[(i + d) % len(CONDITIONS)],
+                     'precipitation_chance': f"{(i * d) % 90}–{(i * d) % 90 + 9}%", 'wind_speed': f"{d % 20} km/h W"}
+                    for d in range(days)
+                ],
+            }
+            for i in range(locations)
+        ],
+        'hourly_forecasts_grouped': [
+            {
+                'date_day_name': f"Day {g}",
+                'hourly_entries': [
+                    {'time_of_day': f"{h}:00", 'temp': f"{70 + h % 15}°", 'condition': CONDITIONS[h % len(CONDITIONS)],
+                     'feels_like': f"{75 + h % 15}°", 'wind': f"NNE {h % 12} mph"}
+                    for h in range(24)
+                ],
+            }
+            for g in range(hourly_days)
+        ],
+        'monthly_forecasts': [
+            {'date_month_day': f"Dec {m % 31 + 1}", 'day_temp': f"{85 + m % 8}°", 'night_temp': f"{72 + m % 4}°",
+             'condition_summary': CONDITIONS[m % len(CONDITIONS)], 'precipitation_chance': f"{m % 100}%"}
+            for m in range(monthly)
+        ],
+    }
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+def old_path(raw, scrape_time):
+    model = TARGET_SCHEMA.model_validate(json.loads(raw))
+    rows = output_to_rows(model.model_dump(), scrape_time)
+    return {kind: pd.DataFrame(kind_rows) for kind, kind_rows in rows.items()}
+
+
+def new_path(raw, scrape_time):
+    model = schema_adapter(TARGET_SCHEMA).validate_json(raw)
+    columns = model_to_columns(model, scrape_time)
+    return {kind: pd.DataFrame(kind_columns) for kind, kind_columns in columns.items()}
+
+
+def measure(func, raw, scrape_time, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        frames = func(raw, scrape_time)
+        best = min(best, time.perf_counter() - start)
+        del frames
+
+    gc.collect()
+    tracemalloc.start()
+    frames = func(raw, scrape_time)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rows = sum(len(df) for df in frames.values())
+    return best, peak / (1024 * 1024), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark validasi pydantic + konversi kolumnar")
+    parser.add_argument('--locations', type=int, default=50)
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--hourly-days', type=int, default=10)
+    parser.add_argument('--monthly', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    raw = synthetic_payload(args.locations, args.days, args.hourly_days, args.monthly)
+    scrape_time = datetime(2025, 12, 2, 0, 5)
+    schema_adapter(TARGET_SCHEMA)  # bangun validator di luar pengukuran
+    print(f"Payload: {len(raw) / 1024:.0f} KB")
+
+    old_s, old_mb, old_rows = measure(old_path, raw, scrape_time, args.repeat)
+    new_s, new_mb, new_rows = measure(new_path, raw, scrape_time, args.repeat)
+    assert old_rows == new_rows, (old_rows, new_rows)
+
+    print(f"{'jalur':<40} {'waktu':>10} {'peak memori':>14}")
+    print(f"{'json.loads+model_validate+dump+rows':<40} {old_s * 1000:>8.1f}ms {old_mb:>11.1f} MB")
+    print(f"{'validate_json+model_to_columns':<40} {new_s * 1000:>8.1f}ms {new_mb:>11.1f} MB")
+    print(f"{old_rows} baris. Percepatan x{old_s / new_s:.2f}, peak memori x{old_mb / new_mb:.2f} lebih kecil.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,26 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
+# requests, BeautifulSoup dan pandas diimpor di fungsi yang memakainya: mode multi-provinsi
+# (httpx + lxml) dan --help tidak perlu memuatnya.
 import json
+import csv
+import asyncio
+import queue
+import threading
+import argparse
 from datetime import datetime
 
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+NATIONAL_CONCURRENCY = 8
+FETCH_TIMEOUT = 20
+CSV_FIELDS = ['kode_provinsi', 'provinsi', 'kabupaten_kota', 'tanggal', 'keterangan_cuaca', 'suhu', 'kelembapan']
+_DONE = object()
+
 def scrape_bmkg_weather(url):
     """
     Scrape data cuaca dari website BMKG
@@ -14,6 +31,9 @@ def scrape_bmkg_weather(url):
     Returns:
         list: List of dictionaries containing weather data
     """
+    import requests
+    from bs4 import BeautifulSoup
+
     print(f"Mengambil data dari: {url}")
     
     # Headers untuk menghindari blocking
@@ -114,6 +134,7 @@ def save_to_csv(data, filename=None):
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f'bmkg_cuaca_{timestamp}.csv'
     
+    import pandas as pd
     df = pd.DataFrame(data)
     df.to_csv(filename, index=False, encoding='utf-8-sig')
     print(f"Data berhasil disimpan ke: {filename}")
@@ -132,6 +153,156 @@ def save_to_json(data, filename=None):
     return filename
 
 
+def save_to_parquet(data, url, root=None):
+    """Simpan data ke dataset Parquet terpartisi (forecast_storage), hanya baris baru/berubah"""
+    from forecast_storage import ParquetForecastStore, DEFAULT_STORE_ROOT
+    from site_adapters import bmkg_rows_to_output
+    from bmkg_regions import BMKG_PROVINCES
+
+    root = root or DEFAULT_STORE_ROOT
+    code = url.rstrip('/').rsplit('/', 1)[-1]
+    record = bmkg_rows_to_output(data, url, BMKG_PROVINCES.get(code, "N/A"))
+    # upsert, bukan append: scrape ulang prakiraan yang sama tidak menggandakan baris
+    counts = ParquetForecastStore(root).upsert(record)['daily']
+    print(f"Data berhasil disimpan ke: {root}/ (harian: {counts['insert']} baru, "
+          f"{counts['update']} berubah, {counts['unchanged']} tetap)")
+    return root
+
+
+async def _fetch_provinces(urls, concurrency, results):
+    """Fetch semua URL provinsi dengan satu AsyncClient (pool keep-alive) dan batas konkurensi."""
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(headers=DEFAULT_HEADERS, limits=limits, timeout=FETCH_TIMEOUT,
+                                 follow_redirects=True) as client:
+        async def fetch(code, url):
+            async with semaphore:
+                try:
+                    response = await client.get(url)
+                    response.raise_for_status()
+                    results.put((code, url, response.text, None))
+                except httpx.HTTPError as e:
+                    results.put((code, url, None, e))
+
+        await asyncio.gather(*(fetch(code, url) for code, url in urls))
+
+
+def iter_provinces_rows(codes=None, concurrency=NATIONAL_CONCURRENCY, base_url=None, stats=None):
+    """
+    Scrape banyak provinsi sekaligus (default: semua kode di BMKG_PROVINCES).
+
+    Fetch berjalan async di thread terpisah; setiap halaman diparse dengan lxml begitu
+    selesai diunduh, dan baris langsung di-yield (tidak dikumpulkan di memori).
+
+    Yields:
+        dict: kode_provinsi, provinsi, kabupaten_kota, tanggal, keterangan_cuaca, suhu, kelembapan
+    """
+    from bmkg_regions import BMKG_BASE_URL, BMKG_PROVINCES
+    from site_adapters import iter_bmkg_rows
+
+    if httpx is None:
+        raise ImportError("Mode multi-provinsi membutuhkan httpx (pip install httpx).")
+    if concurrency < 1:
+        raise ValueError(f"concurrency harus >= 1, bukan {concurrency}")
+
+    base_url = base_url or BMKG_BASE_URL
+    codes = list(codes or BMKG_PROVINCES)
+    stats = stats if stats is not None else {}
+    stats.update({'provinsi': len(codes), 'sukses': 0, 'gagal': 0, 'baris': 0})
+    # Dibatasi: fetch yang lebih cepat dari parse menunggu, HTML tidak menumpuk di memori
+    results = queue.Queue(maxsize=concurrency)
+
+    def run_fetch():
+        try:
+            asyncio.run(_fetch_provinces([(code, f"{base_url}/{code}") for code in codes], concurrency, results))
+        finally:
+            results.put(_DONE)
+
+    fetcher = threading.Thread(target=run_fetch, daemon=True)
+    fetcher.start()
+
+    while True:
+        item = results.get()
+        if item is _DONE:
+            break
+        code, url, html, error = item
+        provinsi = BMKG_PROVINCES.get(code, code)
+        if error is not None:
+            print(f"  ✗ {code} {provinsi}: {error}")
+            stats['gagal'] += 1
+            continue
+
+        count, error = 0, None
+        rows = iter_bmkg_rows(html)
+        while True:
+            # Halaman yang gagal diparse hanya menggagalkan provinsinya, bukan seluruh run
+            try:
+                row = next(rows)
+            except StopIteration:
+                break
+            except Exception as e:
+                error = e
+                break
+            count += 1
+            yield {'kode_provinsi': code, 'provinsi': provinsi, **row}
+        stats['baris'] += count
+        if error is not None:
+            print(f"  ✗ {code} {provinsi}: gagal parse setelah {count} data: {error}")
+            stats['gagal'] += 1
+            continue
+        stats['sukses'] += 1
+        print(f"  ✓ {code} {provinsi}: {count} data")
+    fetcher.join()
+
+
+def stream_to_files(rows, csv_filename=None, json_filename=None):
+    """
+    Tulis baris dari generator ke CSV dan/atau JSON satu per satu (tanpa list perantara).
+
+    Returns:
+        int: jumlah baris yang ditulis
+    """
+    csv_file = open(csv_filename, 'w', newline='', encoding='utf-8-sig') if csv_filename else None
+    json_file = open(json_filename, 'w', encoding='utf-8') if json_filename else None
+    writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS, extrasaction='ignore') if csv_file else None
+    count = 0
+    try:
+        if writer:
+            writer.writeheader()
+        if json_file:
+            json_file.write("[")
+        for row in rows:
+            if writer:
+                writer.writerow(row)
+            if json_file:
+                json_file.write(("," if count else "") + "\n  " + json.dumps(row, ensure_ascii=False))
+            count += 1
+        if json_file:
+            json_file.write("\n]\n")
+    finally:
+        for f in (csv_file, json_file):
+            if f:
+                f.close()
+    return count
+
+
+def scrape_all_provinces(codes=None, concurrency=NATIONAL_CONCURRENCY, csv_filename=None, json_filename=None):
+    """Scrape nasional: semua provinsi -> CSV + JSON bertimestamp. Mengembalikan (jumlah baris, stats)."""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    csv_filename = csv_filename or f'bmkg_cuaca_nasional_{timestamp}.csv'
+    json_filename = json_filename or f'bmkg_cuaca_nasional_{timestamp}.json'
+
+    stats = {}
+    start = datetime.now()
+    count = stream_to_files(iter_provinces_rows(codes, concurrency, stats=stats), csv_filename, json_filename)
+    durasi = (datetime.now() - start).total_seconds()
+    print(f"Berhasil scraping {count} data dari {stats['sukses']}/{stats['provinsi']} provinsi "
+          f"dalam {durasi:.1f}s (concurrency {concurrency}).")
+    print(f"Data berhasil disimpan ke: {csv_filename} dan {json_filename}")
+    return count, stats
+
+
 def print_data_preview(data, limit=10):
     """Tampilkan preview data"""
     print("\n" + "="*80)
@@ -161,9 +332,26 @@ def print_data_preview(data, limit=10):
 # ============================================================================
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BMKG weather scraper")
+    parser.add_argument('--semua', action='store_true', help="scrape semua provinsi sekaligus (async)")
+    parser.add_argument('--provinsi', default=None, help="kode provinsi dipisah koma untuk mode multi-provinsi, e.g. 31,32,62")
+    parser.add_argument('--concurrency', type=int, default=NATIONAL_CONCURRENCY)
+    parser.add_argument('--tanpa-csv', action='store_true',
+                        help="mode satu provinsi: hanya simpan ke Parquet, tanpa file CSV/JSON")
+    args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency harus >= 1")
+
     print("="*80)
     print("BMKG WEATHER SCRAPER")
     print("="*80)
+
+    if args.semua or args.provinsi:
+        codes = [c.strip() for c in args.provinsi.split(',') if c.strip()] if args.provinsi else None
+        total, _ = scrape_all_provinces(codes, args.concurrency)
+        print("\n✓ Scraping selesai!" if total else "\n✗ Gagal scraping data!")
+        print("\n" + "="*80)
+        raise SystemExit(0 if total else 1)
     
     # URL target - bisa diganti sesuai provinsi yang diinginkan
     # Contoh URL:
@@ -182,16 +370,21 @@ if __name__ == "__main__":
         # Preview data
         print_data_preview(weather_data, limit=5)
         
-        # Simpan ke CSV
-        csv_file = save_to_csv(weather_data)
-        
-        # Simpan ke JSON
-        json_file = save_to_json(weather_data)
+        # Simpan ke CSV + JSON (dipakai e.g. reconcile.py --bmkg-csv)
+        csv_file = json_file = None
+        if not args.tanpa_csv:
+            csv_file = save_to_csv(weather_data)
+            json_file = save_to_json(weather_data)
+
+        # Simpan ke dataset Parquet (riwayat terpartisi)
+        store_dir = save_to_parquet(weather_data, url)
         
         print("\n✓ Scraping selesai!")
         print(f"  Total data: {len(weather_data)}")
-        print(f"  File CSV  : {csv_file}")
-        print(f"  File JSON : {json_file}")
+        if csv_file:
+            print(f"  File CSV  : {csv_file}")
+            print(f"  File JSON : {json_file}")
+        print(f"  Parquet   : {store_dir}")
     else:
         print("\n✗ Gagal scraping data!")
     
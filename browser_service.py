@@ -0,0 +1,381 @@
+# browser_service.py (V27)
+# Daemon browser "hangat": satu Chromium berjalan terus dengan port CDP terbuka dan
+# storage state (playwright_state_v27.json) tersimpan di memori. Scraper meminjam
+# endpoint lewat socket lokal lalu memakai connect_over_cdp(), sehingga tidak ada
+# cold start Chromium per job. Browser di-recycle setelah N halaman atau saat
+# memori melewati batas. Pinjaman terikat ke koneksi socket peminjam: jika proses
+# peminjam mati tanpa release, pinjamannya dikembalikan saat koneksinya tertutup.
+#
+#   python browser_service.py [--port 8765] [--cdp-port 9222] [--max-pages 200] [--max-memory-mb 1500]
+
+import argparse
+import json
+import os
+import selectors
+import socket
+import time
+
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DEFAULT_SERVICE_ADDRESS = "127.0.0.1:8765"
+DEFAULT_CDP_PORT = 9222
+DEFAULT_MAX_PAGES = 200
+DEFAULT_MAX_MEMORY_MB = 1500
+STORAGE_STATE_FILE = "playwright_state_v27.json"
+
+# Sama dengan dynamic_scrapper.BROWSER_ARGS, tanpa --single-process
+# (mode single-process tidak stabil untuk banyak koneksi CDP)
+SERVICE_BROWSER_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--no-sandbox',
+    '--disable-http2',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+]
+
+
+def _split_address(address):
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+
+class BrowserService:
+    """
+    Pemilik Chromium yang berumur panjang.
+
+    API in-process: new_context() / release(). API socket: lihat ServiceHandler.
+    Semua pemanggilan Playwright terjadi di thread yang memanggil start().
+    """
+
+    def __init__(self, cdp_port=DEFAULT_CDP_PORT, max_pages=DEFAULT_MAX_PAGES,
+                 max_memory_mb=DEFAULT_MAX_MEMORY_MB, storage_state_file=STORAGE_STATE_FILE):
+        self.cdp_port = cdp_port
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.storage_state_file = storage_state_file
+        self.storage_state = None
+        self.generation = 0
+        self.pages_served = 0
+        self.active_leases = 0
+        self.recycle_pending = False
+        self.last_launch_s = None
+        self._playwright = None
+        self._browser = None
+
+    @property
+    def endpoint(self):
+        return f"http://127.0.0.1:{self.cdp_port}"
+
+    def _load_storage_state(self):
+        if os.path.exists(self.storage_state_file):
+            with open(self.storage_state_file, 'r', encoding='utf-8') as f:
+                self.storage_state = json.load(f)
+            print(f"[browser-service] Storage state dimuat dari {self.storage_state_file}")
+        else:
+            self.storage_state = None
+
+    def _launch(self):
+        start = time.perf_counter()
+        self._browser = self._playwright.chromium.launch(
+            headless=True,
+            channel="chrome",
+            args=SERVICE_BROWSER_ARGS + [
+                f'--remote-debugging-port={self.cdp_port}',
+                '--remote-debugging-address=127.0.0.1',
+            ],
+        )
+        self.last_launch_s = time.perf_counter() - start
+        self.generation += 1
+        self.pages_served = 0
+        self.recycle_pending = False
+        print(f"[browser-service] Chromium generasi {self.generation} siap dalam {self.last_launch_s:.2f}s ({self.endpoint})")
+
+    def start(self):
+        from playwright.sync_api import sync_playwright
+        self._playwright = sync_playwright().start()
+        self._load_storage_state()
+        self._launch()
+
+    def stop(self):
+        if self._browser is not None:
+            self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
+
+    def recycle(self):
+        print(f"[browser-service] Recycle browser (halaman: {self.pages_served}, memori: {self.memory_mb():.0f} MB)")
+        self._browser.close()
+        self._load_storage_state()
+        self._launch()
+
+    def memory_mb(self):
+        """RSS total proses Chromium (anak dari proses ini). 0 jika psutil tidak tersedia."""
+        if psutil is None:
+            return 0.0
+        total = 0
+        for child in psutil.Process().children(recursive=True):
+            try:
+                if 'chrom' in child.name().lower():
+                    total += child.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return total / (1024 * 1024)
+
+    def _needs_recycle(self):
+        if self.max_pages and self.pages_served >= self.max_pages:
+            return True
+        return bool(self.max_memory_mb) and self.memory_mb() > self.max_memory_mb
+
+    # --- API in-process ---
+    def new_context(self, **options):
+        """Context baru yang terisolasi (cookies/state dari storage state yang sudah dimuat)."""
+        if self.storage_state is not None:
+            options.setdefault('storage_state', self.storage_state)
+        self.active_leases += 1
+        return self._browser.new_context(**options)
+
+    def lease(self):
+        """Pinjam endpoint CDP untuk klien di proses lain."""
+        self.active_leases += 1
+        return {
+            'endpoint': self.endpoint,
+            'generation': self.generation,
+            'storage_state': self.storage_state,
+        }
+
+    def release(self, pages=1):
+        """Kembalikan pinjaman. Recycle dilakukan saat tidak ada pinjaman aktif."""
+        self.active_leases = max(0, self.active_leases - 1)
+        self.pages_served += pages
+        if self._needs_recycle():
+            self.recycle_pending = True
+        if self.recycle_pending and self.active_leases == 0:
+            self.recycle()
+
+    def stats(self):
+        return {
+            'endpoint': self.endpoint,
+            'generation': self.generation,
+            'pages_served': self.pages_served,
+            'active_leases': self.active_leases,
+            'recycle_pending': self.recycle_pending,
+            'memory_mb': round(self.memory_mb(), 1),
+            'last_launch_s': self.last_launch_s,
+        }
+
+
+def _handle(service, request, leases):
+    """Satu perintah JSON. leases: jumlah pinjaman aktif koneksi ini. Mengembalikan (respons, leases)."""
+    cmd = request.get('cmd')
+    if cmd == 'lease':
+        return service.lease(), leases + 1
+    if cmd == 'release':
+        if not leases:
+            return {'error': "koneksi ini tidak punya pinjaman aktif"}, leases
+        service.release(int(request.get('pages', 1)))
+        return {'ok': True}, leases - 1
+    if cmd == 'stats':
+        return service.stats(), leases
+    if cmd == 'refresh_state':
+        service._load_storage_state()
+        return {'ok': True}, leases
+    return {'error': f"perintah tidak dikenal: {cmd}"}, leases
+
+
+class ServiceServer:
+    """
+    Socket kontrol dengan protokol JSON per baris: {"cmd": "lease" | "release" | "stats" | "refresh_state"}.
+
+    Single-thread (selectors): banyak koneksi peminjam terbuka bersamaan, semua panggilan
+    Playwright tetap di thread yang memanggil serve_forever(). Pinjaman dicatat per koneksi;
+    koneksi yang tertutup (peminjam selesai atau mati) mengembalikan pinjamannya yang tersisa.
+    Socket koneksi non-blocking dengan buffer tulis: peminjam yang lambat membaca tidak
+    menahan koneksi lain.
+    """
+
+    def __init__(self, service, address):
+        self.service = service
+        self._selector = selectors.DefaultSelector()
+        self._listener = socket.create_server(_split_address(address))  # SO_REUSEADDR
+        self._listener.setblocking(False)
+        self._selector.register(self._listener, selectors.EVENT_READ)
+        self._connections = {}  # socket -> {'buffer': bytes, 'out': bytearray, 'leases': int}
+
+    def _accept(self):
+        try:
+            conn, _ = self._listener.accept()
+        except BlockingIOError:
+            return
+        conn.setblocking(False)
+        self._connections[conn] = {'buffer': b"", 'out': bytearray(), 'leases': 0}
+        self._selector.register(conn, selectors.EVENT_READ)
+
+    def _close(self, conn):
+        state = self._connections.pop(conn)
+        self._selector.unregister(conn)
+        conn.close()
+        if state['leases']:
+            print(f"[browser-service] Koneksi peminjam tertutup dengan {state['leases']} pinjaman aktif, dikembalikan.")
+            for _ in range(state['leases']):
+                self.service.release(pages=0)
+
+    def _read(self, conn):
+        state = self._connections[conn]
+        try:
+            data = conn.recv(65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._close(conn)
+            return
+        state['buffer'] += data
+        while b"\n" in state['buffer']:
+            line, state['buffer'] = state['buffer'].split(b"\n", 1)
+            try:
+                response, state['leases'] = _handle(self.service, json.loads(line), state['leases'])
+            except Exception as e:
+                response = {'error': str(e)}
+            state['out'] += (json.dumps(response) + "\n").encode('utf-8')
+        if state['out']:
+            self._write(conn)
+
+    def _write(self, conn):
+        """
+        Kirim sebanyak yang diterima socket; sisanya dikirim saat socket siap ditulis lagi.
+        Selama masih ada sisa, koneksi tidak dibaca (request baru menunggu di socket peminjam).
+        """
+        state = self._connections[conn]
+        try:
+            sent = conn.send(state['out'])
+        except BlockingIOError:
+            sent = 0
+        except OSError:
+            self._close(conn)
+            return
+        del state['out'][:sent]
+        self._selector.modify(conn, selectors.EVENT_WRITE if state['out'] else selectors.EVENT_READ)
+
+    def serve_forever(self):
+        while True:
+            for key, events in self._selector.select():
+                if key.fileobj is self._listener:
+                    self._accept()
+                    continue
+                if events & selectors.EVENT_WRITE and key.fileobj in self._connections:
+                    self._write(key.fileobj)
+                if events & selectors.EVENT_READ and key.fileobj in self._connections:
+                    self._read(key.fileobj)
+
+    def close(self):
+        # Service ikut berhenti: pinjaman tidak perlu dikembalikan (dan tidak memicu recycle)
+        for conn in self._connections:
+            conn.close()
+        self._connections.clear()
+        self._selector.close()
+        self._listener.close()
+
+
+def _connect(address, timeout=5):
+    return socket.create_connection(_split_address(address), timeout=timeout)
+
+
+def _exchange(sock, payload):
+    sock.sendall((json.dumps(payload) + "\n").encode('utf-8'))
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    response = json.loads(data)
+    if 'error' in response:
+        raise RuntimeError(response['error'])
+    return response
+
+
+def _request(address, payload, timeout=5):
+    with _connect(address, timeout) as sock:
+        return _exchange(sock, payload)
+
+
+class BrowserLease(dict):
+    """
+    Pinjaman browser hangat: dict endpoint/generation/storage_state, plus koneksi ke service
+    yang tetap terbuka selama pinjaman berlaku. release() (atau proses ini mati) mengakhirinya.
+    """
+
+    def __init__(self, sock, info):
+        super().__init__(info)
+        self._sock = sock
+
+    def release(self, pages=1):
+        if self._sock is None:
+            return
+        try:
+            _exchange(self._sock, {'cmd': 'release', 'pages': pages})
+        finally:
+            self.close()
+
+    def close(self):
+        """Tutup koneksi tanpa release: service tetap mengembalikan pinjaman (tanpa hitungan halaman)."""
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+def lease_browser(address=DEFAULT_SERVICE_ADDRESS):
+    """Pinjam browser hangat. Mengembalikan BrowserLease (dict endpoint/generation/storage_state)."""
+    sock = _connect(address)
+    try:
+        return BrowserLease(sock, _exchange(sock, {'cmd': 'lease'}))
+    except BaseException:
+        sock.close()
+        raise
+
+
+def release_browser(lease, pages=1):
+    lease.release(pages)
+
+
+def service_stats(address=DEFAULT_SERVICE_ADDRESS):
+    return _request(address, {'cmd': 'stats'})
+
+
+def refresh_state(address=DEFAULT_SERVICE_ADDRESS):
+    """Minta service memuat ulang storage state dari file (setelah sesi diperbarui)."""
+    return _request(address, {'cmd': 'refresh_state'})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Daemon browser hangat untuk UniversalScraperV27")
+    parser.add_argument('--address', default=DEFAULT_SERVICE_ADDRESS, help="alamat socket kontrol (host:port)")
+    parser.add_argument('--cdp-port', type=int, default=DEFAULT_CDP_PORT)
+    parser.add_argument('--max-pages', type=int, default=DEFAULT_MAX_PAGES)
+    parser.add_argument('--max-memory-mb', type=int, default=DEFAULT_MAX_MEMORY_MB)
+    args = parser.parse_args()
+
+    service = BrowserService(args.cdp_port, args.max_pages, args.max_memory_mb)
+    service.start()
+
+    server = ServiceServer(service, args.address)
+    print(f"[browser-service] LISTENING di {args.address} (Tekan Ctrl+C untuk berhenti)...")
+    try:
+        # Single-thread: semua panggilan Playwright tetap di thread utama
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Browser service dihentikan oleh user.")
+    finally:
+        server.close()
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# domain_health.py (V27)
+# Pelacakan kesehatan per domain untuk menghadapi deteksi bot: setiap blokir
+# (teks terlalu singkat, timeout, error halaman) menaikkan hitungan blokir berturut-turut,
+# merotasi profil browser (user agent, viewport, locale), dan setelah ambang tertentu
+# membuka circuit breaker dengan cool-down eksponensial. Selama circuit terbuka,
+# scraper dan scheduler melewati domain tersebut (tanpa browser maupun panggilan LLM).
+# File status dipakai bersama semua proses (worker_farm, scheduler --queue): setiap
+# perubahan ditulis dengan baca-gabung-tulis di bawah lock file, dan pembaca memuat ulang
+# file yang diubah proses lain.
+
+import contextlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+from shared_state import SharedJsonFile
+
+DOMAIN_HEALTH_FILE = "domain_health_v27.json"
+FAILURE_THRESHOLD = 3            # blokir berturut-turut sebelum circuit dibuka
+BASE_COOLDOWN_S = 15 * 60        # cool-down pertama; berlipat dua setiap kali dibuka ulang
+MAX_COOLDOWN_S = 12 * 3600
+STALE_AFTER_BLOCKS = 2           # sesi (storage state) dianggap basi setelah blokir ke-N
+STATE_MAX_AGE_S = 3 * 24 * 3600  # ... atau jika file state lebih tua dari ini
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
+]
+
+CONTEXT_PROFILES = [
+    {'viewport': {'width': 1366, 'height': 768}, 'locale': 'id-ID', 'timezone_id': 'Asia/Jakarta'},
+    {'viewport': {'width': 1920, 'height': 1080}, 'locale': 'en-US', 'timezone_id': 'Asia/Jakarta'},
+    {'viewport': {'width': 1536, 'height': 864}, 'locale': 'id-ID', 'timezone_id': 'Asia/Makassar'},
+    {'viewport': {'width': 1440, 'height': 900}, 'locale': 'en-GB', 'timezone_id': 'Asia/Jakarta'},
+]
+
+
+def domain_of(url):
+    host = (urlparse(url or "").hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _new_state():
+    return {
+        'circuit': CLOSED,
+        'open_until': 0.0,
+        'consecutive_blocks': 0,
+        'times_opened': 0,
+        'total_blocks': 0,
+        'total_success': 0,
+        'profile_index': 0,
+        'last_block_reason': None,
+        'last_success': None,
+    }
+
+
+class DomainHealth:
+    """
+    Status per domain: circuit breaker (closed -> open -> half_open -> closed) dan profil aktif.
+
+    - allow(url): False selama circuit terbuka; setelah cool-down satu request "probe" diizinkan
+    - record_block(url, reason) / record_success(url): umpan balik dari scraper
+    - profile(url): user agent + opsi context yang sedang dipakai untuk domain tersebut
+    """
+
+    def __init__(self, path=DOMAIN_HEALTH_FILE, failure_threshold=FAILURE_THRESHOLD,
+                 base_cooldown_s=BASE_COOLDOWN_S, max_cooldown_s=MAX_COOLDOWN_S):
+        self.path = path
+        self.failure_threshold = failure_threshold
+        self.base_cooldown_s = base_cooldown_s
+        self.max_cooldown_s = max_cooldown_s
+        self._lock = threading.Lock()
+        self._domains = {}
+        self._file = SharedJsonFile(path, indent=2) if path else None
+        self._refresh()
+
+    def _refresh(self):
+        """Muat ulang status dari file jika proses lain sudah mengubahnya."""
+        if self._file is None or not self._file.changed():
+            return
+        try:
+            self._domains = self._file.load() or {}
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: {self.path} tidak terbaca ({e}), status domain dimulai dari kosong.")
+
+    @contextlib.contextmanager
+    def _updating(self):
+        """Baca-gabung-tulis: status terbaru dari disk, perubahan diterapkan, lalu disimpan."""
+        with self._lock, (self._file.lock() if self._file else contextlib.nullcontext()):
+            self._refresh()
+            yield
+            if self._file is not None:
+                self._file.save(self._domains)
+
+    def _state(self, url):
+        return self._domains.setdefault(domain_of(url), _new_state())
+
+    def allow(self, url):
+        """True jika domain boleh di-scrape sekarang. Circuit yang cool-down-nya habis menjadi half_open."""
+        with self._lock:
+            self._refresh()
+            state = self._domains.get(domain_of(url))
+            if not state or state['circuit'] != OPEN:
+                return True
+            if time.time() < state['open_until']:
+                return False
+        with self._updating():
+            state = self._state(url)
+            if state['circuit'] == OPEN and time.time() >= state['open_until']:
+                state['circuit'] = HALF_OPEN
+                print(f"[health] {domain_of(url)}: cool-down selesai, mencoba satu request (half-open).")
+            return state['circuit'] != OPEN
+
+    def blocked_until(self, url):
+        """Epoch detik saat circuit domain boleh dicoba lagi, atau None jika tidak terblokir."""
+        with self._lock:
+            self._refresh()
+            state = self._domains.get(domain_of(url))
+            if state and state['circuit'] == OPEN and time.time() < state['open_until']:
+                return state['open_until']
+            return None
+
+    def record_block(self, url, reason):
+        """Catat blokir: rotasi profil, dan buka circuit setelah ambang (cool-down eksponensial)."""
+        with self._updating():
+            state = self._state(url)
+            state['consecutive_blocks'] += 1
+            state['total_blocks'] += 1
+            state['last_block_reason'] = reason
+            state['profile_index'] = (state['profile_index'] + 1) % (len(USER_AGENTS) * len(CONTEXT_PROFILES))
+
+            if state['circuit'] == HALF_OPEN or state['consecutive_blocks'] >= self.failure_threshold:
+                cooldown = min(self.max_cooldown_s, self.base_cooldown_s * (2 ** state['times_opened']))
+                state['circuit'] = OPEN
+                state['open_until'] = time.time() + cooldown
+                state['times_opened'] += 1
+                print(f"[health] {domain_of(url)}: {state['consecutive_blocks']} blokir berturut-turut ({reason}). "
+                      f"Circuit dibuka selama {cooldown / 60:.0f} menit.")
+            else:
+                print(f"[health] {domain_of(url)}: blokir ({reason}), ganti profil browser "
+                      f"({state['consecutive_blocks']}/{self.failure_threshold}).")
+
+    def record_success(self, url):
+        with self._updating():
+            state = self._state(url)
+            if state['circuit'] != CLOSED:
+                print(f"[health] {domain_of(url)}: pulih, circuit ditutup.")
+            state.update(circuit=CLOSED, open_until=0.0, consecutive_blocks=0, times_opened=0,
+                         last_success=time.strftime('%Y-%m-%dT%H:%M:%S'))
+            state['total_success'] += 1
+
+    def profile(self, url):
+        """Opsi browser context untuk domain: user_agent + viewport/locale/timezone_id."""
+        with self._lock:
+            self._refresh()
+            index = self._domains.get(domain_of(url), _new_state())['profile_index']
+        return {'user_agent': USER_AGENTS[index % len(USER_AGENTS)],
+                **CONTEXT_PROFILES[(index // len(USER_AGENTS)) % len(CONTEXT_PROFILES)]}
+
+    def needs_state_refresh(self, url, state_file):
+        """True jika sesi tersimpan perlu diganti: blokir berulang atau file state terlalu tua."""
+        with self._lock:
+            self._refresh()
+            blocks = self._domains.get(domain_of(url), _new_state())['consecutive_blocks']
+        if blocks >= STALE_AFTER_BLOCKS:
+            return True
+        return os.path.exists(state_file) and time.time() - os.path.getmtime(state_file) > STATE_MAX_AGE_S
+
+    def snapshot(self):
+        with self._lock:
+            self._refresh()
+            return {domain: dict(state) for domain, state in self._domains.items()}
+
+
+_HEALTH = {}
+_HEALTH_LOCK = threading.Lock()
+
+
+def get_domain_health(path=DOMAIN_HEALTH_FILE):
+    """Satu DomainHealth per file, dipakai bersama scraper dan scheduler dalam proses yang sama."""
+    with _HEALTH_LOCK:
+        if path not in _HEALTH:
+            _HEALTH[path] = DomainHealth(path)
+        return _HEALTH[path]
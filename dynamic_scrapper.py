@@ -1,29 +1,143 @@
-from pydantic import ValidationError
-from google import genai
-from google.genai import types
+from pydantic import BaseModel, ValidationError
 import os
+import re
 import sys
 import time
 import json
+import asyncio
+import contextvars
 import importlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+import requests
+from urllib.parse import urlparse
+# google-genai, Playwright, pandas dan pyarrow diimpor di dalam method yang memakainya:
+# scheduler/worker/CLI yang hanya melewati jalur HTTP atau cache tidak membayar ~1 detik impor.
 
 try:
     config_module = importlib.import_module("scraper_config")
     TARGET_SCHEMA = config_module.TARGET_SCHEMA # Sekarang UniversalOutputV27
-    pd = config_module.pd 
+    schema_adapter = config_module.schema_adapter
 except ImportError as e:
     print(f"ERROR: Gagal mengimpor konfigurasi dari scraper_config.py: {e}")
     sys.exit(1)
 
+from extraction_cache import ExtractionCache, make_cache_key, DEFAULT_CACHE_FILE, DEFAULT_TTL_SECONDS, DEFAULT_MAX_ENTRIES
+from site_adapters import find_adapter
+from template_induction import (get_template_store, parse_html, dom_fingerprint, build_template_prompt,
+                                apply_template, agreement, drift_reason, non_empty_lists,
+                                ExtractionTemplate, TEMPLATE_FILE, TEMPLATE_ERRORS, MIN_AGREEMENT)
+import browser_service
+import telemetry
+from domain_health import get_domain_health, DOMAIN_HEALTH_FILE
+from extraction_broker import (get_broker, get_client, DEFAULT_RPM, DEFAULT_TPM, DEFAULT_MAX_IN_FLIGHT,
+                               DEFAULT_BATCH_TIMEOUT_S)
+from stream_extraction import StreamingExtraction, DEFAULT_MAX_OUTPUT_TOKENS
+from http_fetcher import get_shared_fetcher, has_forecast_content, html_to_texts, FETCH_STATE_FILE, TIER_HTTP, TIER_BROWSER
+from page_profiles import get_profile, install_blocking, install_blocking_async, settle, settle_async
+from text_reducer import (reduce_page_text, split_into_chunks, truncate_to_budget, estimate_tokens,
+                          DEFAULT_TOKEN_BUDGET, DEFAULT_CHUNK_THRESHOLD_TOKENS, DEFAULT_CHUNK_TOKENS)
+
 STORAGE_STATE_FILE = "playwright_state_v27.json" 
 
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+BROWSER_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--no-sandbox',
+    '--disable-http2', 
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--single-process'
+]
+
+# Selector Monthly Weather.com: MonthlyContent
+MONTHLY_SELECTOR = "//div[contains(@class, 'MonthlyContent') or contains(@class, 'Monthly--forecast')]"
+# Gabungkan dengan selector situs lain
+COMBINED_SELECTOR = f"{MONTHLY_SELECTOR} | //div[contains(@class, 'DailyContent') or contains(@class, 'HourlyContent') or contains(@class, 'table-responsive') or contains(@class, 'forecast-container')]"
+
+# Jumlah browser context yang dipakai bersamaan oleh scrape_many()
+DEFAULT_CONCURRENCY = 4
+
+MODEL_NAME = 'gemini-2.5-flash'
+
+PROMPT_TEMPLATE = (
+    "Anda adalah mesin ekstraksi data cuaca. Tugas Anda adalah memproses seluruh teks halaman web dan memetakannya ke dalam skema JSON hierarkis.\n\n"
+    "Instruksi Kritis (Multiple Time Forecast):\n"
+    "1. Identifikasi lokasi induk (Kota/Daerah) dan masukkan ke **'parent_location'**.\n"
+    "2. **Ekstrak SEMUA jenis prakiraan cuaca yang ditemukan di halaman, dan masukkan ke field yang sesuai.**\n"
+    "3. **Prakiraan Harian (Daily)**: Jika ada, masukkan ke **'all_locations_forecast'**. (Ini termasuk multi-lokasi atau ringkasan harian lokasi tunggal).\n"
+    "4. **Prakiraan Per Jam (Hourly)**: Jika ada, ekstrak dan **KELOMPOKKAN** data per jam tersebut berdasarkan hari (e.g., Thursday, Friday) ke dalam list **'hourly_forecasts_grouped'**.\n"
+    "5. **Prakiraan Bulanan (Monthly)**: Jika ada, ekstrak ke list **'monthly_forecasts'**.\n"
+    "6. Jika suatu jenis prakiraan tidak ditemukan, **maka list tersebut harus kosong `[]`**.\n"
+    "7. Jika suatu field tidak ditemukan (selain list), tetapkan nilainya sebagai 'N/A'.\n\n"
+    "--- URL Target ---\n"
+    "{url}\n"
+    "--- SELURUH Teks Mentah dari Halaman Web ---\n"
+    "{page_text}\n"
+)
+
+# Cache ekstraksi dipakai bersama oleh semua scraper dalam satu proses (per path file)
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_extraction_cache(path=DEFAULT_CACHE_FILE, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+    with _CACHES_LOCK:
+        if path not in _CACHES:
+            _CACHES[path] = ExtractionCache(path, ttl_seconds=ttl_seconds, max_entries=max_entries)
+        return _CACHES[path]
+
 class AIScraperContext:
-    def __init__(self, target_url): 
+    def __init__(self, target_url=None): 
         self.target_url = target_url
         self.TargetSchema = TARGET_SCHEMA
         self.scraper_name = "Universal_V27_Monthly"
+        # Cache hasil Gemini (None = nonaktif)
+        self.cache_path = DEFAULT_CACHE_FILE
+        self.cache_ttl_seconds = DEFAULT_TTL_SECONDS
+        self.cache_max_entries = DEFAULT_MAX_ENTRIES
+        # Batas token teks per permintaan Gemini (None = tanpa batas); di mode chunk berlaku per chunk
+        self.token_budget = DEFAULT_TOKEN_BUDGET
+        # Mode chunk paralel untuk halaman besar (None = nonaktif)
+        self.chunk_threshold_tokens = DEFAULT_CHUNK_THRESHOLD_TOKENS
+        self.chunk_max_tokens = DEFAULT_CHUNK_TOKENS
+        self.chunk_concurrency = 4
+        # Penyimpanan: 'parquet' (dataset terpartisi di store_root) atau 'csv' (JSON+CSV bertimestamp)
+        self.storage_format = "parquet"
+        self.store_root = None  # None = forecast_storage.DEFAULT_STORE_ROOT (pyarrow dimuat saat menyimpan)
+        # Mode incremental (parquet): hanya tulis nilai prakiraan yang baru/berubah sejak run terakhir
+        self.incremental = True
+        # Alamat browser_service (host:port). Jika diisi, browser hangat dipinjam via
+        # connect_over_cdp alih-alih meluncurkan Chromium baru per job.
+        self.browser_service = None
+        # True: scrape()/scrape_many() mengembalikan model TargetSchema (tanpa model_dump()),
+        # cukup untuk save_results(); False: list dict seperti sebelumnya
+        self.return_models = False
+        # Tier HTTP statis (requests.Session bersama + ETag/If-Modified-Since) sebelum Playwright.
+        # State validator dan tier per domain disimpan di fetch_state_file (None = tidak disimpan).
+        self.http_tier = True
+        self.fetch_state_file = FETCH_STATE_FILE
+        # Broker Gemini bersama: rate limit RPM/TPM, request in-flight, retry 429/5xx.
+        # gemini_batch_mode=True mengumpulkan halaman ke batch job offline (untuk run malam);
+        # batch yang belum selesai setelah gemini_batch_timeout_s dibatalkan dan diganti request online.
+        # rpm/tpm/max_in_flight adalah kuota per API key: semua context dalam proses harus sama.
+        self.gemini_rpm = DEFAULT_RPM
+        self.gemini_tpm = DEFAULT_TPM
+        self.gemini_max_in_flight = DEFAULT_MAX_IN_FLIGHT
+        self.gemini_batch_mode = False
+        self.gemini_batch_timeout_s = DEFAULT_BATCH_TIMEOUT_S
+        # Respons streaming (generate_content_stream): item divalidasi saat kurung tutupnya tiba,
+        # stream dihentikan saat pelanggaran skema, loop entri duplikat, atau melewati batas token
+        self.gemini_stream = False
+        self.gemini_stream_max_tokens = DEFAULT_MAX_OUTPUT_TOKENS
+        # Kesehatan per domain: circuit breaker + cool-down setelah blokir berulang, rotasi
+        # user agent/profil context, dan penggantian sesi basi (None = nonaktif)
+        self.domain_health_file = DOMAIN_HEALTH_FILE
+        # Template ekstraksi per layout DOM: XPath hasil induksi Gemini, divalidasi terhadap
+        # ekstraksi LLM-nya sendiri, lalu dipakai lokal untuk halaman berlayout sama (None = nonaktif)
+        self.template_file = TEMPLATE_FILE
         
 class UniversalScraperV27:
     
@@ -31,169 +145,811 @@ class UniversalScraperV27:
         api_key = os.environ.get("GEMINI_API_KEY")
         if not api_key:
             raise EnvironmentError("GEMINI_API_KEY tidak ditemukan. Harap atur environment variable Anda.")
-            
-        self.client = genai.Client(api_key=api_key)
+
+        self.client = get_client(api_key)
         self.context = context
+        self.broker = get_broker(
+            self.client, MODEL_NAME,
+            rpm=context.gemini_rpm, tpm=context.gemini_tpm,
+            max_in_flight=context.gemini_max_in_flight, batch_mode=context.gemini_batch_mode,
+            batch_timeout_s=context.gemini_batch_timeout_s,
+        )
+        self.last_browser_startup_s = None
+        self.last_page_latency_s = None
+        self.last_timings = None
+        self.page_timings = {}
+        self.not_modified_urls = set()  # URL yang dijawab 304 pada run ini
+        # Validator ETag/Last-Modified tier HTTP yang baru disimpan setelah hasilnya tersimpan
+        # (save_results); jika penyimpanan gagal, run berikutnya mengambil ulang halaman utuh
+        self._pending_fetches = {}  # url -> (fetcher, FetchResult)
+        self._pending_lock = threading.Lock()
+        self.health = get_domain_health(context.domain_health_file) if context.domain_health_file else None
+        self.templates = get_template_store(context.template_file) if context.template_file else None
+        self.cache = None
+        if context.cache_path:
+            self.cache = get_extraction_cache(context.cache_path, context.cache_ttl_seconds, context.cache_max_entries)
 
     def _clean_text(self, text):
         if not text: return ""
         text = text.replace('\n', ' ').replace('\t', ' ').replace('  ', ' ')
         return " ".join(text.split()).strip()
 
+    def _reduce_text(self, region_texts, body_text):
+        """Reduksi teks halaman (area prakiraan + buang boilerplate + anggaran token).
+
+        Baris dipertahankan agar teks masih bisa dipecah per tanggal di mode chunk. Di mode
+        chunk teks tidak dipotong di sini: anggaran token diterapkan per chunk (_extract_page).
+        """
+        before = self._clean_text(body_text)
+        token_budget = None if self.context.chunk_threshold_tokens else self.context.token_budget
+        reduced, region_count = reduce_page_text(region_texts, body_text, token_budget)
+        after = self._clean_text(reduced)
+        print(f"Reduksi teks ({region_count} area prakiraan): {len(before)} -> {len(after)} karakter, "
+              f"~{estimate_tokens(before)} -> ~{estimate_tokens(after)} token.")
+        return reduced
+
+    def _build_prompt(self, text_raw_full_page, url):
+        return PROMPT_TEMPLATE.format(url=url, page_text=text_raw_full_page)
+
+    def _extract_model(self, text_raw_full_page, url):
+        """Ekstraksi via Gemini (dengan cache). Mengembalikan instance TargetSchema."""
+        TargetSchema = self.context.TargetSchema
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_cache_key(text_raw_full_page, PROMPT_TEMPLATE, MODEL_NAME, TargetSchema, url)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                try:
+                    cached_model = schema_adapter(TargetSchema).validate_json(cached)
+                except ValidationError:
+                    print("Warning: entri cache tidak valid, memanggil Gemini ulang.")
+                    self.cache.invalidate(cache_key)  # satu lookup = satu miss, bukan hit + miss
+                else:
+                    print("Cache hit: konten halaman tidak berubah, Gemini dilewati.")
+                    telemetry.inc('extraction_cache_total', result='hit')
+                    return cached_model
+
+        if cache_key:
+            telemetry.inc('extraction_cache_total', result='miss')
+        prompt = self._build_prompt(text_raw_full_page, url)
+
+        from google.genai.errors import APIError
+        complete = True
+        try:
+            if self.context.gemini_stream:
+                validated_data, complete = self._extract_streaming(prompt, url)
+            else:
+                with telemetry.span('llm_extract', url=url, prompt_chars=len(prompt)):
+                    # Lewat broker: antri sesuai rate limit, retry 429/5xx dengan backoff
+                    response_text = self.broker.generate(prompt, TargetSchema, estimate_tokens(prompt))
+                with telemetry.span('validate', url=url):
+                    # Validasi langsung dari teks JSON (tanpa json.loads -> dict perantara)
+                    validated_data = schema_adapter(TargetSchema).validate_json(response_text)
+
+        except (APIError, ValidationError) as e:
+            print(f"!!! Error API/JSON Validation: {type(e).__name__}. Mengembalikan default.")
+            telemetry.inc('extraction_default_fallback_total', reason=type(e).__name__)
+            return TargetSchema.default_data(url)
+
+        # Hanya hasil lengkap yang berisi data yang disimpan ke cache
+        if cache_key and complete and (validated_data.all_locations_forecast or validated_data.hourly_forecasts_grouped or validated_data.monthly_forecasts):
+            self.cache.set(cache_key, validated_data.model_dump_json())
+        return validated_data
+
+    def _extract_streaming(self, prompt, url):
+        """Ekstraksi via stream Gemini. Mengembalikan (model TargetSchema, True jika respons lengkap)."""
+        TargetSchema = self.context.TargetSchema
+
+        def on_item(field, item):
+            name = getattr(item, 'location_name', None) or getattr(item, 'date_day_name', None) \
+                or getattr(item, 'date_month_day', None)
+            print(f"[stream] {field}: {name} diterima ({stream.first_record_s:.2f}s item pertama).")
+
+        stream = StreamingExtraction(TargetSchema, on_item=on_item,
+                                     max_output_tokens=self.context.gemini_stream_max_tokens)
+        with telemetry.span('llm_extract', url=url, prompt_chars=len(prompt), stream=True):
+            self.broker.generate_stream(prompt, TargetSchema, estimate_tokens(prompt), stream)
+        with telemetry.span('validate', url=url):
+            result = stream.result(url)
+        stats = stream.stats()
+        first = stats['time_to_first_record_s']
+        print(f"Stream selesai: item pertama {'-' if first is None else f'{first:.2f}s'}, "
+              f"{stats['output_tokens']} token output ({stats['wasted_tokens']} terbuang)"
+              f"{', dihentikan: ' + stats['abort_reason'] if stats['abort_reason'] else ''}.")
+        return result, stream.complete
+
     def _extract_data_ai(self, text_raw_full_page, url):
         """Zero-Shot Prompting: Fokus pada Multiple Time Forecast (Daily, Hourly, Monthly)."""
-        
+        return self._extract_model(text_raw_full_page, url).model_dump()
+
+    def _extract_page(self, page_text, url):
+        """
+        Ekstraksi satu halaman (mengembalikan model TargetSchema). Halaman besar dipecah
+        menjadi chunk per tanggal yang diekstrak paralel lalu digabung dengan
+        TargetSchema.merge(); chunk yang gagal hanya menghilangkan bagiannya sendiri.
+        """
+        threshold, token_budget = self.context.chunk_threshold_tokens, self.context.token_budget
+        if not threshold or estimate_tokens(page_text) <= threshold:
+            return self._extract_model(self._clean_text(truncate_to_budget(page_text, token_budget)), url)
+
+        chunk_tokens = self.context.chunk_max_tokens
+        if token_budget is not None:
+            chunk_tokens = min(chunk_tokens, token_budget)
+        chunks = split_into_chunks(page_text, chunk_tokens)
+        if len(chunks) == 1:
+            return self._extract_model(self._clean_text(chunks[0]), url)
+
+        print(f"Mode chunk: {len(chunks)} chunk, diekstrak paralel (maks {self.context.chunk_concurrency}).")
+
+        def extract_chunk(indexed_chunk):
+            i, chunk = indexed_chunk
+            text = f"[Bagian {i + 1}/{len(chunks)} dari halaman yang sama] {self._clean_text(chunk)}"
+            try:
+                return self._extract_model(text, url)
+            except Exception as e:
+                print(f"!!! Chunk {i + 1} gagal: {e}")
+                return self.context.TargetSchema.default_data(url)
+
+        with ThreadPoolExecutor(max_workers=max(1, self.context.chunk_concurrency)) as executor:
+            # copy_context: span chunk tetap menjadi anak span halaman
+            futures = [executor.submit(contextvars.copy_context().run, extract_chunk, item) for item in enumerate(chunks)]
+            parts = [future.result() for future in futures]
+
+        gagal = sum(1 for part in parts if not (part.all_locations_forecast or part.hourly_forecasts_grouped or part.monthly_forecasts))
+        if gagal:
+            print(f"Warning: {gagal}/{len(chunks)} chunk tidak menghasilkan data.")
+        return self.context.TargetSchema.merge(parts, url)
+
+    def cache_stats(self):
+        """Statistik cache ekstraksi (hits, misses, hit_rate, entries), atau None jika nonaktif."""
+        return self.cache.stats() if self.cache is not None else None
+
+    def _print_cache_stats(self):
+        stats = self.cache_stats()
+        if stats:
+            print(f"Cache ekstraksi: {stats['hits']} hit, {stats['misses']} miss "
+                  f"(hit rate {stats['hit_rate']:.0%}, {stats['entries']} entri).")
+        if self.templates is not None:
+            templates = self.templates.stats()
+            if templates['layouts']:
+                print(f"Template layout: {templates['active']} aktif, {templates['rejected']} ditolak, "
+                      f"{templates['uses']} halaman diekstrak tanpa LLM.")
+        broker = self.broker.metrics()
+        if broker['completed'] or broker['failed']:
+            print(f"Broker Gemini: {broker['completed']} sukses, {broker['failed']} gagal, {broker['retries']} retry, "
+                  f"antrian {broker['queue_depth']}, {broker['pages_per_min']:.1f} halaman/menit.")
+
+    def _record_timings(self, url, timings):
+        """Simpan & cetak durasi per fase (navigate, settle, extract, process) untuk satu URL."""
+        self.page_timings[url] = timings
+        self.last_timings = timings
+        for phase, seconds in timings.items():
+            if isinstance(seconds, float):
+                telemetry.record_span(phase, seconds, url=url)
+        telemetry.inc('blocked_requests_total', timings.get('blocked_requests', 0))
+        detail = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in timings.items() if isinstance(seconds, float))
+        print(f"Timing {url}: {detail} (request diblokir: {timings.get('blocked_requests', 0)}).")
+
+    def _context_options(self, lease=None, url=None, fresh_session=False):
+        """Opsi browser context (user agent + state persisten V27).
+
+        Jika browser dipinjam dari browser_service, storage state diambil dari memori service.
+        Dengan url, user agent/viewport/locale mengikuti profil domain yang sedang aktif;
+        fresh_session=True memulai sesi baru tanpa storage state lama.
+        """
+        if self.health and url:
+            context_options = self.health.profile(url)
+        else:
+            context_options = {
+                'user_agent': USER_AGENT
+            }
+
+        if fresh_session:
+            print(f"Sesi {STORAGE_STATE_FILE} dianggap basi untuk {url}. Membuat sesi baru.")
+        elif lease and lease.get('storage_state'):
+            context_options['storage_state'] = lease['storage_state']
+        elif os.path.exists(STORAGE_STATE_FILE):
+            print(f"Menggunakan sesi persisten dari: {STORAGE_STATE_FILE}")
+            context_options['storage_state'] = STORAGE_STATE_FILE
+        else:
+            print("Membuat sesi baru (state file tidak ditemukan).")
+        return context_options
+
+    def _session_is_stale(self, url):
+        return bool(self.health) and self.health.needs_state_refresh(url, STORAGE_STATE_FILE)
+
+    def _save_session(self, storage_state):
+        """Simpan sesi baru ke STORAGE_STATE_FILE dan beri tahu browser_service (jika dipakai)."""
+        with open(STORAGE_STATE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(storage_state, f)
+        print(f"Sesi baru disimpan ke {STORAGE_STATE_FILE}.")
+        if self.context.browser_service:
+            try:
+                browser_service.refresh_state(self.context.browser_service)
+            except (OSError, RuntimeError, ValueError) as e:
+                print(f"Warning: browser_service gagal memuat ulang sesi: {e}")
+
+    def _record_block(self, url, reason):
+        """Blokir hanya dicatat dari tier browser; kegagalan tier HTTP cukup dieskalasi ke browser."""
+        telemetry.inc('page_blocked_total', reason=reason)
+        if self.health:
+            self.health.record_block(url, reason)
+
+    def _extraction_failed(self, url, error, prefix=""):
+        """Error setelah halaman termuat (Gemini, parser stream, penyimpanan): bukan blokir domain."""
+        print(f"{prefix}Error ekstraksi pada {url}: {type(error).__name__}: {error}")
+        telemetry.inc('extraction_error_total', error=type(error).__name__)
+        return []
+
+    def _record_outcome(self, url, result):
+        if self.health and result:
+            self.health.record_success(url)
+
+    def _allowed(self, url):
+        """False jika circuit domain URL sedang terbuka (cool-down): lewati tanpa browser/AI."""
+        if not self.health or self.health.allow(url):
+            return True
+        print(f"Lewati {url}: domain dalam cool-down setelah blokir berulang.")
+        telemetry.inc('page_skipped_total', reason='circuit_open')
+        return False
+
+    def _run_adapter(self, adapter, html, url):
+        """Jalankan adapter situs dan validasi hasilnya. Mengembalikan [hasil] atau None."""
         TargetSchema = self.context.TargetSchema
-        
-        prompt = (
-            "Anda adalah mesin ekstraksi data cuaca. Tugas Anda adalah memproses seluruh teks halaman web dan memetakannya ke dalam skema JSON hierarkis.\n\n"
-            "Instruksi Kritis (Multiple Time Forecast):\n"
-            "1. Identifikasi lokasi induk (Kota/Daerah) dan masukkan ke **'parent_location'**.\n"
-            "2. **Ekstrak SEMUA jenis prakiraan cuaca yang ditemukan di halaman, dan masukkan ke field yang sesuai.**\n"
-            "3. **Prakiraan Harian (Daily)**: Jika ada, masukkan ke **'all_locations_forecast'**. (Ini termasuk multi-lokasi atau ringkasan harian lokasi tunggal).\n"
-            "4. **Prakiraan Per Jam (Hourly)**: Jika ada, ekstrak dan **KELOMPOKKAN** data per jam tersebut berdasarkan hari (e.g., Thursday, Friday) ke dalam list **'hourly_forecasts_grouped'**.\n"
-            "5. **Prakiraan Bulanan (Monthly)**: Jika ada, ekstrak ke list **'monthly_forecasts'**.\n"
-            "6. Jika suatu jenis prakiraan tidak ditemukan, **maka list tersebut harus kosong `[]`**.\n"
-            "7. Jika suatu field tidak ditemukan (selain list), tetapkan nilainya sebagai 'N/A'.\n\n"
-            "--- URL Target ---\n"
-            f"{url}\n"
-            "--- SELURUH Teks Mentah dari Halaman Web ---\n"
-            f"{text_raw_full_page}\n"
-        )
+        try:
+            result = adapter(html, url)
+            if result is None:
+                print(f"Adapter {adapter.__name__} tidak menemukan data, fallback ke AI.")
+                return None
+            validated = TargetSchema.model_validate(result)
+        except ValidationError as e:
+            print(f"Adapter {adapter.__name__} gagal validasi ({e.error_count()} error), fallback ke AI.")
+            return None
+        except Exception as e:
+            print(f"Adapter {adapter.__name__} error: {e}. Fallback ke AI.")
+            return None
 
+        if not (validated.all_locations_forecast or validated.hourly_forecasts_grouped or validated.monthly_forecasts):
+            print(f"Adapter {adapter.__name__} menghasilkan data kosong, fallback ke AI.")
+            return None
+
+        print(f"Sukses (adapter {adapter.__name__}, tanpa AI): {len(validated.all_locations_forecast)} lokasi (harian).")
+        telemetry.inc('extraction_total', method='adapter', result='success')
+        return [validated]
+
+    def _page_layout(self, html, url):
+        """(dokumen lxml, fingerprint layout) untuk mode template, atau (None, None)."""
+        if self.templates is None or not html:
+            return None, None
+        doc = parse_html(html)
+        if doc is None:
+            return None, None
+        return doc, dom_fingerprint(doc, url)
+
+    def _run_template(self, doc, fingerprint, url):
+        """Ekstraksi lokal dengan template layout. Model TargetSchema, atau None (belum ada / drift)."""
+        template = self.templates.template(fingerprint)
+        if template is None:
+            telemetry.inc('template_total', result='miss')
+            return None
         try:
+            with telemetry.span('template_extract', url=url):
+                data = apply_template(template, doc, url)
+                validated = self.context.TargetSchema.model_validate(data)
+            reason = drift_reason(data, self.templates.expected_lists(fingerprint))
+        except (ValidationError, *TEMPLATE_ERRORS) as e:
+            reason = type(e).__name__
+        if reason is None:
+            telemetry.inc('template_total', result='hit')
+            return validated
 
-            response = self.client.models.generate_content(
-                model='gemini-2.5-flash',
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema=TargetSchema, 
-                    temperature=0.0 
-                ),
-            )
-            data_dict = json.loads(response.text)
-            validated_data = TargetSchema.model_validate(data_dict)
-            return validated_data.model_dump()
+        dropped = self.templates.record_failure(fingerprint, reason)
+        print(f"Template {fingerprint} tidak cocok ({reason}){', dibuang' if dropped else ''}. Fallback ke AI.")
+        telemetry.inc('template_total', result='drift')
+        return None
 
-        except (genai.errors.APIError, json.JSONDecodeError, ValidationError) as e:
-            print(f"!!! Error API/JSON Validation: {type(e).__name__}. Mengembalikan default.")
-            return TargetSchema.default_data(url).model_dump()
+    def _induce_template(self, doc, fingerprint, url, extracted):
+        """Minta Gemini menulis XPath untuk layout ini, lalu uji pada halaman yang sama terhadap `extracted`."""
+        if not self.templates.begin_induction(fingerprint):
+            return
+        from google.genai.errors import APIError
 
-    # ... (_human_like_interaction sama) ...
-    def _human_like_interaction(self, page):
-        """Simulasi interaksi manusia (scroll) untuk anti-bot."""
-        print("Melakukan interaksi simulasi manusia (scroll acak)...")
+        expected = extracted.model_dump()
+        template, score = None, 0.0
         try:
-            scroll_count = 5
-            for i in range(scroll_count):
-                page.evaluate(f"window.scrollBy(0, 500*{i})")
-                time.sleep(1) 
-            page.evaluate("window.scrollTo(0, 0)")
-            time.sleep(2) 
-            print("Simulasi interaksi selesai.")
-        except Exception as e:
-            print(f"Warning: Interaksi gagal, melanjutkan. Error: {e}")
+            prompt = build_template_prompt(doc, url, expected)
+            with telemetry.span('template_induce', url=url, prompt_chars=len(prompt)):
+                response_text = self.broker.generate(prompt, ExtractionTemplate, estimate_tokens(prompt))
+            template = schema_adapter(ExtractionTemplate).validate_json(response_text)
+            score = agreement(expected, apply_template(template, doc, url))
+        except (APIError, ValidationError, *TEMPLATE_ERRORS) as e:
+            print(f"Induksi template gagal: {type(e).__name__}.")
+        finally:
+            accepted = self.templates.finish_induction(fingerprint, url, template, score, non_empty_lists(expected))
+
+        telemetry.inc('template_total', result='induced' if accepted else 'rejected')
+        if accepted:
+            print(f"Template layout {fingerprint} disimpan (kecocokan {score:.0%} dengan hasil AI). "
+                  f"Halaman berlayout sama berikutnya diekstrak tanpa LLM.")
+        else:
+            print(f"Template layout {fingerprint} ditolak (kecocokan {score:.0%} < {MIN_AGREEMENT:.0%}).")
+
+    def _try_static_tier(self, url):
+        """
+        Tier ringan tanpa browser: GET kondisional lewat session bersama, lalu adapter situs
+        atau ekstraksi AI dari HTML statis.
+
+        Returns:
+            list: hasil (termasuk [] untuk 304 Not Modified, pipeline berhenti tanpa AI)
+            None: HTML statis tidak memuat prakiraan / fetch gagal -> lanjut ke Playwright
+        """
+        if not self.context.http_tier:
+            return None
+        fetcher = get_shared_fetcher(self.context.fetch_state_file, USER_AGENT)
+        if fetcher.preferred_tier(url) == TIER_BROWSER:
+            return None
+
+        print(f"Tier HTTP: mengambil HTML statis {url}...")
+        start = time.perf_counter()
+        try:
+            with telemetry.span('http_fetch', url=url):
+                fetched = fetcher.fetch(url)
+        except requests.exceptions.RequestException as e:
+            print(f"Fetch statis gagal ({e}), lanjut dengan browser.")
+            telemetry.inc('http_tier_total', result='error')
+            return None
+
+        if fetched.not_modified:
+            print(f"304 Not Modified: {url} tidak berubah sejak run terakhir. Pipeline selesai tanpa AI.")
+            self.not_modified_urls.add(url)
+            telemetry.inc('http_tier_total', result='not_modified')
+            return []
+
+        adapter = find_adapter(url)
+        result = self._run_adapter(adapter, fetched.html, url) if adapter else None
+        if not result and has_forecast_content(fetched.html, COMBINED_SELECTOR):
+            region_texts, body_text = html_to_texts(fetched.html, COMBINED_SELECTOR)
+            result = self._process_page_text(self._reduce_text(region_texts, body_text), url,
+                                             None if adapter else fetched.html, report_block=False)
+        elif not result:
+            print("HTML statis tidak memuat area prakiraan (butuh JavaScript). Domain diingat untuk tier browser.")
+            fetcher.remember_tier(url, TIER_BROWSER)
+            telemetry.inc('http_tier_total', result='escalate')
+            return None
+
+        if not result:
+            telemetry.inc('http_tier_total', result='escalate')
+            return None
+        telemetry.inc('http_tier_total', result='success')
+        with self._pending_lock:
+            self._pending_fetches[url] = (fetcher, fetched)
+        fetcher.remember_tier(url, TIER_HTTP)
+        print(f"Tier HTTP selesai dalam {time.perf_counter() - start:.2f}s.")
+        return result
+
+    def _process_page_text(self, full_page_text, url, html=None, report_block=True):
+        """Kirim teks halaman ke AI dan kembalikan [hasil] atau [] jika gagal.
+
+        Jika html diberikan dan ada adapter untuk domain URL, adapter dicoba lebih dulu, lalu
+        template layout (jika sudah diinduksi). Tanpa template, hasil AI dipakai untuk menginduksinya.
+        report_block=False: teks singkat tidak dicatat sebagai blokir domain (tier HTTP
+        masih akan dieskalasi ke browser).
+        """
+        adapter = find_adapter(url)
+        if html and adapter is not None:
+            result = self._run_adapter(adapter, html, url)
+            if result:
+                return result
+
+        telemetry.observe('page_text_chars', len(full_page_text))
+        if len(full_page_text) < 500:
+            print("Teks konten halaman terlalu singkat. Mungkin pemblokiran.")
+            if report_block:
+                self._record_block(url, 'short_text')
+            return []
+            
+        doc, fingerprint = self._page_layout(html, url)
+        revalidate = None
+        if fingerprint:
+            templated = self._run_template(doc, fingerprint, url)
+            if templated is not None:
+                if not self.templates.record_use(fingerprint):
+                    print(f"Sukses (template layout {fingerprint}, tanpa AI): {len(templated.all_locations_forecast)} lokasi (harian), "
+                          f"{len(templated.hourly_forecasts_grouped)} grup jam, {len(templated.monthly_forecasts)} entri bulanan.")
+                    telemetry.inc('extraction_total', method='template', result='success')
+                    return [templated]
+                print(f"Validasi ulang berkala template {fingerprint} dengan AI...")
+                revalidate = templated
+
+        print(f"Mengirim {len(full_page_text)} karakter teks ke AI untuk diproses...")
+        
+        extracted = self._extract_page(full_page_text, url)
+        
+        # Cek hasil dari salah satu dari 3 list
+        if extracted.all_locations_forecast or extracted.hourly_forecasts_grouped or extracted.monthly_forecasts:
+            extracted_locs = len(extracted.all_locations_forecast)
+            extracted_groups = len(extracted.hourly_forecasts_grouped)
+            extracted_monthly = len(extracted.monthly_forecasts)
+            print(f"Sukses! Berhasil mengekstrak {extracted_locs} lokasi (harian), {extracted_groups} grup jam, dan {extracted_monthly} entri bulanan.")
+            telemetry.inc('extraction_total', method='ai', result='success')
+            if revalidate is not None:
+                score = agreement(extracted.model_dump(), revalidate.model_dump())
+                if score < MIN_AGREEMENT:
+                    self.templates.record_failure(fingerprint, 'revalidation')
+                    print(f"Template {fingerprint} menyimpang dari hasil AI (kecocokan {score:.0%}), diinduksi ulang.")
+            if fingerprint:
+                self._induce_template(doc, fingerprint, url, extracted)
+            return [extracted]
+        
+        print("AI gagal mengekstrak data dari halaman.")
+        telemetry.inc('extraction_total', method='ai', result='empty')
+        return []
 
     def scrape(self):
-        url = self.context.target_url
+        return self.scrape_url(self.context.target_url)
+
+    def scrape_url(self, url, browser=None):
+        """
+        Scrape satu URL (format keluaran sama dengan scrape()).
+
+        Args:
+            browser: browser Playwright (sync) yang sudah terbuka, e.g. browser hangat milik
+                worker_farm. None: buka browser sendiri (atau pinjam dari browser_service).
+        """
+        with telemetry.span('scrape', url=url):
+            return self._as_output(self._scrape_one(url, browser))
+
+    def _as_output(self, results):
+        """Hasil internal (model) -> format keluaran publik (dict, kecuali context.return_models)."""
+        if self.context.return_models:
+            return results
+        return [result.model_dump() for result in results]
+
+    def _scrape_one(self, url, browser=None):
         print(f"\n--- Memulai Scanning Zero-Shot Universal (V27) ---")
+        if not self._allowed(url):
+            return []
+
+        # HTML statis (adapter atau AI) tidak perlu browser; 304 berhenti tanpa Gemini
+        fast_result = self._try_static_tier(url)
+        if fast_result is not None:
+            self._record_outcome(url, fast_result)
+            self._print_cache_stats()
+            return fast_result
         
+        if browser is not None:
+            try:
+                return self._scrape_with_browser(browser, None, url)
+            finally:
+                self._print_cache_stats()
+
+        from playwright.sync_api import sync_playwright
         with sync_playwright() as p:
+            browser, lease = self._open_browser(p)
+            try:
+                return self._scrape_with_browser(browser, lease, url)
+            finally:
+                browser.close()
+                if lease:
+                    self._release_browser(lease)
+                self._print_cache_stats()
+
+    def _scrape_with_browser(self, browser, lease, url):
+        fresh_session = self._session_is_stale(url)
+        result = self._scrape_in_browser(browser, url, self._context_options(lease, url, fresh_session),
+                                         save_session=fresh_session)
+        self._record_outcome(url, result)
+        return result
+
+    def _lease_browser(self):
+        """Pinjam endpoint browser hangat dari browser_service. None jika service tidak aktif."""
+        address = self.context.browser_service
+        if not address:
+            return None
+        try:
+            return browser_service.lease_browser(address)
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"Warning: browser_service {address} tidak dapat dihubungi ({e}). Meluncurkan Chromium baru.")
+            return None
+
+    def _release_browser(self, lease, pages=1):
+        try:
+            browser_service.release_browser(lease, pages)
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"Warning: gagal mengembalikan browser ke service: {e}")
+
+    def _open_browser(self, p):
+        """Hubungkan ke browser hangat (connect_over_cdp) atau luncurkan Chromium. Mengembalikan (browser, lease)."""
+        start = time.perf_counter()
+        lease = self._lease_browser()
+        if lease:
+            browser = p.chromium.connect_over_cdp(lease['endpoint'])
+            mode = f"warm, generasi {lease['generation']}"
+        else:
             browser = p.chromium.launch(
                 headless=True, 
                 channel="chrome", 
-                args=[
-                    '--disable-blink-features=AutomationControlled',
-                    '--no-sandbox',
-                    '--disable-http2', 
-                    '--disable-setuid-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--single-process'
-                ]
+                args=BROWSER_ARGS
             )
+            mode = "cold"
+        self.last_browser_startup_s = time.perf_counter() - start
+        print(f"Browser siap dalam {self.last_browser_startup_s:.2f}s ({mode}).")
+        return browser, lease
+
+    def _scrape_in_browser(self, browser, url, context_options, save_session=False):
+        """Scrape satu URL memakai browser yang sudah terbuka (context baru yang terisolasi).
+
+        save_session=True: simpan storage state context ini jika scrape berhasil (sesi baru).
+        """
+        from playwright.sync_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+
+        # --- Load state (V27) ---
+        context = browser.new_context(**context_options)
+        page = context.new_page()
+
+        profile = get_profile(url)
+        block_stats = {}
+        install_blocking(page, profile, block_stats)
+        timings = {}
+
+        try:
+            page_start = time.perf_counter()
+            print(f"Mengakses URL (domcontentloaded, resource {'/'.join(profile['block_resource_types'])} + tracker diblokir)...")
+            page.goto(url, timeout=20000, wait_until='domcontentloaded') 
+            timings['navigate'] = time.perf_counter() - page_start
+
+            # --- TUNGGU KONTEN DINAMIS (berbasis event, dibatasi anggaran profil) ---
+            phase_start = time.perf_counter()
+            settle(page, profile, f"xpath={COMBINED_SELECTOR}", PlaywrightTimeoutError)
+            timings['settle'] = time.perf_counter() - phase_start
             
-            # --- Load state (V27) ---
-            storage_path = STORAGE_STATE_FILE
-            
-            context_options = {
-                'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            }
+            # EKSTRAKSI TEKS
+            phase_start = time.perf_counter()
+            region_texts = page.locator(f"xpath={COMBINED_SELECTOR}").all_inner_texts()
+            full_page_text = self._reduce_text(region_texts, page.locator('body').inner_text())
+            html = page.content() if find_adapter(url) or self.templates is not None else None
+            timings['extract'] = time.perf_counter() - phase_start
+            self.last_page_latency_s = time.perf_counter() - page_start
 
-            if os.path.exists(storage_path):
-                print(f"Menggunakan sesi persisten dari: {storage_path}")
-                context_options['storage_state'] = storage_path
-            else:
-                print("Membuat sesi baru (state file tidak ditemukan).")
+            phase_start = time.perf_counter()
+            result = self._process_page_text(full_page_text, url, html)
+            timings['process'] = time.perf_counter() - phase_start
+            timings['blocked_requests'] = block_stats.get('blocked', 0)
+            self._record_timings(url, timings)
+            if save_session and result:
+                self._save_session(context.storage_state())
+            return result
+        
+        except PlaywrightTimeoutError as e:
+            print(f"Error Timeout Playwright: {e}")
+            print("Halaman gagal dimuat. Coba jalankan ulang skrip ini.")
+            self._record_block(url, 'timeout')
+            return []
+        except PlaywrightError as e:
+            print(f"Error utama pada {url}: {e}")
+            print("Kemungkinan deteksi bot.")
+            self._record_block(url, 'error')
+            return []
+        except Exception as e:
+            return self._extraction_failed(url, e)
+        finally:
+            context.close()
+
+    # --- MODE BATCH (V27): banyak URL sekaligus dengan pool browser context ---
+    async def _scrape_page_async(self, browser_context, url):
+        """Scrape satu URL memakai browser context dari pool. Error diisolasi per URL."""
+        from playwright.async_api import Error as PlaywrightAsyncError, TimeoutError as PlaywrightAsyncTimeoutError
+
+        page = await browser_context.new_page()
+        profile = get_profile(url)
+        block_stats = {}
+        await install_blocking_async(page, profile, block_stats)
+        timings = {}
+
+        try:
+            print(f"[batch] Mengakses {url}")
+            page_start = time.perf_counter()
+            await page.goto(url, timeout=20000, wait_until='domcontentloaded')
+            timings['navigate'] = time.perf_counter() - page_start
+
+            phase_start = time.perf_counter()
+            await settle_async(page, profile, f"xpath={COMBINED_SELECTOR}", PlaywrightAsyncTimeoutError)
+            timings['settle'] = time.perf_counter() - phase_start
 
-            context = browser.new_context(**context_options)
-            page = context.new_page()
+            phase_start = time.perf_counter()
+            region_texts = await page.locator(f"xpath={COMBINED_SELECTOR}").all_inner_texts()
+            full_page_text = self._reduce_text(region_texts, await page.locator('body').inner_text())
+            html = await page.content() if find_adapter(url) or self.templates is not None else None
+            timings['extract'] = time.perf_counter() - phase_start
 
+            # Panggilan Gemini bersifat sinkron -> jalankan di thread agar halaman lain tetap jalan
+            phase_start = time.perf_counter()
+            result = await asyncio.to_thread(self._process_page_text, full_page_text, url, html)
+            timings['process'] = time.perf_counter() - phase_start
+            timings['blocked_requests'] = block_stats.get('blocked', 0)
+            self._record_timings(url, timings)
+            return result
+
+        except PlaywrightAsyncTimeoutError as e:
+            print(f"[batch] Error Timeout Playwright pada {url}: {e}")
+            self._record_block(url, 'timeout')
+            return []
+        except PlaywrightAsyncError as e:
+            print(f"[batch] Error utama pada {url}: {e}")
+            print("Kemungkinan deteksi bot.")
+            self._record_block(url, 'error')
+            return []
+        except Exception as e:
+            return self._extraction_failed(url, e, prefix="[batch] ")
+        finally:
+            await page.close()
+
+    async def _scrape_many_async(self, urls, concurrency):
+        from playwright.async_api import async_playwright
+
+        results = {}
+        async with async_playwright() as p:
+            lease = await asyncio.to_thread(self._lease_browser)
+            start = time.perf_counter()
+            if lease:
+                browser = await p.chromium.connect_over_cdp(lease['endpoint'])
+            else:
+                browser = await p.chromium.launch(
+                    headless=True,
+                    channel="chrome",
+                    args=BROWSER_ARGS
+                )
+            self.last_browser_startup_s = time.perf_counter() - start
+            print(f"[batch] Browser siap dalam {self.last_browser_startup_s:.2f}s ({'warm' if lease else 'cold'}).")
             try:
-                print("Mengakses URL. Menunggu 'networkidle' (90s)...")
-                page.goto(url, timeout=20000, wait_until='domcontentloaded') 
-                
+                # Pool browser context berumur panjang (dipakai ulang antar URL)
+                # Profil dan kesegaran sesi mengikuti domain URL pertama (batch umumnya satu situs)
+                pool = asyncio.Queue()
+                fresh_session = self._session_is_stale(urls[0])
+                context_options = self._context_options(lease, urls[0], fresh_session)
+                for _ in range(min(concurrency, len(urls))):
+                    await pool.put(await browser.new_context(**context_options))
 
-                
-                self._human_like_interaction(page)
+                async def worker(url):
+                    browser_context = await pool.get()
+                    try:
+                        results[url] = await self._scrape_page_async(browser_context, url)
+                    except Exception as e:
+                        print(f"[batch] Gagal memproses {url}: {e}")
+                        results[url] = []
+                    finally:
+                        pool.put_nowait(browser_context)
 
-                # --- TUNGGU KONTEN DINAMIS ---
-                print("Menunggu elemen utama prakiraan cuaca dimuat (45s)...")
-                try:
-                    # Selector Monthly Weather.com: MonthlyContent
-                    monthly_selector = "//div[contains(@class, 'MonthlyContent') or contains(@class, 'Monthly--forecast')]"
-                    
-                    # Gabungkan dengan selector situs lain
-                    combined_selector = f"{monthly_selector} | //div[contains(@class, 'DailyContent') or contains(@class, 'HourlyContent') or contains(@class, 'table-responsive') or contains(@class, 'forecast-container')]"
-
-                    page.wait_for_selector(f"xpath={combined_selector}", timeout=10000)
-
-                except PlaywrightTimeoutError:
-                    print("Warning: Selector spesifik timeout. Melanjutkan dengan jeda 10s.")
-                
-                # EKSTRAKSI TEKS
-                full_page_text = self._clean_text(page.locator('body').inner_text())
-                
-                if len(full_page_text) < 500:
-                    print("Teks konten halaman terlalu singkat. Mungkin pemblokiran.")
-                    return []
-                    
-                print(f"Mengirim {len(full_page_text)} karakter teks ke AI untuk diproses...")
-                
-                extracted = self._extract_data_ai(full_page_text, url)
-                
-                # Cek hasil dari salah satu dari 3 list
-                if extracted.get('all_locations_forecast') or extracted.get('hourly_forecasts_grouped') or extracted.get('monthly_forecasts'):
-                    extracted_locs = len(extracted.get('all_locations_forecast', []))
-                    extracted_groups = len(extracted.get('hourly_forecasts_grouped', []))
-                    extracted_monthly = len(extracted.get('monthly_forecasts', []))
-                    print(f"Sukses! Berhasil mengekstrak {extracted_locs} lokasi (harian), {extracted_groups} grup jam, dan {extracted_monthly} entri bulanan.")
-                    return [extracted]
-                
-                print("AI gagal mengekstrak data dari halaman.")
-                return []
-            
-            except PlaywrightTimeoutError as e:
-                print(f"Error Timeout Playwright: {e}")
-                print("Halaman gagal dimuat. Coba jalankan ulang skrip ini.")
-                return []
-            except Exception as e:
-                print(f"Error utama pada {url}: {e}")
-                print("Kemungkinan deteksi bot.")
-                return []
+                await asyncio.gather(*(worker(url) for url in urls))
+
+                if fresh_session and any(results.values()):
+                    browser_context = pool.get_nowait()
+                    await asyncio.to_thread(self._save_session, await browser_context.storage_state())
+                    await browser_context.close()
+                while not pool.empty():
+                    await pool.get_nowait().close()
             finally:
-                browser.close()
+                await browser.close()
+                if lease:
+                    await asyncio.to_thread(self._release_browser, lease, len(urls))
+
+        # Urutkan sesuai input
+        return {url: results.get(url, []) for url in urls}
+
+    def scrape_many(self, urls, concurrency=DEFAULT_CONCURRENCY):
+        """
+        Scrape banyak URL secara bersamaan dengan satu browser dan pool context.
+
+        Args:
+            urls: daftar URL target
+            concurrency: jumlah halaman yang diproses bersamaan
+
+        Returns:
+            dict: {url: list hasil} (format sama seperti scrape()), [] untuk URL yang gagal
+        """
+        urls = list(dict.fromkeys(urls))  # buang duplikat, pertahankan urutan
+        if not urls:
+            return {}
+        with telemetry.span('scrape_many', urls=len(urls), concurrency=concurrency):
+            results = self._scrape_many(urls, concurrency)
+        return {url: self._as_output(result) for url, result in results.items()}
+
+    def _scrape_many(self, urls, concurrency):
+        concurrency = max(1, int(concurrency))
+        print(f"\n--- Memulai Batch Scraping V27: {len(urls)} URL, concurrency={concurrency} ---")
+        start = time.perf_counter()
+
+        # Tier HTTP (tanpa browser) dulu; URL yang butuh JavaScript lanjut ke pool browser
+        results = {url: [] for url in urls if not self._allowed(url)}
+        allowed_urls = [url for url in urls if url not in results]
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, self._try_static_tier, url) for url in allowed_urls]
+            for url, result in zip(allowed_urls, (future.result() for future in futures)):
+                if result is not None:
+                    results[url] = result
+
+        browser_urls = [url for url in urls if url not in results]
+        if browser_urls:
+            results.update(asyncio.run(self._scrape_many_async(browser_urls, concurrency)))
+        results = {url: results.get(url, []) for url in urls}
+        for url, result in results.items():
+            self._record_outcome(url, result)
+        sukses = sum(1 for r in results.values() if r)
+        print(f"Batch selesai dalam {time.perf_counter() - start:.1f}s: {sukses}/{len(urls)} URL sukses.")
+        self._print_cache_stats()
+        return results
+
+    @staticmethod
+    def url_tag(url):
+        """Label pendek dari URL untuk nama file (e.g., 'prakiraan-cuaca/62' -> '62')."""
+        parsed = urlparse(url or "")
+        last = parsed.path.rstrip('/').rsplit('/', 1)[-1] or parsed.netloc
+        return re.sub(r'[^A-Za-z0-9_-]+', '_', last)[:40]
 
-    def save_results(self, data):
-        """Menyimpan data Bulanan, Multi-Lokasi, dan Hourly Grouped."""
+    def _save_results_parquet(self, data):
+        """Tambahkan hasil ke dataset Parquet terpartisi (source/province/scrape_date)."""
+        from forecast_storage import ParquetForecastStore, DEFAULT_STORE_ROOT
+        store_root = self.context.store_root or DEFAULT_STORE_ROOT
+        store = ParquetForecastStore(store_root)
+        scrape_time = datetime.now()
+        for record in data:
+            if self.context.incremental:
+                changes = store.upsert(record, scrape_time)
+                print(f"\n--- EKSTRAKSI SUKSES V27 (incremental) ---")
+                for kind, c in changes.items():
+                    if any(c.values()):
+                        print(f"{kind}: {c['insert']} baru, {c['update']} berubah, {c['unchanged']} sama (dilewati).")
+                continue
+            counts = store.append(record, scrape_time)
+            print(f"\n--- EKSTRAKSI SUKSES V27 ---")
+            print(f"Data disimpan ke {store_root}/ (Parquet): "
+                  f"{counts['daily']} harian, {counts['hourly']} per jam, {counts['monthly']} bulanan.")
+
+    def save_results(self, data, tag=None, url=None):
+        """Menyimpan data Bulanan, Multi-Lokasi, dan Hourly Grouped.
+
+        tag: label tambahan pada nama file, dipakai saat menyimpan hasil scrape_many()
+        agar file dari URL berbeda dalam detik yang sama tidak saling menimpa.
+        url: URL asal data; validator HTTP-nya disimpan setelah data tersimpan
+        (None = semua URL yang tertunda, e.g. hasil scrape() satu URL).
+        """
+        with telemetry.span('save_results', tag=tag, format=self.context.storage_format):
+            self._write_results(data, tag)
+        if data:
+            self._commit_fetches(url)
+
+    def _commit_fetches(self, url=None):
+        """Simpan validator ETag/Last-Modified tier HTTP untuk hasil yang sudah tersimpan."""
+        with self._pending_lock:
+            if url is None:
+                pending, self._pending_fetches = list(self._pending_fetches.values()), {}
+            else:
+                pending = [self._pending_fetches.pop(url)] if url in self._pending_fetches else []
+        for fetcher, fetched in pending:
+            fetcher.commit(fetched)
+
+    def _write_results(self, data, tag=None):
         if not data:
             print("Tidak ada data valid yang ditemukan.")
             return
 
+        if self.context.storage_format == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                # pyarrow belum terinstal -> hanya mode penyimpanan JSON+CSV
+                print("Warning: pyarrow tidak tersedia, fallback ke penyimpanan JSON+CSV.")
+            else:
+                self._save_results_parquet(data)
+                return
+
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         prefix = self.context.scraper_name
+        if tag:
+            prefix = f"{prefix}_{tag}"
         
-        utama = data[0]
+        utama = data[0].model_dump() if isinstance(data[0], BaseModel) else data[0]
         parent_location = utama.get('parent_location')
         source_url = utama.get('source_url')
         forecast_period = utama.get('forecast_period')
@@ -206,8 +962,10 @@ class UniversalScraperV27:
         print(f"\n--- EKSTRAKSI SUKSES V27 ---")
         print(f"Hasil JSON (termasuk Monthly) disimpan ke: {filename_json}")
 
+        import pandas as pd
+
         # 2. Simpan CSV Monthly (Jika ada)
-        if pd and utama.get('monthly_forecasts'):
+        if utama.get('monthly_forecasts'):
             filename_monthly_csv = f"{prefix}_{timestamp}_MONTHLY.csv"
             rows_monthly = []
             
@@ -227,7 +985,7 @@ class UniversalScraperV27:
 
 
         # 3. Simpan CSV Hourly Grouped (Jika ada)
-        if pd and utama.get('hourly_forecasts_grouped'):
+        if utama.get('hourly_forecasts_grouped'):
             filename_hourly_csv = f"{prefix}_{timestamp}_HOURLY_GROUPED.csv"
             rows_hourly = []
             
@@ -248,7 +1006,7 @@ class UniversalScraperV27:
             print("Penyimpanan CSV Per Jam dilewati.")
 
         # 4. Simpan CSV Multi-Lokasi / Lokasi Tunggal Harian (Jika ada)
-        if pd and utama.get('all_locations_forecast'):
+        if utama.get('all_locations_forecast'):
             filename_daily_csv = f"{prefix}_{timestamp}_DAILY_FORECAST.csv"
             rows_daily = []
             
@@ -272,6 +1030,7 @@ class UniversalScraperV27:
 
 
 if __name__ == "__main__":
+    telemetry.configure_from_env()
     target_url = input("Masukkan URL target (Monthly/Hourly/Daily): ").strip()
 
     if not target_url:
@@ -0,0 +1,408 @@
+# extraction_broker.py (V27)
+# Broker ekstraksi Gemini bersama untuk semua scrape dalam satu proses: rate limit
+# token-bucket (RPM dan TPM), batas request in-flight, retry 429/5xx dengan
+# exponential backoff + jitter, dan mode batch offline (client.batches) yang
+# mengumpulkan banyak halaman menjadi satu job untuk run malam. Broker online dan batch
+# untuk API key + model yang sama berbagi satu RateLimits (kuota yang sama).
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+# google.genai (~0.5 detik impor) dimuat di dalam method: klien sudah dibuat lewat get_client(),
+# jadi saat broker dipakai modulnya sudah ada di sys.modules.
+import telemetry
+
+DEFAULT_RPM = 60
+DEFAULT_TPM = 250_000
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BACKOFF_S = 1.0
+MAX_BACKOFF_S = 30.0
+# Perkiraan token output per request untuk TPM (dikoreksi dengan usage_metadata setelah respons)
+DEFAULT_OUTPUT_TOKENS = 2000
+
+DEFAULT_BATCH_MAX_REQUESTS = 100
+DEFAULT_BATCH_LINGER_S = 5.0
+BATCH_POLL_INTERVAL_S = 30.0
+# Batas tunggu batch job sebelum dibatalkan dan diganti request online. Di bawah
+# worker_farm.JOB_TIMEOUT_S (15 menit) agar job tidak memegang slot worker/scheduler berjam-jam.
+DEFAULT_BATCH_TIMEOUT_S = 10 * 60
+
+RETRYABLE_CODES = {429, 500, 502, 503, 504}
+_BATCH_DONE_STATES = {'JOB_STATE_SUCCEEDED', 'JOB_STATE_PARTIALLY_SUCCEEDED', 'JOB_STATE_FAILED',
+                      'JOB_STATE_CANCELLED', 'JOB_STATE_EXPIRED'}
+THROUGHPUT_WINDOW_S = 60.0
+
+
+class TokenBucket:
+    """Token bucket thread-safe. capacity per `period_s` detik, diisi ulang secara kontinu."""
+
+    def __init__(self, capacity, period_s=60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period_s
+        self.level = self.capacity
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1.0):
+        """Blok sampai `amount` token tersedia (dibatasi kapasitas agar request besar tetap bisa jalan)."""
+        amount = min(float(amount), self.capacity)
+        with self._cond:
+            while True:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return
+                self._cond.wait((amount - self.level) / self.rate)
+
+    def adjust(self, delta):
+        """Koreksi pemakaian setelah jumlah sebenarnya diketahui (positif = pakai lebih banyak)."""
+        with self._cond:
+            self._refill()
+            self.level = min(self.capacity, self.level - delta)
+            self._cond.notify_all()
+
+
+class RateLimits:
+    """Kuota bersama satu API key + model: bucket RPM/TPM dan slot request in-flight."""
+
+    def __init__(self, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        self.settings = (rpm, tpm, max(1, max_in_flight))
+        self.rpm = TokenBucket(rpm) if rpm else None
+        self.tpm = TokenBucket(tpm) if tpm else None
+        self.slots = threading.BoundedSemaphore(max(1, max_in_flight))
+
+
+def _is_retryable(error):
+    from google.genai.errors import APIError
+    return isinstance(error, APIError) and error.code in RETRYABLE_CODES
+
+
+class ExtractionBroker:
+    """
+    Antrian ekstraksi bersama di depan generate_content.
+
+    generate() dipanggil dari banyak thread (chunk paralel, scrape_many). Pemanggil
+    menunggu di antrian sampai rate limit dan slot in-flight mengizinkan. Dalam mode
+    batch, request dikumpulkan lalu dikirim sebagai satu batch job.
+
+    limits: RateLimits bersama (get_broker); None = bucket sendiri dari rpm/tpm/max_in_flight.
+    """
+
+    def __init__(self, client, model_name, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM,
+                 max_in_flight=DEFAULT_MAX_IN_FLIGHT, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_s=DEFAULT_BACKOFF_S, batch_mode=False,
+                 batch_max_requests=DEFAULT_BATCH_MAX_REQUESTS, batch_linger_s=DEFAULT_BATCH_LINGER_S,
+                 batch_timeout_s=DEFAULT_BATCH_TIMEOUT_S, limits=None):
+        self.client = client
+        self.model_name = model_name
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.batch_mode = batch_mode
+        self.batch_max_requests = batch_max_requests
+        self.batch_linger_s = batch_linger_s
+        self.batch_timeout_s = batch_timeout_s
+        self.limits = limits or RateLimits(rpm, tpm, max_in_flight)
+        self._rpm = self.limits.rpm
+        self._tpm = self.limits.tpm
+        self._slots = self.limits.slots
+        self._lock = threading.Lock()
+        self._counters = {'queued': 0, 'in_flight': 0, 'completed': 0, 'failed': 0, 'retries': 0,
+                          'batch_jobs': 0, 'tokens': 0}
+        self._completed_at = deque()
+        self._batch_pending = []
+        self._batch_timer = None
+
+    # --- metrik ---
+    def _count(self, name, delta=1):
+        with self._lock:
+            self._counters[name] += delta
+            if name == 'completed' and delta > 0:
+                self._completed_at.append(time.monotonic())
+
+    def metrics(self):
+        """queue_depth, in_flight, completed, failed, retries, batch_jobs, tokens, pages_per_min."""
+        with self._lock:
+            cutoff = time.monotonic() - THROUGHPUT_WINDOW_S
+            while self._completed_at and self._completed_at[0] < cutoff:
+                self._completed_at.popleft()
+            stats = dict(self._counters)
+            stats['queue_depth'] = stats.pop('queued') + len(self._batch_pending)
+            stats['pages_per_min'] = len(self._completed_at) * 60.0 / THROUGHPUT_WINDOW_S
+        return stats
+
+    # --- request online ---
+    def _config(self, schema):
+        from google.genai import types
+        return types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=schema,
+            temperature=0.0,
+        )
+
+    def _call_once(self, prompt, schema, estimated_tokens):
+        if self._rpm:
+            self._rpm.acquire(1)
+        if self._tpm:
+            self._tpm.acquire(estimated_tokens)
+        start = time.perf_counter()
+        response = self.client.models.generate_content(
+            model=self.model_name,
+            contents=prompt,
+            config=self._config(schema),
+        )
+        telemetry.observe('llm_latency_seconds', time.perf_counter() - start, model=self.model_name)
+        usage = getattr(response, 'usage_metadata', None)
+        telemetry.observe('llm_tokens', getattr(usage, 'prompt_token_count', None), direction='in')
+        telemetry.observe('llm_tokens', getattr(usage, 'candidates_token_count', None), direction='out')
+        actual = getattr(usage, 'total_token_count', None) or estimated_tokens
+        if self._tpm:
+            self._tpm.adjust(actual - estimated_tokens)
+        self._count('tokens', actual)
+        return response.text
+
+    def _generate_online(self, prompt, schema, estimated_tokens):
+        self._count('queued')
+        self._slots.acquire()
+        self._count('queued', -1)
+        self._count('in_flight')
+        from google.genai.errors import APIError
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    text = self._call_once(prompt, schema, estimated_tokens)
+                    self._count('completed')
+                    return text
+                except APIError as e:
+                    if not _is_retryable(e) or attempt == self.max_retries:
+                        self._count('failed')
+                        raise
+                    delay = min(MAX_BACKOFF_S, self.backoff_s * (2 ** attempt)) * random.uniform(0.5, 1.5)
+                    print(f"Gemini {e.code}, retry {attempt + 1}/{self.max_retries} dalam {delay:.1f}s...")
+                    self._count('retries')
+                    telemetry.inc('llm_retries_total', code=e.code)
+                    time.sleep(delay)
+        finally:
+            self._count('in_flight', -1)
+            self._slots.release()
+
+    def generate(self, prompt, schema, estimated_tokens):
+        """
+        Teks JSON respons Gemini untuk satu prompt.
+
+        Args:
+            estimated_tokens: perkiraan token input (untuk TPM); output ditambahkan otomatis
+        Raises:
+            genai.errors.APIError: error non-retryable, atau retry habis
+        """
+        estimated_tokens = int(estimated_tokens) + DEFAULT_OUTPUT_TOKENS
+        if self.batch_mode:
+            return self._submit_batch(prompt, schema, estimated_tokens).result()
+        return self._generate_online(prompt, schema, estimated_tokens)
+
+    # --- request streaming ---
+    def _stream_once(self, prompt, schema, estimated_tokens, consumer):
+        if self._rpm:
+            self._rpm.acquire(1)
+        if self._tpm:
+            self._tpm.acquire(estimated_tokens)
+        from stream_extraction import StreamAborted
+
+        consumer.start()
+        stream = self.client.models.generate_content_stream(
+            model=self.model_name,
+            contents=prompt,
+            config=self._config(schema),
+        )
+        usage = None
+        try:
+            for chunk in stream:
+                usage = getattr(chunk, 'usage_metadata', None) or usage
+                consumer.feed(chunk.text or "")
+        except StreamAborted as e:
+            print(f"Stream Gemini dihentikan ({e}). {consumer.wasted_tokens()} token output terbuang.")
+            telemetry.inc('llm_stream_aborted_total', reason=e.reason)
+        finally:
+            stream.close()  # menutup koneksi HTTP: generasi berhenti ditagih di sini
+
+        telemetry.observe('llm_latency_seconds', time.perf_counter() - consumer.started, model=self.model_name)
+        if consumer.first_record_s is not None:
+            telemetry.observe('llm_time_to_first_record_seconds', consumer.first_record_s, model=self.model_name)
+        telemetry.observe('llm_wasted_tokens', consumer.wasted_tokens())
+        # Stream yang dihentikan sering tidak membawa usage_metadata: pakai estimasi lokal
+        output_tokens = getattr(usage, 'candidates_token_count', None) or consumer.output_tokens
+        telemetry.observe('llm_tokens', getattr(usage, 'prompt_token_count', None), direction='in')
+        telemetry.observe('llm_tokens', output_tokens, direction='out')
+        actual = getattr(usage, 'total_token_count', None) or estimated_tokens - DEFAULT_OUTPUT_TOKENS + output_tokens
+        if self._tpm:
+            self._tpm.adjust(actual - estimated_tokens)
+        self._count('tokens', actual)
+        return consumer
+
+    def generate_stream(self, prompt, schema, estimated_tokens, consumer):
+        """
+        Seperti generate(), tetapi lewat generate_content_stream: potongan teks diteruskan ke
+        consumer (stream_extraction.StreamingExtraction) yang memvalidasi item satu per satu dan
+        bisa menghentikan stream lebih awal. Mengembalikan consumer.
+
+        Retry 429/5xx hanya dilakukan sebelum ada teks yang diterima. Mode batch tidak mendukung
+        streaming: respons batch diumpankan utuh ke consumer.
+        """
+        if self.batch_mode:
+            consumer.start()
+            from stream_extraction import StreamAborted
+            try:
+                consumer.feed(self.generate(prompt, schema, estimated_tokens))
+            except StreamAborted as e:
+                telemetry.inc('llm_stream_aborted_total', reason=e.reason)
+            return consumer
+
+        estimated_tokens = int(estimated_tokens) + DEFAULT_OUTPUT_TOKENS
+        self._count('queued')
+        self._slots.acquire()
+        self._count('queued', -1)
+        self._count('in_flight')
+        from google.genai.errors import APIError
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    self._stream_once(prompt, schema, estimated_tokens, consumer)
+                    self._count('completed')
+                    return consumer
+                except APIError as e:
+                    if consumer.output_tokens or not _is_retryable(e) or attempt == self.max_retries:
+                        self._count('failed')
+                        raise
+                    delay = min(MAX_BACKOFF_S, self.backoff_s * (2 ** attempt)) * random.uniform(0.5, 1.5)
+                    print(f"Gemini {e.code}, retry {attempt + 1}/{self.max_retries} dalam {delay:.1f}s...")
+                    self._count('retries')
+                    telemetry.inc('llm_retries_total', code=e.code)
+                    time.sleep(delay)
+        finally:
+            self._count('in_flight', -1)
+            self._slots.release()
+
+    # --- mode batch offline ---
+    def _submit_batch(self, prompt, schema, estimated_tokens):
+        future = Future()
+        with self._lock:
+            self._batch_pending.append((prompt, schema, estimated_tokens, future))
+            flush_now = len(self._batch_pending) >= self.batch_max_requests
+            if self._batch_timer is not None:
+                self._batch_timer.cancel()
+            self._batch_timer = None
+            if not flush_now:
+                # Tunggu sebentar agar halaman lain ikut masuk ke job yang sama
+                self._batch_timer = threading.Timer(self.batch_linger_s, self.flush_batch)
+                self._batch_timer.daemon = True
+                self._batch_timer.start()
+        if flush_now:
+            threading.Thread(target=self.flush_batch, daemon=True).start()
+        return future
+
+    def flush_batch(self):
+        """Kirim semua request batch yang tertunda sebagai satu batch job dan tunggu hasilnya."""
+        with self._lock:
+            pending, self._batch_pending = self._batch_pending, []
+        if not pending:
+            return
+        try:
+            texts = self._run_batch_job(pending)
+        except Exception as e:
+            print(f"Warning: batch job gagal ({e}). Fallback ke request online untuk {len(pending)} halaman.")
+            texts = [None] * len(pending)
+
+        for (prompt, schema, estimated_tokens, future), text in zip(pending, texts):
+            if text is not None:
+                self._count('completed')
+                future.set_result(text)
+                continue
+            try:
+                future.set_result(self._generate_online(prompt, schema, estimated_tokens))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _run_batch_job(self, pending):
+        from google.genai import types
+        requests_ = [
+            types.InlinedRequest(
+                contents=[types.Content(role='user', parts=[types.Part(text=prompt)])],
+                config=self._config(schema),
+            )
+            for prompt, schema, _, _ in pending
+        ]
+        job = self.client.batches.create(
+            model=self.model_name,
+            src=requests_,
+            config=types.CreateBatchJobConfig(display_name=f"weather-v27-{int(time.time())}"),
+        )
+        self._count('batch_jobs')
+        print(f"Batch job {job.name} dikirim ({len(requests_)} halaman). Menunggu hasil...")
+
+        deadline = time.monotonic() + self.batch_timeout_s
+        while getattr(job.state, 'name', str(job.state)) not in _BATCH_DONE_STATES:
+            if time.monotonic() > deadline:
+                try:
+                    self.client.batches.cancel(name=job.name)  # hasil yang datang terlambat tidak dipakai
+                except Exception as e:
+                    print(f"Warning: batch job {job.name} gagal dibatalkan ({e}).")
+                raise TimeoutError(f"batch job {job.name} melewati {self.batch_timeout_s}s")
+            time.sleep(min(BATCH_POLL_INTERVAL_S, max(0.0, deadline - time.monotonic())))
+            job = self.client.batches.get(name=job.name)
+
+        state = getattr(job.state, 'name', str(job.state))
+        responses = (job.dest.inlined_responses or []) if job.dest else []
+        print(f"Batch job {job.name} selesai: {state}, {len(responses)} respons.")
+        texts = []
+        for i in range(len(pending)):
+            item = responses[i] if i < len(responses) else None
+            texts.append(item.response.text if item is not None and item.response is not None and not item.error else None)
+        return texts
+
+
+_BROKERS = {}
+_LIMITS = {}
+_CLIENTS = {}
+_BROKERS_LOCK = threading.Lock()
+
+
+def get_client(api_key):
+    """genai.Client bersama per API key: pool koneksi HTTP-nya dipakai ulang antar job, bukan dibuat per scraper."""
+    with _BROKERS_LOCK:
+        if api_key not in _CLIENTS:
+            from google import genai
+            _CLIENTS[api_key] = genai.Client(api_key=api_key)
+        return _CLIENTS[api_key]
+
+
+def get_broker(client, model_name, **options):
+    """
+    Broker bersama per (client, model, semua opsi). Broker dengan client dan model yang sama
+    (satu API key) berbagi satu RateLimits, termasuk broker online dan batch.
+
+    Raises:
+        ValueError: rpm/tpm/max_in_flight berbeda dari broker lain untuk kuota yang sama
+    """
+    # id(client): client dipegang broker di _BROKERS, jadi id-nya tidak dipakai ulang
+    key = (id(client), model_name, tuple(sorted(options.items())))
+    quota = (id(client), model_name)
+    settings = (options.get('rpm', DEFAULT_RPM), options.get('tpm', DEFAULT_TPM),
+                max(1, options.get('max_in_flight', DEFAULT_MAX_IN_FLIGHT)))
+    with _BROKERS_LOCK:
+        if key not in _BROKERS:
+            limits = _LIMITS.get(quota)
+            if limits is None:
+                limits = _LIMITS[quota] = RateLimits(*settings)
+            elif limits.settings != settings:
+                raise ValueError(f"Batas Gemini (rpm, tpm, max_in_flight)={settings} untuk {model_name} bertentangan "
+                                 f"dengan {limits.settings} yang sudah dipakai broker lain dengan API key yang sama.")
+            _BROKERS[key] = ExtractionBroker(client, model_name, limits=limits, **options)
+        return _BROKERS[key]
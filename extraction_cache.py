@@ -0,0 +1,133 @@
+# extraction_cache.py (V27)
+# Cache persisten hasil ekstraksi Gemini berbasis hash konten halaman.
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
+DEFAULT_CACHE_FILE = "extraction_cache_v27.sqlite"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600   # 7 hari
+DEFAULT_MAX_ENTRIES = 5000
+
+
+@lru_cache(maxsize=None)
+def _schema_json(schema):
+    """JSON schema kelas pydantic (sekali per kelas; model_json_schema() mahal dibanding hash halaman)."""
+    return json.dumps(schema.model_json_schema(), sort_keys=True)
+
+
+def make_cache_key(page_text, prompt_template, model_name, schema, url=""):
+    """
+    Hash SHA-256 dari semua input yang memengaruhi hasil ekstraksi.
+
+    Args:
+        page_text: teks halaman yang sudah dibersihkan
+        prompt_template: template prompt (sebelum diisi)
+        model_name: nama model Gemini (e.g., gemini-2.5-flash)
+        schema: kelas pydantic target (JSON schema-nya ikut di-hash)
+        url: URL sumber (ikut masuk ke prompt dan ke field source_url)
+    """
+    schema_json = _schema_json(schema)
+    h = hashlib.sha256()
+    for part in (model_name, prompt_template, schema_json, url, page_text):
+        h.update(part.encode('utf-8'))
+        h.update(b'\x00')
+    return h.hexdigest()
+
+
+class ExtractionCache:
+    """
+    Cache SQLite untuk hasil ekstraksi tervalidasi, dengan TTL dan eviksi LRU.
+
+    Nilai disimpan sebagai JSON dari model pydantic yang sudah tervalidasi,
+    sehingga cache hit bisa langsung dikembalikan tanpa memanggil Gemini.
+    Aman dipakai dari beberapa thread (scrape_many menjalankan ekstraksi di thread).
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extraction_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_extraction_cache_access ON extraction_cache(last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        """Kembalikan JSON tersimpan, atau None jika tidak ada / kedaluwarsa."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM extraction_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM extraction_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE extraction_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Simpan JSON hasil ekstraksi lalu buang entri paling lama tidak dipakai (LRU)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extraction_cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            if self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM extraction_cache WHERE key IN ("
+                    " SELECT key FROM extraction_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            self._conn.commit()
+
+    def invalidate(self, key):
+        """
+        Hapus entri yang dikembalikan get() tetapi tidak bisa dipakai (gagal validasi).
+        Lookup tersebut dihitung ulang sebagai miss, bukan hit.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM extraction_cache WHERE key = ?", (key,))
+            self._conn.commit()
+            self.hits -= 1
+            self.misses += 1
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM extraction_cache").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / total) if total else 0.0,
+            'entries': size,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
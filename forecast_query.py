@@ -0,0 +1,411 @@
+# forecast_query.py (V27)
+# Sisi baca: prakiraan terbaru di memori, diindeks per lokasi (location_name dan
+# parent_location) dan tanggal target, untuk query cepat tanpa glob + parse file JSON.
+# Nama lokasi dicocokkan seperti reconcile.py: kunci ternormalisasi, LOCATION_ALIASES
+# ('Sampit' -> Kotawaringin Timur), lalu awalan/substring jika tidak ada yang persis.
+# Dimuat sekali dari dataset Parquet (dan/atau file JSON mode csv), lalu diperbarui
+# secara incremental: file baru dari save_results dalam proses yang sama masuk lewat
+# listener forecast_storage, file dari proses lain lewat refresh() (scan file baru).
+#
+#   index = ForecastIndex.load()
+#   index.latest('Sampit', days=3)
+#
+#   python forecast_query.py --port 8080      # GET /forecast?location=Sampit&days=3
+
+import argparse
+import glob
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from normalize import normalize_frame
+from reconcile import LOCATION_ALIASES, normalize_name
+
+try:
+    import pyarrow.dataset as ds
+    import forecast_storage
+    from forecast_storage import ParquetForecastStore, DEFAULT_STORE_ROOT, output_to_rows
+except ImportError:
+    # pyarrow belum terinstal -> forecast_storage tidak tersedia, indeks tetap kosong
+    ds = None
+    forecast_storage = None
+    ParquetForecastStore = None
+    output_to_rows = None
+    DEFAULT_STORE_ROOT = "forecast_store"
+
+KINDS = ('daily', 'hourly', 'monthly')
+DEFAULT_JSON_GLOB = "Universal_V27_Monthly_*.json"
+DEFAULT_REFRESH_INTERVAL_S = 60
+DEFAULT_PORT = 8080
+
+# Kolom penyimpanan internal yang tidak ikut dikembalikan ke konsumen
+_HIDDEN_COLUMNS = {'row_hash', 'change', 'province', 'scrape_date'}
+# Kunci tambahan per jenis (selain source + lokasi + tanggal target)
+_EXTRA_KEY = {'daily': None, 'hourly': 'time_of_day', 'monthly': None}
+
+
+def location_key(name):
+    """
+    Kunci lokasi: reconcile.normalize_name ('Sampit (Hasan) Airport' -> 'sampit',
+    'Kota  Palangkaraya' -> 'palangkaraya'); nama yang habis dinormalisasi cukup dirapikan.
+    """
+    return normalize_name(name) or " ".join(str(name or "").split()).casefold()
+
+
+def _alias_groups(aliases):
+    """Kunci -> semua kunci yang setara lewat alias (dua arah): 'sampit' <-> 'kotawaringin timur'."""
+    groups = {}
+    for alias, target in aliases.items():
+        alias, target = location_key(alias), location_key(target)
+        groups.setdefault(alias, {alias}).add(target)
+        groups.setdefault(target, {target}).add(alias)
+    return groups
+
+
+_ALIAS_GROUPS = _alias_groups(LOCATION_ALIASES)
+
+
+def _as_date(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        if isinstance(value, float) and math.isnan(value):
+            return None
+        timestamp = pd.Timestamp(value)
+    except (ValueError, TypeError):
+        return None
+    return None if pd.isna(timestamp) else timestamp.date()
+
+
+def _clean(value):
+    """Nilai baris -> tipe JSON (NaN -> None, timestamp/date -> ISO)."""
+    if value is None:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return None if pd.isna(value) else value.isoformat()
+    return value
+
+
+class ForecastIndex:
+    """
+    Prakiraan terbaru per (jenis, source, lokasi, tanggal target[, jam]) di memori.
+
+    Indeks:
+      - _records[kind][lokasi][tanggal] -> {(source, jam): baris}
+      - _dates[kind][lokasi]            -> list tanggal terurut (bisect untuk rentang)
+      - _children[kind][parent]         -> set lokasi di bawah parent_location
+
+    Baris baru menggantikan baris lama dengan kunci yang sama jika scrape_time-nya
+    tidak lebih tua, jadi urutan ingest (file lama/baru) tidak memengaruhi hasil.
+    """
+
+    def __init__(self, store_root=DEFAULT_STORE_ROOT, json_glob=DEFAULT_JSON_GLOB):
+        self.store_root = store_root
+        self.json_glob = json_glob
+        self._lock = threading.RLock()
+        self._records = {kind: {} for kind in KINDS}
+        self._dates = {kind: {} for kind in KINDS}
+        self._children = {kind: {} for kind in KINDS}
+        self._names = {}          # kunci lokasi -> nama asli (untuk tampilan)
+        self._seen_files = set()
+        self.rows = 0             # jumlah kunci unik yang diindeks
+        self.undated_rows = 0     # baris tanpa tanggal target hasil normalisasi (tidak diindeks)
+        self.last_refresh = None
+        self._listener = None
+
+    @classmethod
+    def load(cls, store_root=DEFAULT_STORE_ROOT, json_glob=DEFAULT_JSON_GLOB, listen=True):
+        """Bangun indeks dari data yang ada. listen=True: ikut save_results dalam proses ini."""
+        index = cls(store_root, json_glob)
+        start = time.perf_counter()
+        index.refresh()
+        if listen:
+            index.attach()
+        print(f"[forecast-query] {index.rows} baris dimuat dalam {time.perf_counter() - start:.2f}s "
+              f"({len(index._names)} lokasi).")
+        return index
+
+    # --- ingest ---
+    def ingest_frame(self, kind, df):
+        """Masukkan baris (DataFrame ternormalisasi dengan target_date). Mengembalikan jumlah baris diindeks."""
+        if df is None or df.empty:
+            return 0
+        extra = _EXTRA_KEY[kind]
+        columns = [c for c in df.columns if c not in _HIDDEN_COLUMNS and not c.startswith('_')]
+        added = 0
+        with self._lock:
+            records, dates, children = self._records[kind], self._dates[kind], self._children[kind]
+            for row in df[columns].to_dict('records'):
+                target = _as_date(row.get('target_date'))
+                if target is None:
+                    self.undated_rows += 1
+                    continue
+                row = {name: _clean(value) for name, value in row.items()}
+                loc = location_key(row.get('location_name'))
+                by_date = records.setdefault(loc, {})
+                if target not in by_date:
+                    by_date[target] = {}
+                    insort(dates.setdefault(loc, []), target)
+                key = (row.get('source'), row.get(extra) if extra else None)
+                current = by_date[target].get(key)
+                if current is not None and (current.get('scrape_time') or '') > (row.get('scrape_time') or ''):
+                    continue
+                by_date[target][key] = row
+                if current is None:
+                    self.rows += 1
+                self._names.setdefault(loc, row.get('location_name'))
+                parent = location_key(row.get('parent_location'))
+                if parent:
+                    children.setdefault(parent, set()).add(loc)
+                    self._names.setdefault(parent, row.get('parent_location'))
+                added += 1
+        return added
+
+    def ingest_record(self, record, scrape_time=None):
+        """Masukkan satu hasil UniversalOutputV27 (dict), e.g. isi file JSON mode csv."""
+        scrape_time = scrape_time or datetime.now()
+        if output_to_rows is None:
+            return 0
+        rows = output_to_rows(record, scrape_time)
+        return sum(self.ingest_frame(kind, normalize_frame(kind, pd.DataFrame(kind_rows)))
+                   for kind, kind_rows in rows.items() if kind_rows)
+
+    def _parquet_files(self):
+        files = {}
+        for kind in KINDS:
+            kind_dir = os.path.join(self.store_root, kind)
+            if os.path.isdir(kind_dir):
+                files[kind] = glob.glob(os.path.join(kind_dir, "**", "*.parquet"), recursive=True)
+        return files
+
+    def _read_parquet(self, kind, paths):
+        store = ParquetForecastStore(self.store_root)
+        dataset = ds.dataset(paths, format='parquet', partitioning=store.partitioning,
+                             partition_base_dir=os.path.join(self.store_root, kind), schema=store._schema(kind))
+        return dataset.to_table().to_pandas()
+
+    def refresh(self):
+        """Ingest hanya file yang belum pernah dibaca (Parquet baru dan JSON baru). Mengembalikan jumlah baris."""
+        added = 0
+        current = set()
+        if ParquetForecastStore is not None:
+            for kind, paths in self._parquet_files().items():
+                current.update(paths)
+                new_paths = [path for path in paths if path not in self._seen_files]
+                if new_paths:
+                    added += self.ingest_frame(kind, self._read_parquet(kind, new_paths))
+                    with self._lock:
+                        self._seen_files.update(new_paths)
+
+        for path in glob.glob(self.json_glob) if self.json_glob else []:
+            current.add(path)
+            if path in self._seen_files:
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Warning: {path} dilewati ({e}).")
+            else:
+                added += self.ingest_record(record, datetime.fromtimestamp(os.path.getmtime(path)))
+            with self._lock:
+                self._seen_files.add(path)
+
+        # File yang hilang (e.g. dipadatkan oleh compact()) tidak perlu diingat lagi
+        with self._lock:
+            self._seen_files = {path for path in self._seen_files if path in current or os.path.exists(path)}
+        self.last_refresh = datetime.now().isoformat(timespec='seconds')
+        return added
+
+    def _on_write(self, root, kind, df, paths):
+        if os.path.abspath(root) != os.path.abspath(self.store_root):
+            return
+        self.ingest_frame(kind, df)
+        with self._lock:
+            self._seen_files.update(paths)
+
+    def attach(self):
+        """Perbarui indeks langsung saat ParquetForecastStore menulis data (proses yang sama)."""
+        if forecast_storage is not None and self._listener is None:
+            self._listener = self._on_write
+            forecast_storage.add_write_listener(self._listener)
+
+    def detach(self):
+        if forecast_storage is not None and self._listener is not None:
+            forecast_storage.remove_write_listener(self._listener)
+            self._listener = None
+
+    # --- query ---
+    def _match_locations(self, kind, location_name):
+        """Kunci lokasi terindeks untuk nama query: persis/alias, lalu awalan, lalu substring."""
+        key = location_key(location_name)
+        records = self._records[kind]
+        exact = sorted(k for k in _ALIAS_GROUPS.get(key, {key}) if k in records)
+        if exact or not key:
+            return exact
+        compact = key.replace(" ", "")
+        prefix = sorted(k for k in records if k.startswith(key) or k.replace(" ", "").startswith(compact))
+        if prefix:
+            return prefix
+        return sorted(k for k in records if key in k or compact in k.replace(" ", ""))
+
+    def _locations(self, kind, location_name=None, parent_location=None):
+        if location_name:
+            return self._match_locations(kind, location_name)
+        if parent_location:
+            return sorted(self._children[kind].get(location_key(parent_location), ()))
+        return list(self._records[kind])
+
+    def query(self, location_name=None, parent_location=None, date_from=None, date_to=None,
+              kind='daily', source=None):
+        """
+        Prakiraan terbaru yang cocok, urut lokasi lalu tanggal target (lalu jam untuk hourly).
+
+        Args:
+            location_name: nama lokasi (ternormalisasi, alias, lalu awalan/substring), e.g. 'Sampit'
+            parent_location: nama induk lokasi (ternormalisasi)
+            date_from / date_to: rentang tanggal target inklusif (date atau 'YYYY-MM-DD')
+            source: e.g. 'weather.com', 'bmkg.go.id'
+        """
+        if kind not in KINDS:
+            raise ValueError(f"Jenis data tidak dikenal: {kind} (pilih: {', '.join(KINDS)})")
+        date_from, date_to = _as_date(date_from), _as_date(date_to)
+        results = []
+        with self._lock:
+            records, dates = self._records[kind], self._dates[kind]
+            for loc in self._locations(kind, location_name, parent_location):
+                loc_dates = dates.get(loc)
+                if not loc_dates:
+                    continue
+                lo = bisect_left(loc_dates, date_from) if date_from else 0
+                hi = bisect_right(loc_dates, date_to) if date_to else len(loc_dates)
+                for target in loc_dates[lo:hi]:
+                    for (row_source, _), row in sorted(records[loc][target].items(), key=lambda kv: str(kv[0])):
+                        if source is None or row_source == source:
+                            results.append(row)
+        return results
+
+    def latest(self, location_name, days=3, kind='daily', start=None, source=None):
+        """Prakiraan terbaru untuk `days` hari mulai `start` (default hari ini), e.g. latest('Sampit', 3)."""
+        start = _as_date(start) or date.today()
+        return self.query(location_name=location_name, date_from=start,
+                          date_to=start + timedelta(days=max(1, int(days)) - 1), kind=kind, source=source)
+
+    def locations(self, kind='daily'):
+        with self._lock:
+            return sorted(self._names.get(loc, loc) for loc in self._records[kind])
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rows': self.rows,
+                'undated_rows': self.undated_rows,
+                'locations': {kind: len(self._records[kind]) for kind in KINDS},
+                'files': len(self._seen_files),
+                'last_refresh': self.last_refresh,
+            }
+
+
+# --- HTTP ---
+def _first(params, name, default=None):
+    values = params.get(name)
+    return values[0] if values else default
+
+
+def _make_handler(index):
+    class ForecastHandler(BaseHTTPRequestHandler):
+        """GET /forecast?location=..|parent=..&days=N|date=|from=&to=&kind=&source=, /locations, /stats"""
+
+        def _send(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            params = parse_qs(parsed.query)
+            path = parsed.path.rstrip('/')
+            try:
+                if path == '/stats':
+                    self._send(200, index.stats())
+                elif path == '/locations':
+                    self._send(200, index.locations(_first(params, 'kind', 'daily')))
+                elif path == '/forecast':
+                    location, parent = _first(params, 'location'), _first(params, 'parent')
+                    kind, source = _first(params, 'kind', 'daily'), _first(params, 'source')
+                    if not (location or parent):
+                        self._send(400, {'error': "parameter 'location' atau 'parent' wajib diisi"})
+                    elif _first(params, 'days') and location:
+                        self._send(200, index.latest(location, int(_first(params, 'days')), kind,
+                                                     _first(params, 'start'), source))
+                    else:
+                        single = _first(params, 'date')
+                        self._send(200, index.query(location, parent, _first(params, 'from', single),
+                                                    _first(params, 'to', single), kind, source))
+                else:
+                    self._send(404, {'error': 'tidak ditemukan'})
+            except ValueError as e:
+                self._send(400, {'error': str(e)})
+
+        def log_message(self, *args):
+            pass
+
+    return ForecastHandler
+
+
+def serve(index, host='127.0.0.1', port=DEFAULT_PORT, refresh_interval_s=DEFAULT_REFRESH_INTERVAL_S):
+    """Jalankan endpoint HTTP (blocking) dengan refresh incremental berkala di thread daemon."""
+    def refresher():
+        while True:
+            time.sleep(refresh_interval_s)
+            try:
+                added = index.refresh()
+                if added:
+                    print(f"[forecast-query] Refresh: {added} baris baru.")
+            except Exception as e:
+                print(f"Warning: refresh gagal: {e}")
+
+    if refresh_interval_s:
+        threading.Thread(target=refresher, daemon=True).start()
+    server = ThreadingHTTPServer((host, port), _make_handler(index))
+    print(f"[forecast-query] Melayani http://{host}:{port}/forecast?location=Sampit&days=3")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Forecast query API berhenti.")
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API baca prakiraan terbaru (indeks in-memory)")
+    parser.add_argument('--store-root', default=DEFAULT_STORE_ROOT)
+    parser.add_argument('--json-glob', default=DEFAULT_JSON_GLOB, help="file JSON hasil mode csv ('' = abaikan)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--refresh-interval', type=int, default=DEFAULT_REFRESH_INTERVAL_S)
+    args = parser.parse_args()
+
+    index = ForecastIndex.load(args.store_root, args.json_glob, listen=False)
+    serve(index, args.host, args.port, args.refresh_interval)
+
+
+if __name__ == "__main__":
+    main()
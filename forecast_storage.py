@@ -0,0 +1,473 @@
+# forecast_storage.py (V27)
+# Penyimpanan riwayat prakiraan dalam dataset Parquet terpartisi
+# (source / province / scrape_date), menggantikan file JSON+CSV bertimestamp.
+
+import os
+import re
+import threading
+import uuid
+from datetime import datetime
+from operator import attrgetter
+from urllib.parse import urlparse
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pandas as pd
+
+from pydantic import BaseModel
+
+from normalize import normalize_frame
+from reconcile import province_hint, province_name
+from shared_state import file_lock
+
+DEFAULT_STORE_ROOT = "forecast_store"
+
+PARTITION_SCHEMA = pa.schema([
+    ('source', pa.string()),
+    ('province', pa.string()),
+    ('scrape_date', pa.date32()),
+])
+
+_COMMON_FIELDS = [
+    ('scrape_time', pa.timestamp('us')),
+    ('parent_location', pa.string()),
+    ('location_name', pa.string()),
+    ('source_url', pa.string()),
+    ('forecast_period', pa.string()),
+    # Mode incremental: 'insert' / 'update' (null untuk mode append penuh)
+    ('change', pa.string()),
+    ('row_hash', pa.uint64()),
+]
+
+# Kolom per jenis data (di luar kolom partisi)
+TABLE_SCHEMAS = {
+    'daily': pa.schema(_COMMON_FIELDS + [
+        ('date_day', pa.string()),
+        ('high_temp', pa.string()),
+        ('low_temp', pa.string()),
+        ('condition_summary', pa.string()),
+        ('precipitation_chance', pa.string()),
+        ('wind_speed', pa.string()),
+        # Kolom numerik hasil normalize.normalize_frame
+        ('high_temp_c', pa.float64()),
+        ('low_temp_c', pa.float64()),
+        ('precip_min', pa.float64()),
+        ('precip_max', pa.float64()),
+        ('wind_kmh', pa.float64()),
+        ('wind_dir_deg', pa.float64()),
+        ('target_date', pa.date32()),
+    ]),
+    'hourly': pa.schema(_COMMON_FIELDS + [
+        ('date_day_name', pa.string()),
+        ('time_of_day', pa.string()),
+        ('temp', pa.string()),
+        ('condition', pa.string()),
+        ('feels_like', pa.string()),
+        ('wind', pa.string()),
+        ('temp_c', pa.float64()),
+        ('feels_like_c', pa.float64()),
+        ('wind_kmh', pa.float64()),
+        ('wind_dir_deg', pa.float64()),
+        ('target_date', pa.date32()),
+    ]),
+    'monthly': pa.schema(_COMMON_FIELDS + [
+        ('date_month_day', pa.string()),
+        ('day_temp', pa.string()),
+        ('night_temp', pa.string()),
+        ('condition_summary', pa.string()),
+        ('precipitation_chance', pa.string()),
+        ('day_temp_c', pa.float64()),
+        ('night_temp_c', pa.float64()),
+        ('precip_min', pa.float64()),
+        ('precip_max', pa.float64()),
+        ('target_date', pa.date32()),
+    ]),
+}
+
+
+# Kolom kunci (selain source & location_name) dan kolom nilai yang di-hash per jenis data
+_DATE_LABEL_COLUMNS = {'daily': 'date_day', 'hourly': 'date_day_name', 'monthly': 'date_month_day'}
+_EXTRA_KEY_COLUMNS = {'daily': [], 'hourly': ['time_of_day'], 'monthly': []}
+VALUE_COLUMNS = {
+    'daily': ['high_temp', 'low_temp', 'condition_summary', 'precipitation_chance', 'wind_speed'],
+    'hourly': ['temp', 'condition', 'feels_like', 'wind'],
+    'monthly': ['day_temp', 'night_temp', 'condition_summary', 'precipitation_chance'],
+}
+
+# Listener penulisan: fn(root, kind, df, paths) dipanggil setelah file Parquet baru ditulis
+# (dipakai forecast_query.ForecastIndex untuk refresh incremental dalam proses yang sama)
+_WRITE_LISTENERS = []
+
+
+def add_write_listener(listener):
+    if listener not in _WRITE_LISTENERS:
+        _WRITE_LISTENERS.append(listener)
+
+
+def remove_write_listener(listener):
+    if listener in _WRITE_LISTENERS:
+        _WRITE_LISTENERS.remove(listener)
+
+
+# Satu lock per (root, kind): indeks nilai terakhir dibaca-ubah-tulis saat upsert.
+# Antar proses (worker_farm) ditambah lock file pada _latest/<kind>.parquet.
+_UPSERT_LOCKS = {}
+_UPSERT_LOCKS_GUARD = threading.Lock()
+
+
+def _upsert_lock(root, kind):
+    with _UPSERT_LOCKS_GUARD:
+        return _UPSERT_LOCKS.setdefault((os.path.abspath(root), kind), threading.Lock())
+
+
+def _target_keys(kind, df):
+    """Tanggal target ISO jika berhasil dinormalisasi, selain itu label mentah dari halaman."""
+    raw = df[_DATE_LABEL_COLUMNS[kind]].astype(str)
+    if 'target_date' not in df.columns:
+        return raw
+    return pd.to_datetime(df['target_date']).dt.strftime('%Y-%m-%d').fillna(raw)
+
+
+def key_hashes(kind, df):
+    """Hash kunci baris: source + location_name + tanggal target (+ jam untuk hourly)."""
+    keys = df[['source', 'location_name'] + _EXTRA_KEY_COLUMNS[kind]].astype(str)
+    keys = keys.assign(target_key=_target_keys(kind, df))
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+
+def row_hashes(kind, df):
+    """Hash nilai prakiraan (kolom teks asli) per baris."""
+    return pd.util.hash_pandas_object(df[VALUE_COLUMNS[kind]].astype(str), index=False).to_numpy()
+
+
+def source_from_url(url):
+    """'https://www.bmkg.go.id/...' -> 'bmkg.go.id'"""
+    host = (urlparse(url or "").hostname or "unknown").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def province_slug(parent_location):
+    """Nama partisi provinsi: huruf kecil, non-alfanumerik -> '_' (e.g., 'Kalimantan Tengah' -> 'kalimantan_tengah')."""
+    slug = re.sub(r'[^a-z0-9]+', '_', (parent_location or "").lower()).strip('_')
+    return slug or "unknown"
+
+
+def province_of(parent_location):
+    """
+    Provinsi untuk partisi. weather.com memakai 'Kota, Provinsi, Negara' sebagai parent_location:
+    'Sampit (Hasan) Airport, Central Kalimantan, Indonesia' -> 'Kalimantan Tengah' (sama dengan BMKG).
+    """
+    return province_name(province_hint(None, parent_location))
+
+
+def _common_values(parent_location, source_url, forecast_period, scrape_time):
+    return {
+        'scrape_time': scrape_time,
+        'parent_location': parent_location,
+        'source_url': source_url,
+        'forecast_period': forecast_period,
+        'source': source_from_url(source_url),
+        'province': province_slug(province_of(parent_location)),
+        'scrape_date': scrape_time.date(),
+    }
+
+
+def output_to_rows(record, scrape_time):
+    """
+    Normalisasi satu hasil UniversalOutputV27 (dict) menjadi baris per jenis data.
+
+    Returns:
+        dict: {'daily': [...], 'hourly': [...], 'monthly': [...]} berisi dict baris
+    """
+    parent_location = record.get('parent_location')
+    common = _common_values(parent_location, record.get('source_url'), record.get('forecast_period'), scrape_time)
+
+    rows = {'daily': [], 'hourly': [], 'monthly': []}
+    for location_forecast in record.get('all_locations_forecast') or []:
+        for daily_entry in location_forecast['daily_forecasts']:
+            rows['daily'].append({**common, 'location_name': location_forecast['location_name'], **daily_entry})
+
+    # Data per jam & bulanan berlaku untuk lokasi induk
+    for daily_group in record.get('hourly_forecasts_grouped') or []:
+        for hourly_entry in daily_group['hourly_entries']:
+            rows['hourly'].append({**common, 'location_name': parent_location,
+                                   'date_day_name': daily_group['date_day_name'], **hourly_entry})
+
+    for monthly_entry in record.get('monthly_forecasts') or []:
+        rows['monthly'].append({**common, 'location_name': parent_location, **monthly_entry})
+    return rows
+
+
+def _extend_columns(columns, entries, **constants):
+    """Tambahkan field tiap entri model ke list per kolom (satu attrgetter per grup, tanpa dict per baris)."""
+    if not entries:
+        return
+    fields = list(type(entries[0]).model_fields)
+    for name, values in zip(fields, zip(*map(attrgetter(*fields), entries))):
+        columns.setdefault(name, []).extend(values)
+    for name, value in constants.items():
+        columns.setdefault(name, []).extend([value] * len(entries))
+
+
+def model_to_columns(model, scrape_time):
+    """
+    Versi kolumnar output_to_rows() untuk model UniversalOutputV27 yang sudah tervalidasi.
+
+    Nilai dibaca langsung dari atribut model (tanpa model_dump()). Kolom umum disimpan
+    sebagai skalar dan disebar oleh pandas saat DataFrame dibuat.
+
+    Returns:
+        dict: {'daily': {kolom: list | skalar}, 'hourly': {...}, 'monthly': {...}}
+    """
+    parent_location = model.parent_location
+    common = _common_values(parent_location, model.source_url, model.forecast_period, scrape_time)
+
+    columns = {'daily': {}, 'hourly': {}, 'monthly': {}}
+    for location_forecast in model.all_locations_forecast:
+        _extend_columns(columns['daily'], location_forecast.daily_forecasts,
+                        location_name=location_forecast.location_name)
+    for daily_group in model.hourly_forecasts_grouped:
+        _extend_columns(columns['hourly'], daily_group.hourly_entries,
+                        location_name=parent_location, date_day_name=daily_group.date_day_name)
+    _extend_columns(columns['monthly'], model.monthly_forecasts, location_name=parent_location)
+
+    return {kind: {**common, **kind_columns} if kind_columns else [] for kind, kind_columns in columns.items()}
+
+
+def record_to_rows(record, scrape_time):
+    """output_to_rows() untuk dict, model_to_columns() untuk model pydantic."""
+    if isinstance(record, BaseModel):
+        return model_to_columns(record, scrape_time)
+    return output_to_rows(record, scrape_time)
+
+
+class ParquetForecastStore:
+    """
+    Dataset Parquet per jenis data: <root>/<kind>/source=.../province=.../scrape_date=.../part-*.parquet
+
+    Kolom bertipe (timestamp, date, string) dan partisi hive memungkinkan query rentang
+    (misal semua prakiraan Sampit 30 hari terakhir) tanpa membaca seluruh riwayat.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_ROOT):
+        self.root = root
+        self.partitioning = ds.partitioning(PARTITION_SCHEMA, flavor='hive')
+
+    def _kind_dir(self, kind):
+        if kind not in TABLE_SCHEMAS:
+            raise ValueError(f"Jenis data tidak dikenal: {kind} (pilih: {', '.join(TABLE_SCHEMAS)})")
+        return os.path.join(self.root, kind)
+
+    def _schema(self, kind):
+        schema = TABLE_SCHEMAS[kind]
+        for field in PARTITION_SCHEMA:
+            schema = schema.append(field)
+        return schema
+
+    def _prepare_frame(self, kind, rows):
+        df = normalize_frame(kind, pd.DataFrame(rows))
+        df['row_hash'] = row_hashes(kind, df)
+        if 'change' not in df.columns:
+            df['change'] = None
+        return df
+
+    def _write_frame(self, kind, df):
+        table = pa.Table.from_pandas(df, schema=self._schema(kind), preserve_index=False)
+        paths = []
+        ds.write_dataset(
+            table,
+            self._kind_dir(kind),
+            format='parquet',
+            partitioning=self.partitioning,
+            existing_data_behavior='overwrite_or_ignore',
+            basename_template=f"part-{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+            file_visitor=lambda written: paths.append(written.path),
+        )
+        for listener in list(_WRITE_LISTENERS):
+            try:
+                listener(self.root, kind, df, paths)
+            except Exception as e:
+                print(f"Warning: listener penyimpanan gagal: {e}")
+        return table.num_rows
+
+    def write_rows(self, kind, rows):
+        """Tambahkan baris ke dataset `kind` (dinormalisasi dulu). Mengembalikan jumlah baris yang ditulis."""
+        if not rows:
+            return 0
+        return self._write_frame(kind, self._prepare_frame(kind, rows))
+
+    # --- MODE INCREMENTAL (upsert) ---
+    def _latest_path(self, kind):
+        return os.path.join(self.root, "_latest", f"{kind}.parquet")
+
+    def _load_latest(self, kind):
+        """Indeks nilai terakhir per kunci: DataFrame (key_hash, row_hash, issue_time)."""
+        path = self._latest_path(kind)
+        if os.path.exists(path):
+            return pd.read_parquet(path)
+
+        # Belum ada indeks: bangun sekali dari riwayat yang sudah tersimpan
+        history = self.query(kind)
+        if history.empty:
+            return pd.DataFrame({'key_hash': pd.Series(dtype='uint64'), 'row_hash': pd.Series(dtype='uint64'),
+                                 'issue_time': pd.Series(dtype='datetime64[us]')})
+        history = history.sort_values('scrape_time', kind='stable')
+        latest = pd.DataFrame({
+            'key_hash': key_hashes(kind, history),
+            'row_hash': row_hashes(kind, history),
+            'issue_time': history['scrape_time'].to_numpy(),
+        })
+        return latest.drop_duplicates('key_hash', keep='last').reset_index(drop=True)
+
+    def _save_latest(self, kind, latest):
+        path = self._latest_path(kind)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        latest.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def upsert_rows(self, kind, rows):
+        """
+        Tulis hanya baris yang baru atau berubah dibanding nilai terakhir yang tersimpan.
+
+        Kunci: source + location_name + tanggal target (+ jam untuk hourly). Baris ditandai
+        change='insert'/'update' dengan scrape_time sebagai waktu terbit (issue time).
+
+        Returns:
+            dict: {'insert': n, 'update': n, 'unchanged': n}
+        """
+        counts = {'insert': 0, 'update': 0, 'unchanged': 0}
+        if not rows:
+            return counts
+
+        df = self._prepare_frame(kind, rows)
+        df['_key_hash'] = key_hashes(kind, df)
+        # Kunci ganda dalam satu batch: pakai baris terakhir
+        df = df.drop_duplicates('_key_hash', keep='last')
+
+        with _upsert_lock(self.root, kind), file_lock(self._latest_path(kind)):
+            latest = self._load_latest(kind)
+            previous = pd.Series(latest['row_hash'].to_numpy(), index=latest['key_hash'].to_numpy())
+            old_hash = previous.reindex(df['_key_hash'].to_numpy()).to_numpy()
+            is_new = pd.isna(old_hash)
+            changed = is_new | (old_hash != df['row_hash'].to_numpy())
+
+            counts['insert'] = int(is_new.sum())
+            counts['update'] = int((changed & ~is_new).sum())
+            counts['unchanged'] = int((~changed).sum())
+            if not changed.any():
+                return counts
+
+            out = df[changed].copy()
+            out['change'] = pd.Series(is_new[changed], index=out.index).map({True: 'insert', False: 'update'})
+            self._write_frame(kind, out.drop(columns=['_key_hash']))
+
+            updated = pd.DataFrame({
+                'key_hash': out['_key_hash'].to_numpy(),
+                'row_hash': out['row_hash'].to_numpy(),
+                'issue_time': pd.to_datetime(out['scrape_time']).to_numpy(),
+            })
+            latest = pd.concat([latest, updated], ignore_index=True).drop_duplicates('key_hash', keep='last')
+            self._save_latest(kind, latest)
+        return counts
+
+    def upsert(self, record, scrape_time=None):
+        """Versi incremental dari append(). Mengembalikan hitungan insert/update/unchanged per jenis."""
+        scrape_time = scrape_time or datetime.now()
+        rows = record_to_rows(record, scrape_time)
+        return {kind: self.upsert_rows(kind, kind_rows) for kind, kind_rows in rows.items()}
+
+    def forecast_evolution(self, location_name, target_date, kind='daily', source=None):
+        """
+        Riwayat nilai prakiraan untuk satu lokasi & tanggal target, urut waktu terbit.
+
+        Contoh: store.forecast_evolution('Sampit', '2025-12-05')
+        """
+        target = pd.Timestamp(target_date).date()
+        df = self.query(kind, location_name=location_name, source=source)
+        if df.empty:
+            return df
+        df = df[pd.to_datetime(df['target_date']).dt.date == target]
+        return df.sort_values('scrape_time', kind='stable').reset_index(drop=True)
+
+    def append(self, record, scrape_time=None):
+        """Simpan satu hasil scrape (dict atau model UniversalOutputV27). Mengembalikan jumlah baris per jenis."""
+        scrape_time = scrape_time or datetime.now()
+        rows = record_to_rows(record, scrape_time)
+        return {kind: self.write_rows(kind, kind_rows) for kind, kind_rows in rows.items()}
+
+    def dataset(self, kind):
+        path = self._kind_dir(kind)
+        if not os.path.isdir(path):
+            return None
+        return ds.dataset(path, format='parquet', partitioning=self.partitioning, schema=self._schema(kind))
+
+    def query(self, kind, location_name=None, source=None, province=None, since=None, until=None,
+              columns=None, exact=False):
+        """
+        Query riwayat sebagai pandas DataFrame.
+
+        Args:
+            kind: 'daily' | 'hourly' | 'monthly'
+            location_name: nama lokasi (substring, case-insensitive kecuali exact=True)
+            source / province: filter partisi (e.g., 'weather.com', 'Kalimantan Tengah' atau 'Central Kalimantan')
+            since / until: rentang waktu scrape (datetime atau date, inklusif)
+            columns: subset kolom yang dibaca
+
+        Contoh: store.query('daily', location_name='Sampit', since=datetime.now() - timedelta(days=30))
+        """
+        dataset = self.dataset(kind)
+        if dataset is None:
+            return pa.Table.from_pylist([], schema=self._schema(kind)).to_pandas()
+
+        expr = None
+
+        def add(condition):
+            nonlocal expr
+            expr = condition if expr is None else expr & condition
+
+        if source:
+            add(ds.field('source') == source)
+        if province:
+            add(ds.field('province') == province_slug(province_name(province)))
+        if since is not None:
+            since_date = since.date() if isinstance(since, datetime) else since
+            add(ds.field('scrape_date') >= since_date)
+            if isinstance(since, datetime):
+                add(ds.field('scrape_time') >= pa.scalar(since, pa.timestamp('us')))
+        if until is not None:
+            until_date = until.date() if isinstance(until, datetime) else until
+            add(ds.field('scrape_date') <= until_date)
+            if isinstance(until, datetime):
+                add(ds.field('scrape_time') <= pa.scalar(until, pa.timestamp('us')))
+        if location_name:
+            if exact:
+                add(ds.field('location_name') == location_name)
+            else:
+                add(pc.match_substring(ds.field('location_name'), location_name, ignore_case=True))
+
+        return dataset.to_table(columns=columns, filter=expr).to_pandas()
+
+    def compact(self, kind, min_files=8):
+        """Gabungkan partisi yang berisi banyak file kecil menjadi satu file. Mengembalikan jumlah partisi."""
+        dataset = self.dataset(kind)
+        if dataset is None:
+            return 0
+
+        by_dir = {}
+        for path in dataset.files:
+            by_dir.setdefault(os.path.dirname(path), []).append(path)
+
+        compacted = 0
+        for directory, files in by_dir.items():
+            if len(files) < min_files:
+                continue
+            table = ds.dataset(files, format='parquet', schema=TABLE_SCHEMAS[kind]).to_table()
+            ds.write_dataset(table, directory, format='parquet',
+                             basename_template=f"compact-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+                             existing_data_behavior='overwrite_or_ignore')
+            for path in files:
+                os.remove(path)
+            compacted += 1
+        return compacted
@@ -0,0 +1,187 @@
+# http_fetcher.py (V27)
+# Tier fetch ringan sebelum Chromium: requests.Session bersama (keep-alive, pool
+# koneksi) dengan request kondisional ETag / If-Modified-Since. Tier yang berhasil
+# diingat per domain, sehingga situs yang butuh JavaScript langsung ke browser.
+# Tier browser hanya diingat selama BROWSER_TIER_TTL_S; setelah itu tier HTTP dicoba lagi,
+# agar satu kegagalan sesaat tidak memindahkan domain ke browser selamanya.
+
+import contextlib
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+import lxml.html
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from shared_state import SharedJsonFile
+from text_reducer import DATE_TOKEN_RE, TEMPERATURE_RE
+
+FETCH_STATE_FILE = "fetch_state_v27.json"
+DEFAULT_POOL_SIZE = 16
+DEFAULT_TIMEOUT = 15
+
+TIER_HTTP = "http"
+TIER_BROWSER = "browser"
+BROWSER_TIER_TTL_S = 6 * 3600  # setelah ini tier HTTP diprobe ulang
+
+
+class FetchResult:
+    def __init__(self, url, status, html="", etag=None, last_modified=None):
+        self.url = url
+        self.status = status
+        self.html = html
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def not_modified(self):
+        return self.status == 304
+
+
+def _domain(url):
+    host = (urlparse(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def has_forecast_content(html, xpath_selector):
+    """
+    True jika HTML statis sudah memuat area prakiraan: elemen selector XPath browser (atau,
+    jika tidak ada, tabel) yang teksnya berisi suhu (angka + derajat) dan token tanggal/hari/jam.
+    Tabel navigasi atau kerangka kosong yang diisi JavaScript tidak lolos.
+    """
+    try:
+        doc = lxml.html.fromstring(html)
+    except (ValueError, lxml.etree.ParserError):
+        return False
+    for element in doc.xpath(xpath_selector) or doc.xpath('//table[.//td]'):
+        text = "\n".join(element.itertext())
+        if TEMPERATURE_RE.search(text) and DATE_TOKEN_RE.search(text):
+            return True
+    return False
+
+
+def html_to_texts(html, xpath_selector):
+    """
+    Ambil teks dari HTML statis seperti inner_text() di browser (baris per node teks).
+
+    Returns:
+        tuple: (list teks area prakiraan, teks body)
+    """
+    doc = lxml.html.fromstring(html)
+    for node in doc.xpath('//script | //style | //noscript | //template'):
+        node.drop_tree()
+
+    def text_of(element):
+        return "\n".join(t.strip() for t in element.itertext() if t.strip())
+
+    regions = [text_of(el) for el in doc.xpath(xpath_selector)]
+    body = doc.xpath('//body')
+    return regions, text_of(body[0] if body else doc)
+
+
+class TieredFetcher:
+    """
+    Fetcher HTTP dengan pool koneksi bersama dan memori per domain.
+
+    - fetch(): GET kondisional (If-None-Match / If-Modified-Since) dari validator tersimpan
+    - commit(): simpan validator setelah pipeline sukses (agar halaman yang gagal diproses
+      tidak "terkunci" oleh 304 pada run berikutnya)
+    - preferred_tier() / remember_tier(): tier mana yang berhasil untuk sebuah domain
+    """
+
+    def __init__(self, state_file=FETCH_STATE_FILE, pool_size=DEFAULT_POOL_SIZE, user_agent=None):
+        self.state_file = state_file
+        self.session = requests.Session()
+        retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if user_agent:
+            self.session.headers['User-Agent'] = user_agent
+        self._lock = threading.Lock()
+        self._validators = {}
+        self._tiers = {}
+        # File state dipakai bersama proses worker lain: baca ulang jika berubah, simpan dengan baca-gabung-tulis
+        self._file = SharedJsonFile(state_file, indent=2) if state_file else None
+        self._refresh()
+
+    def _refresh(self):
+        if self._file is None or not self._file.changed():
+            return
+        try:
+            state = self._file.load() or {}
+            self._validators = state.get('validators', {})
+            self._tiers = state.get('tiers', {})
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: state fetch {self.state_file} tidak terbaca ({e}), mulai dari kosong.")
+
+    @contextlib.contextmanager
+    def _updating(self):
+        with self._lock, (self._file.lock() if self._file else contextlib.nullcontext()):
+            self._refresh()
+            yield
+            if self._file is not None:
+                self._file.save({'validators': self._validators, 'tiers': self._tiers})
+
+    def preferred_tier(self, url):
+        """Tier yang diingat untuk domain URL; None jika belum ada atau tier browser sudah kedaluwarsa."""
+        with self._lock:
+            self._refresh()
+            entry = self._tiers.get(_domain(url))
+        if not isinstance(entry, dict):
+            entry = {'tier': entry, 'at': 0}  # format lama: string tier tanpa waktu
+        if entry['tier'] == TIER_BROWSER and time.time() - entry['at'] >= BROWSER_TIER_TTL_S:
+            return None
+        return entry['tier']
+
+    def remember_tier(self, url, tier):
+        # Tier browser selalu ditulis ulang: waktunya menentukan kapan HTTP diprobe lagi
+        if tier != TIER_BROWSER and self.preferred_tier(url) == tier:
+            return
+        with self._updating():
+            self._tiers[_domain(url)] = {'tier': tier, 'at': time.time()}
+
+    def fetch(self, url, conditional=True, timeout=DEFAULT_TIMEOUT):
+        """GET (kondisional). Melempar requests.RequestException jika gagal."""
+        headers = {}
+        if conditional:
+            with self._lock:
+                self._refresh()
+                validators = self._validators.get(url, {})
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+
+        response = self.session.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304:
+            return FetchResult(url, 304)
+        response.raise_for_status()
+        return FetchResult(url, response.status_code, response.text,
+                           etag=response.headers.get('ETag'),
+                           last_modified=response.headers.get('Last-Modified'))
+
+    def commit(self, result):
+        """Simpan validator ETag/Last-Modified dari respons yang sudah berhasil diproses."""
+        if not (result.etag or result.last_modified):
+            return
+        with self._updating():
+            self._validators[result.url] = {'etag': result.etag, 'last_modified': result.last_modified}
+
+    def close(self):
+        self.session.close()
+
+
+_SHARED_FETCHERS = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def get_shared_fetcher(state_file=FETCH_STATE_FILE, user_agent=None):
+    """Satu TieredFetcher (dan pool koneksinya) per file state, dipakai bersama semua scraper."""
+    with _SHARED_LOCK:
+        if state_file not in _SHARED_FETCHERS:
+            _SHARED_FETCHERS[state_file] = TieredFetcher(state_file, user_agent=user_agent)
+        return _SHARED_FETCHERS[state_file]
@@ -0,0 +1,242 @@
+# job_queue.py (V27)
+# Antrian job scraping yang tahan crash, berbasis SQLite (WAL), untuk dipakai bersama
+# oleh coordinator dan beberapa proses worker. Job di-lease dengan visibility timeout:
+# jika worker mati atau macet, lease kedaluwarsa dan job kembali ke antrian sampai
+# batas percobaan habis. Semua status tersimpan di disk, jadi run malam bisa dilanjutkan.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_QUEUE_FILE = "job_queue_v27.sqlite"
+DEFAULT_VISIBILITY_TIMEOUT_S = 15 * 60
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_BACKOFF_S = 60              # jeda sebelum job gagal dicoba lagi (x jumlah percobaan)
+
+QUEUED, LEASED, DONE, FAILED = "queued", "leased", "done", "failed"
+
+
+class Job:
+    def __init__(self, id, url, profile, priority, options, attempts, lease_owner, lease_expires):
+        self.id = id
+        self.url = url
+        self.profile = profile
+        self.priority = priority
+        self.options = json.loads(options) if options else {}
+        self.attempts = attempts
+        self.lease_owner = lease_owner
+        self.lease_expires = lease_expires
+
+    def __repr__(self):
+        return f"Job({self.id}, {self.url!r}, profile={self.profile!r}, attempt={self.attempts})"
+
+
+class JobQueue:
+    """
+    Antrian job SQLite dengan lease.
+
+    - enqueue(): tambah job (url, profil situs, prioritas); URL yang sudah antre/di-lease tidak diduplikasi
+    - lease(owner): ambil job prioritas tertinggi, tandai leased sampai visibility timeout
+    - heartbeat(): perpanjang lease job yang masih dikerjakan
+    - complete() / fail(): selesai, atau kembali ke antrian (dengan backoff) sampai max_attempts
+    - reclaim_expired(): lease kedaluwarsa (worker crash/macet) -> antre lagi atau failed
+
+    Setiap proses membuka JobQueue sendiri (koneksi SQLite tidak dibagi antar proses).
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_FILE, visibility_timeout_s=DEFAULT_VISIBILITY_TIMEOUT_S,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.visibility_timeout_s = visibility_timeout_s
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " url TEXT NOT NULL,"
+            " profile TEXT,"
+            " priority INTEGER NOT NULL DEFAULT 0,"
+            " options TEXT,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " available_at REAL NOT NULL,"
+            " lease_owner TEXT,"
+            " lease_expires REAL,"
+            " last_error TEXT,"
+            " result TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(status, priority DESC, available_at, id)"
+        )
+
+    def _transaction(self, fn):
+        """Jalankan fn(conn) dalam BEGIN IMMEDIATE (satu penulis antar proses)."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def enqueue(self, url, profile=None, priority=0, options=None, dedupe=True):
+        """Tambah satu job. Mengembalikan id job, atau None jika URL sudah ada di antrian (dedupe)."""
+        return self.enqueue_many([(url, profile, priority, options)], dedupe=dedupe)[0]
+
+    def enqueue_many(self, jobs, dedupe=True):
+        """jobs: iterable (url, profile, priority, options). Mengembalikan list id (None untuk duplikat)."""
+        now = time.time()
+
+        def insert(conn):
+            ids = []
+            for url, profile, priority, options in jobs:
+                if dedupe and conn.execute(
+                    "SELECT 1 FROM jobs WHERE url = ? AND status IN (?, ?)", (url, QUEUED, LEASED)
+                ).fetchone():
+                    ids.append(None)
+                    continue
+                cursor = conn.execute(
+                    "INSERT INTO jobs (url, profile, priority, options, status, available_at, created_at, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (url, profile, int(priority or 0), json.dumps(options) if options else None,
+                     QUEUED, now, now, now),
+                )
+                ids.append(cursor.lastrowid)
+            return ids
+
+        return self._transaction(insert)
+
+    def _reclaim(self, conn, now):
+        expired = conn.execute(
+            "SELECT id, attempts, lease_owner FROM jobs WHERE status = ? AND lease_expires < ?", (LEASED, now)
+        ).fetchall()
+        for job_id, attempts, owner in expired:
+            error = f"lease kedaluwarsa (worker {owner})"
+            if attempts >= self.max_attempts:
+                conn.execute("UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL,"
+                             " last_error = ?, updated_at = ? WHERE id = ?", (FAILED, error, now, job_id))
+            else:
+                conn.execute("UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL,"
+                             " last_error = ?, available_at = ?, updated_at = ? WHERE id = ?",
+                             (QUEUED, error, now, now, job_id))
+        return expired
+
+    def reclaim_expired(self):
+        """Kembalikan job dengan lease kedaluwarsa ke antrian. Mengembalikan [(id, attempts, owner)]."""
+        return self._transaction(lambda conn: self._reclaim(conn, time.time()))
+
+    def lease(self, owner, visibility_timeout_s=None, reclaim=True):
+        """
+        Lease job siap berikutnya (prioritas tertinggi, lalu terlama). None jika antrian kosong.
+
+        reclaim=False: lease kedaluwarsa tidak diambil alih di sini. Dipakai worker_farm, agar
+        coordinator masih melihatnya di expired_leases() dan bisa membunuh worker yang macet.
+        """
+        timeout = visibility_timeout_s or self.visibility_timeout_s
+
+        def take(conn):
+            now = time.time()
+            if reclaim:
+                self._reclaim(conn, now)
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? AND available_at <= ?"
+                " ORDER BY priority DESC, available_at, id LIMIT 1", (QUEUED, now)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_expires = ?,"
+                " updated_at = ? WHERE id = ?", (LEASED, owner, now + timeout, now, row[0])
+            )
+            return Job(*conn.execute(
+                "SELECT id, url, profile, priority, options, attempts, lease_owner, lease_expires"
+                " FROM jobs WHERE id = ?", (row[0],)
+            ).fetchone())
+
+        return self._transaction(take)
+
+    def heartbeat(self, job, visibility_timeout_s=None):
+        """Perpanjang lease. False jika lease sudah hilang (kedaluwarsa dan diambil alih)."""
+        expires = time.time() + (visibility_timeout_s or self.visibility_timeout_s)
+        updated = self._transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+            (expires, time.time(), job.id, LEASED, job.lease_owner)).rowcount)
+        if updated:
+            job.lease_expires = expires
+        return bool(updated)
+
+    def complete(self, job, result=None):
+        """Tandai job selesai. False jika lease sudah tidak dimiliki pemanggil."""
+        return bool(self._transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ?"
+            " WHERE id = ? AND status = ? AND lease_owner = ?",
+            (DONE, json.dumps(result) if result is not None else None, time.time(), job.id, LEASED,
+             job.lease_owner)).rowcount))
+
+    def fail(self, job, error, retry_at=None):
+        """
+        Job gagal: kembali ke antrian (available_at = retry_at atau backoff) atau FAILED
+        jika percobaan habis. Mengembalikan status baru, atau None jika lease sudah hilang.
+        """
+        now = time.time()
+        if job.attempts >= self.max_attempts:
+            status, available_at = FAILED, now
+        else:
+            status, available_at = QUEUED, retry_at or now + RETRY_BACKOFF_S * job.attempts
+
+        updated = self._transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET status = ?, available_at = ?, last_error = ?, lease_owner = NULL, lease_expires = NULL,"
+            " updated_at = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+            (status, available_at, str(error)[:2000], now, job.id, LEASED, job.lease_owner)).rowcount)
+        return status if updated else None
+
+    def release_owner(self, owner, error):
+        """Worker `owner` mati: job yang masih di-lease-nya langsung dikembalikan (tanpa menunggu timeout)."""
+        def release(conn):
+            now = time.time()
+            conn.execute("UPDATE jobs SET lease_expires = ? WHERE status = ? AND lease_owner = ?",
+                         (now - 1, LEASED, owner))
+            return [job_id for job_id, _, _ in self._reclaim(conn, now)]
+        return self._transaction(release)
+
+    def expired_leases(self):
+        """[(id, owner)] untuk lease yang sudah lewat visibility timeout (worker kemungkinan macet)."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, lease_owner FROM jobs WHERE status = ? AND lease_expires < ?", (LEASED, time.time())
+            ).fetchall()
+
+    def stats(self):
+        """Jumlah job per status, plus job antre yang sudah siap dikerjakan."""
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            ready = self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ? AND available_at <= ?",
+                                       (QUEUED, time.time())).fetchone()[0]
+        stats = {status: counts.get(status, 0) for status in (QUEUED, LEASED, DONE, FAILED)}
+        stats['ready'] = ready
+        return stats
+
+    def pending(self):
+        """True selama masih ada job antre atau di-lease."""
+        stats = self.stats()
+        return stats[QUEUED] + stats[LEASED] > 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def remove_queue(path=DEFAULT_QUEUE_FILE):
+    """Hapus file antrian beserta file WAL/SHM-nya."""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
@@ -0,0 +1,203 @@
+# normalize.py (V27)
+# Normalisasi numerik field teks hasil ekstraksi ("29 °C", "83–98%", "10 km/h W",
+# "Sel, 02 Des") menjadi kolom bertipe, diproses per batch dengan operasi string
+# pandas. Nilai unik diparse sekali lalu disebar ke semua baris (teks cuaca sangat
+# berulang), sehingga 1 juta baris tidak berarti 1 juta pemanggilan regex.
+
+import numpy as np
+import pandas as pd
+
+# Suhu tanpa unit di atas ambang ini dianggap Fahrenheit (weather.com: "90°").
+# Aman untuk iklim tropis Indonesia (18-38 °C vs 64-100 °F).
+FAHRENHEIT_THRESHOLD = 50.0
+
+_NUMBER = r'-?\d+(?:[.,]\d+)?'
+_TEMP_RE = rf'(?P<value>{_NUMBER})\s*°?\s*(?P<unit>[CFcf](?![a-z]))?'
+_PRECIP_RE = rf'(?P<low>{_NUMBER})\s*%?\s*(?:[-–]\s*(?P<high>{_NUMBER}))?\s*%'
+_WIND_SPEED_RE = rf'(?P<value>{_NUMBER})\s*(?P<unit>km/h|kmh|kph|mph|m/s|knots?|kt)'
+_WIND_DIR_RE = r'\b(?P<dir>NNE|ENE|ESE|SSE|SSW|WSW|WNW|NNW|NE|SE|SW|NW|TL|TG|BD|BL|N|E|S|W|U|T|B)\b'
+_DAY_RE = r'(?<![\d:])(?P<day>\d{1,2})(?![\d:])'
+_MONTH_RE = r'(?i)\b(?P<month>jan|feb|mar|apr|mei|may|jun|jul|agu|ags|aug|sep|okt|oct|nov|des|dec)[a-z]*\.?'
+_WEEKDAY_RE = (r'(?i)\b(?P<weekday>monday|tuesday|wednesday|thursday|friday|saturday|sunday|'
+               r'senin|selasa|rabu|kamis|jumat|sabtu|minggu|mon|tue|wed|thu|fri|sat|sun|'
+               r'sen|sel|rab|kam|jum|sab|min)\b')
+
+_WIND_FACTORS = {'km/h': 1.0, 'kmh': 1.0, 'kph': 1.0, 'mph': 1.609344, 'm/s': 3.6,
+                 'knot': 1.852, 'knots': 1.852, 'kt': 1.852}
+
+# Arah mata angin (Inggris + singkatan Indonesia: Utara, Timur, Selatan, Barat, Timur Laut,
+# Tenggara, Barat Daya, Barat Laut) -> derajat
+_WIND_DIRECTIONS = {
+    'N': 0.0, 'NNE': 22.5, 'NE': 45.0, 'ENE': 67.5, 'E': 90.0, 'ESE': 112.5, 'SE': 135.0, 'SSE': 157.5,
+    'S': 180.0, 'SSW': 202.5, 'SW': 225.0, 'WSW': 247.5, 'W': 270.0, 'WNW': 292.5, 'NW': 315.0, 'NNW': 337.5,
+    'U': 0.0, 'TL': 45.0, 'T': 90.0, 'TG': 135.0, 'BD': 225.0, 'B': 270.0, 'BL': 315.0,
+}
+
+_MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'mei': 5, 'may': 5, 'jun': 6, 'jul': 7,
+    'agu': 8, 'ags': 8, 'aug': 8, 'sep': 9, 'okt': 10, 'oct': 10, 'nov': 11, 'des': 12, 'dec': 12,
+}
+
+_WEEKDAYS = {
+    'mon': 0, 'monday': 0, 'sen': 0, 'senin': 0,
+    'tue': 1, 'tuesday': 1, 'sel': 1, 'selasa': 1,
+    'wed': 2, 'wednesday': 2, 'rab': 2, 'rabu': 2,
+    'thu': 3, 'thursday': 3, 'kam': 3, 'kamis': 3,
+    'fri': 4, 'friday': 4, 'jum': 4, 'jumat': 4,
+    'sat': 5, 'saturday': 5, 'sab': 5, 'sabtu': 5,
+    'sun': 6, 'sunday': 6, 'min': 6, 'minggu': 6,
+}
+
+# Kolom teks -> kolom numerik per jenis data
+NORMALIZED_COLUMNS = {
+    'daily': {
+        'high_temp': ('temp', 'high_temp_c'),
+        'low_temp': ('temp', 'low_temp_c'),
+        'precipitation_chance': ('precip', ('precip_min', 'precip_max')),
+        'wind_speed': ('wind', ('wind_kmh', 'wind_dir_deg')),
+        'date_day': ('date', 'target_date'),
+    },
+    'hourly': {
+        'temp': ('temp', 'temp_c'),
+        'feels_like': ('temp', 'feels_like_c'),
+        'wind': ('wind', ('wind_kmh', 'wind_dir_deg')),
+        'date_day_name': ('date', 'target_date'),
+    },
+    'monthly': {
+        'day_temp': ('temp', 'day_temp_c'),
+        'night_temp': ('temp', 'night_temp_c'),
+        'precipitation_chance': ('precip', ('precip_min', 'precip_max')),
+        'date_month_day': ('date', 'target_date'),
+    },
+}
+
+
+_MISSING = ['N/A', 'n/a', 'NA', '-', '--', '']
+
+
+def _factorize(series):
+    """Kode per baris + nilai unik sebagai Series string (NaN / 'N/A' -> kode -1)."""
+    codes, uniques = pd.factorize(series.replace(_MISSING, np.nan), use_na_sentinel=True)
+    return codes, pd.Series(uniques, dtype=object).astype(str)
+
+
+def _spread(codes, values, fill=np.nan):
+    """Sebarkan hasil per nilai unik kembali ke semua baris."""
+    values = np.asarray(values)
+    out = np.append(values, np.array([fill], dtype=values.dtype)) if len(values) else np.array([fill])
+    return out[np.where(codes < 0, len(values), codes)]
+
+
+def _to_float(series):
+    return pd.to_numeric(series.str.replace(',', '.', regex=False), errors='coerce').to_numpy(dtype=float)
+
+
+def parse_temperature(series, fahrenheit_threshold=FAHRENHEIT_THRESHOLD):
+    """'29 °C' / '90°' / '84 F' -> derajat Celsius (float, NaN jika tidak terbaca)."""
+    codes, uniques = _factorize(series)
+    parts = uniques.str.extract(_TEMP_RE)
+    value = _to_float(parts['value'])
+    unit = parts['unit'].str.upper().to_numpy(dtype=object)
+    is_f = (unit == 'F') | (pd.isna(unit) & (value > fahrenheit_threshold))
+    celsius = np.where(is_f, (value - 32.0) * 5.0 / 9.0, value)
+    return _spread(codes, np.round(celsius, 1))
+
+
+def parse_precipitation(series):
+    """'83–98%' -> (0.83, 0.98); '73%' -> (0.73, 0.73). Pecahan 0..1."""
+    codes, uniques = _factorize(series)
+    parts = uniques.str.extract(_PRECIP_RE)
+    low = _to_float(parts['low']) / 100.0
+    high = _to_float(parts['high'].fillna(parts['low'])) / 100.0
+    return _spread(codes, low), _spread(codes, high)
+
+
+def parse_wind(series):
+    """'10 km/h W' / 'NNE 4 mph' -> (km/h, arah dalam derajat)."""
+    codes, uniques = _factorize(series)
+    speed = uniques.str.extract(_WIND_SPEED_RE)
+    factor = speed['unit'].str.lower().map(_WIND_FACTORS).to_numpy(dtype=float)
+    kmh = np.round(_to_float(speed['value']) * factor, 1)
+    direction = uniques.str.extract(_WIND_DIR_RE)['dir'].map(_WIND_DIRECTIONS).to_numpy(dtype=float)
+    return _spread(codes, kmh), _spread(codes, direction)
+
+
+def parse_date_labels(series, reference):
+    """
+    Label tanggal halaman -> tanggal ISO (datetime64), relatif terhadap tanggal scrape.
+
+    Format yang dikenali: 'Sel, 02 Des', '02 Dec', 'Dec 1', 'Wed 03' (hanya tanggal),
+    'Tuesday' / 'Selasa' (hanya nama hari -> kejadian berikutnya sejak tanggal referensi).
+
+    Args:
+        series: label tanggal
+        reference: tanggal scrape (scalar atau Series sepanjang `series`)
+    """
+    codes, uniques = _factorize(series)
+    day = _spread(codes, pd.to_numeric(uniques.str.extract(_DAY_RE)['day'], errors='coerce').to_numpy(dtype=float))
+    month_tok = uniques.str.extract(_MONTH_RE)['month'].str.lower().map(_MONTHS).to_numpy(dtype=float)
+    weekday_tok = uniques.str.extract(_WEEKDAY_RE)['weekday'].str.lower().map(_WEEKDAYS).to_numpy(dtype=float)
+    month = _spread(codes, month_tok)
+    weekday = _spread(codes, weekday_tok)
+
+    if np.ndim(reference) == 0:
+        ref = pd.Series(pd.Timestamp(reference), index=series.index)
+    else:
+        ref = pd.Series(pd.to_datetime(np.asarray(reference)), index=series.index)
+    ref = ref.dt.normalize()
+    ref_year = ref.dt.year.to_numpy(dtype=float)
+    ref_month = ref.dt.month.to_numpy(dtype=float)
+    ref_day = ref.dt.day.to_numpy(dtype=float)
+
+    has_day = ~np.isnan(day)
+    has_month = ~np.isnan(month)
+
+    # Tanggal tanpa bulan ('Wed 03'): bulan referensi, atau bulan berikutnya jika tanggal sudah lewat
+    roll_month = has_day & ~has_month & (day < ref_day - 3)
+    month_full = np.where(has_month, month, np.where(roll_month, ref_month % 12 + 1, ref_month))
+    year = np.where(roll_month & (ref_month == 12), ref_year + 1, ref_year)
+    # Pergantian tahun ('02 Jan' dilihat pada bulan Desember)
+    year = np.where(has_month & (month_full < ref_month - 6), year + 1, year)
+
+    dates = pd.to_datetime(
+        pd.DataFrame({'year': year, 'month': month_full, 'day': np.where(has_day, day, np.nan)}),
+        errors='coerce',
+    )
+
+    # Hanya nama hari ('Tuesday'): kejadian berikutnya sejak tanggal referensi
+    weekday_only = ~has_day & ~np.isnan(weekday)
+    if weekday_only.any():
+        offset = (weekday - ref.dt.weekday.to_numpy(dtype=float)) % 7
+        by_weekday = ref + pd.to_timedelta(np.where(weekday_only, offset, 0), unit='D')
+        dates = dates.where(~weekday_only, by_weekday)
+    return dates.to_numpy(dtype='datetime64[ns]')
+
+
+def normalize_frame(kind, df, reference_col='scrape_time', reference=None):
+    """
+    Tambahkan kolom numerik di samping kolom teks asli untuk seluruh batch sekaligus.
+
+    daily   : high_temp_c, low_temp_c, precip_min, precip_max, wind_kmh, wind_dir_deg, target_date
+    hourly  : temp_c, feels_like_c, wind_kmh, wind_dir_deg, target_date
+    monthly : day_temp_c, night_temp_c, precip_min, precip_max, target_date
+
+    Returns:
+        DataFrame: salinan `df` dengan kolom tambahan
+    """
+    df = df.copy()
+    if reference is None:
+        reference = df[reference_col] if reference_col in df.columns else pd.Timestamp.now()
+
+    for source, (parser, target) in NORMALIZED_COLUMNS[kind].items():
+        if source not in df.columns:
+            continue
+        values = df[source]
+        if parser == 'temp':
+            df[target] = parse_temperature(values)
+        elif parser == 'precip':
+            df[target[0]], df[target[1]] = parse_precipitation(values)
+        elif parser == 'wind':
+            df[target[0]], df[target[1]] = parse_wind(values)
+        elif parser == 'date':
+            df[target] = parse_date_labels(values, reference)
+    return df
@@ -0,0 +1,153 @@
+# page_profiles.py (V27)
+# Profil per situs untuk mempercepat pemuatan halaman: blokir resource yang tidak
+# dibutuhkan untuk ekstraksi teks (gambar, media, font, tracker) lewat route
+# Playwright, dan ganti jeda tetap dengan penantian berbasis event
+# (selector muncul / panjang teks berhenti bertambah) yang dibatasi anggaran waktu.
+
+import time
+from urllib.parse import urlparse
+
+# Domain iklan/analitik yang tidak memengaruhi konten prakiraan
+TRACKER_DOMAINS = [
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googlesyndication.com',
+    'googleadservices.com', 'adservice.google.com', 'connect.facebook.net', 'facebook.net',
+    'scorecardresearch.com', 'amazon-adsystem.com', 'adnxs.com', 'criteo.com', 'criteo.net',
+    'hotjar.com', 'nr-data.net', 'newrelic.com', 'chartbeat.com', 'chartbeat.net', 'optimizely.com',
+    'segment.io', 'taboola.com', 'outbrain.com', 'quantserve.com', 'moatads.com', 'pubmatic.com',
+    'rubiconproject.com', 'casalemedia.com', '3lift.com', 'bidswitch.net', 'openx.net',
+    'imrworldwide.com', 'krxd.net', 'bluekai.com', 'demdex.net', 'omtrdc.net', 'cookielaw.org',
+]
+
+DEFAULT_PROFILE = {
+    'block_resource_types': ['image', 'media', 'font'],
+    'block_domains': TRACKER_DOMAINS,
+    'scroll': True,                 # scroll untuk memicu lazy-load (tanpa jeda tetap)
+    'settle_budget_s': 8.0,         # batas total penantian setelah domcontentloaded
+    'plateau_interval_s': 0.25,     # jarak antar pengecekan panjang teks
+    'plateau_checks': 3,            # jumlah pengecekan stabil berturut-turut
+}
+
+SITE_PROFILES = {
+    'weather.com': {
+        'block_resource_types': ['image', 'media', 'font', 'texttrack'],
+        'settle_budget_s': 10.0,
+    },
+    'bmkg.go.id': {
+        # Tabel dirender server-side: tidak perlu scroll, cukup tunggu tabel
+        'scroll': False,
+        'settle_budget_s': 5.0,
+    },
+}
+
+_SCROLL_JS = """async () => {
+    for (let i = 0; i < 5; i++) {
+        window.scrollBy(0, 500 * i);
+        await new Promise(r => requestAnimationFrame(r));
+    }
+    window.scrollTo(0, 0);
+}"""
+_TEXT_LENGTH_JS = "() => document.body ? document.body.innerText.length : 0"
+
+
+def get_profile(url):
+    """Profil untuk host URL (cocok juga untuk subdomain), digabung dengan DEFAULT_PROFILE."""
+    host = (urlparse(url).hostname or "").lower()
+    for domain, overrides in SITE_PROFILES.items():
+        if host == domain or host.endswith("." + domain):
+            return {**DEFAULT_PROFILE, **overrides}
+    return dict(DEFAULT_PROFILE)
+
+
+def should_block(request_url, resource_type, profile):
+    if resource_type in profile['block_resource_types']:
+        return True
+    host = (urlparse(request_url).hostname or "").lower()
+    return any(host == domain or host.endswith("." + domain) for domain in profile['block_domains'])
+
+
+def install_blocking(target, profile, stats=None):
+    """Pasang route pemblokiran pada page atau browser context (sync API)."""
+    def handler(route):
+        request = route.request
+        if should_block(request.url, request.resource_type, profile):
+            if stats is not None:
+                stats['blocked'] = stats.get('blocked', 0) + 1
+            route.abort()
+        else:
+            route.continue_()
+    target.route("**/*", handler)
+
+
+async def install_blocking_async(target, profile, stats=None):
+    """Pasang route pemblokiran pada page atau browser context (async API)."""
+    async def handler(route):
+        request = route.request
+        if should_block(request.url, request.resource_type, profile):
+            if stats is not None:
+                stats['blocked'] = stats.get('blocked', 0) + 1
+            await route.abort()
+        else:
+            await route.continue_()
+    await target.route("**/*", handler)
+
+
+def settle(page, profile, selector, timeout_error):
+    """
+    Tunggu konten prakiraan siap (sync API): scroll -> selector -> plateau panjang teks.
+
+    Semua langkah berbagi satu anggaran profile['settle_budget_s'].
+    Returns:
+        bool: True jika selector ditemukan
+    """
+    deadline = time.perf_counter() + profile['settle_budget_s']
+    remaining_ms = lambda: max(0, int((deadline - time.perf_counter()) * 1000))
+
+    if profile['scroll']:
+        try:
+            page.evaluate(_SCROLL_JS)
+        except Exception as e:
+            print(f"Warning: Interaksi gagal, melanjutkan. Error: {e}")
+
+    found = False
+    try:
+        page.wait_for_selector(selector, timeout=remaining_ms() or 1)
+        found = True
+    except timeout_error:
+        print("Warning: Selector spesifik timeout. Melanjutkan setelah teks stabil.")
+
+    last_length, stable = -1, 0
+    while remaining_ms() > 0 and stable < profile['plateau_checks']:
+        length = page.evaluate(_TEXT_LENGTH_JS)
+        stable = stable + 1 if length == last_length else 0
+        last_length = length
+        if stable < profile['plateau_checks']:
+            page.wait_for_timeout(min(profile['plateau_interval_s'] * 1000, remaining_ms()))
+    return found
+
+
+async def settle_async(page, profile, selector, timeout_error):
+    """Versi async dari settle()."""
+    deadline = time.perf_counter() + profile['settle_budget_s']
+    remaining_ms = lambda: max(0, int((deadline - time.perf_counter()) * 1000))
+
+    if profile['scroll']:
+        try:
+            await page.evaluate(_SCROLL_JS)
+        except Exception as e:
+            print(f"Warning: Interaksi gagal, melanjutkan. Error: {e}")
+
+    found = False
+    try:
+        await page.wait_for_selector(selector, timeout=remaining_ms() or 1)
+        found = True
+    except timeout_error:
+        print("Warning: Selector spesifik timeout. Melanjutkan setelah teks stabil.")
+
+    last_length, stable = -1, 0
+    while remaining_ms() > 0 and stable < profile['plateau_checks']:
+        length = await page.evaluate(_TEXT_LENGTH_JS)
+        stable = stable + 1 if length == last_length else 0
+        last_length = length
+        if stable < profile['plateau_checks']:
+            await page.wait_for_timeout(min(profile['plateau_interval_s'] * 1000, remaining_ms()))
+    return found
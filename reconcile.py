@@ -0,0 +1,314 @@
+# reconcile.py (V27)
+# Rekonsiliasi lintas sumber: prakiraan harian BMKG (tabel kabupaten/kota) dan
+# weather.com (UniversalScraperV27) disejajarkan per lokasi + tanggal target, lalu
+# dihitung selisih per field dan nilai konsensus untuk ribuan lokasi-hari sekaligus.
+#
+# Nama lokasi antar sumber jarang identik ("Kota Palangka Raya" vs "Palangkaraya,
+# Central Kalimantan, Indonesia"), jadi pencocokan memakai indeks nama ternormalisasi
+# (dibangun sekali dari nama BMKG) + pencarian fuzzy yang dibatasi trigram. Pencocokan
+# dilakukan per nama unik, hasilnya disebar ke semua baris secara vektor.
+#
+#   python reconcile.py                                 # dari dataset Parquet forecast_store/
+#   python reconcile.py --bmkg-csv bmkg_cuaca_nasional_20251202.csv --output rekonsiliasi.parquet
+
+import argparse
+import re
+import time
+import unicodedata
+from datetime import datetime, timedelta
+from difflib import SequenceMatcher
+
+import pandas as pd
+
+from normalize import normalize_frame
+
+REFERENCE_SOURCE = "bmkg.go.id"
+DEFAULT_MIN_SCORE = 0.85
+# Field numerik hasil normalize.normalize_frame yang dibandingkan antar sumber
+COMPARE_FIELDS = ['high_temp_c', 'low_temp_c', 'precip_max']
+
+# Kata yang tidak membedakan lokasi (jenis wilayah, fasilitas, negara)
+_STOPWORDS = {
+    'kabupaten', 'kab', 'kota', 'kotamadya', 'provinsi', 'prov', 'regency', 'city', 'district',
+    'airport', 'bandara', 'international', 'indonesia', 'kecamatan', 'kec',
+}
+# Arah mata angin: nama provinsi Inggris weather.com -> Indonesia ("Central Kalimantan" -> "kalimantan tengah")
+_DIRECTIONS = {'central': 'tengah', 'east': 'timur', 'west': 'barat', 'south': 'selatan', 'north': 'utara',
+               'southeast': 'tenggara', 'northern': 'utara', 'southern': 'selatan'}
+# Ejaan Inggris weather.com -> ejaan nama provinsi Indonesia
+_ENGLISH_SPELLING = {'java': 'Jawa', 'sumatra': 'Sumatera'}
+# Alias kota -> kabupaten/kota BMKG untuk nama yang tidak mirip secara teks
+LOCATION_ALIASES = {
+    'sampit': 'kotawaringin timur',
+    'pangkalan bun': 'kotawaringin barat',
+    'kuala kapuas': 'kapuas',
+    'muara teweh': 'barito utara',
+    'buntok': 'barito selatan',
+    'tamiang layang': 'barito timur',
+}
+
+
+def normalize_name(name):
+    """
+    Kunci nama lokasi: segmen pertama sebelum koma, tanpa aksen, isi kurung, tanda baca,
+    dan kata jenis wilayah; arah mata angin diterjemahkan.
+
+    'Sampit (Hasan) Airport, Central Kalimantan, Indonesia' -> 'sampit'
+    'Kota Palangka Raya' -> 'palangka raya'
+    """
+    text = unicodedata.normalize('NFKD', str(name or "")).encode('ascii', 'ignore').decode('ascii')
+    text = re.sub(r'\([^)]*\)', ' ', text.split(',')[0].casefold())
+    words = [_DIRECTIONS.get(word, word) for word in re.findall(r'[a-z0-9]+', text)]
+    return " ".join(word for word in words if word not in _STOPWORDS)
+
+
+def province_key(name):
+    """Kunci provinsi tanpa urutan kata: 'Central Kalimantan' dan 'Kalimantan Tengah' -> 'kalimantan tengah'."""
+    text = unicodedata.normalize('NFKD', str(name or "")).encode('ascii', 'ignore').decode('ascii').casefold()
+    words = [_DIRECTIONS.get(word, word) for word in re.findall(r'[a-z0-9]+', text)]
+    return " ".join(sorted(word for word in words if word not in _STOPWORDS))
+
+
+def province_name(name):
+    """
+    Nama provinsi weather.com dalam urutan dan ejaan Indonesia ('Central Kalimantan' ->
+    'Kalimantan Tengah', 'West Java' -> 'Jawa Barat'). Nama lain dikembalikan apa adanya.
+    """
+    words = str(name or "").split()
+    if len(words) < 2 or words[0].casefold() not in _DIRECTIONS:
+        return name
+    rest = [_ENGLISH_SPELLING.get(word.casefold(), word) for word in words[1:]]
+    return " ".join(rest + [_DIRECTIONS[words[0].casefold()].title()])
+
+
+def province_hint(location_name, parent_location):
+    """Provinsi dari 'Kota, Provinsi, Negara' (format weather.com), selain itu parent_location."""
+    for text in (location_name, parent_location):
+        parts = [part.strip() for part in str(text or "").split(',')]
+        if len(parts) >= 3:
+            return parts[1]
+    return parent_location
+
+
+def _trigrams(key):
+    compact = key.replace(" ", "")
+    return {compact[i:i + 3] for i in range(max(1, len(compact) - 2))}
+
+
+class LocationIndex:
+    """
+    Indeks nama lokasi referensi (BMKG), dibangun sekali per run.
+
+    - _by_key: kunci ternormalisasi (juga versi tanpa spasi) -> kunci kanonik
+    - _by_trigram: trigram -> kunci kanonik (membatasi kandidat pencocokan fuzzy)
+    - _province: kunci kanonik -> set kunci provinsi (pencocokan fuzzy dibatasi provinsi yang sama)
+    """
+
+    def __init__(self, names, provinces=None, aliases=None, min_score=DEFAULT_MIN_SCORE):
+        self.min_score = min_score
+        self.aliases = {normalize_name(k): normalize_name(v) for k, v in (aliases or LOCATION_ALIASES).items()}
+        self._by_key = {}
+        self._by_trigram = {}
+        self._province = {}
+        self._known_provinces = set()
+        provinces = provinces if provinces is not None else [None] * len(names)
+        for name, province in dict.fromkeys(zip(names, provinces)):
+            key = normalize_name(name)
+            if not key:
+                continue
+            self._by_key.setdefault(key, key)
+            self._by_key.setdefault(key.replace(" ", ""), key)
+            self._province.setdefault(key, set()).add(province_key(province))
+            self._known_provinces.add(province_key(province))
+            for gram in _trigrams(key):
+                self._by_trigram.setdefault(gram, set()).add(key)
+
+    def __len__(self):
+        return len(self._province)
+
+    def match(self, name, province=None):
+        """(kunci kanonik, skor 0..1) untuk satu nama, atau (None, 0.0) jika tidak ada yang cukup mirip."""
+        key = normalize_name(name)
+        if not key:
+            return None, 0.0
+        key = self.aliases.get(key, key)
+        exact = self._by_key.get(key) or self._by_key.get(key.replace(" ", ""))
+        if exact:
+            return exact, 1.0
+
+        grams = _trigrams(key)
+        counts = {}
+        for gram in grams:
+            for candidate in self._by_trigram.get(gram, ()):
+                counts[candidate] = counts.get(candidate, 0) + 1
+        # Batasi ke provinsi yang sama hanya jika provinsinya dikenal di data referensi
+        wanted_province = province_key(province) if province else None
+        if wanted_province not in self._known_provinces:
+            wanted_province = None
+        best, best_score = None, 0.0
+        for candidate, shared in counts.items():
+            if shared * 2 < len(grams):  # kurang dari separuh trigram sama: pasti tidak cukup mirip
+                continue
+            if wanted_province and wanted_province not in self._province[candidate]:
+                continue
+            score = SequenceMatcher(None, key, candidate).ratio()
+            if score > best_score:
+                best, best_score = candidate, score
+        return (best, best_score) if best_score >= self.min_score else (None, best_score)
+
+    def match_frame(self, df):
+        """Kolom match_key + match_score untuk setiap baris (dihitung per pasangan nama/provinsi unik)."""
+        pairs = df[['location_name', 'parent_location']].drop_duplicates()
+        matches = [self.match(name, province_hint(name, parent))
+                   for name, parent in pairs.itertuples(index=False)]
+        lookup = pairs.assign(match_key=[m[0] for m in matches], match_score=[m[1] for m in matches])
+        return df.merge(lookup, on=['location_name', 'parent_location'], how='left')
+
+
+def latest_per_key(df):
+    """Nilai terbaru per (source, location_name, target_date): baris dengan scrape_time terakhir."""
+    df = df.dropna(subset=['target_date'])
+    df = df.assign(target_date=pd.to_datetime(df['target_date']).dt.normalize())
+    return (df.sort_values('scrape_time', kind='stable')
+              .drop_duplicates(['source', 'location_name', 'target_date'], keep='last')
+              .reset_index(drop=True))
+
+
+def bmkg_csv_frame(path, scrape_time=None):
+    """CSV nasional bmkg_scraper (CSV_FIELDS) -> DataFrame harian ternormalisasi seperti dataset Parquet."""
+    raw = pd.read_csv(path, dtype=str, encoding='utf-8-sig').fillna('')
+    scrape_time = scrape_time or datetime.now()
+    temps = raw['suhu'].str.extract(r'(-?\d+(?:[.,]\d+)?)\s*(?:-|–|s/d)\s*(-?\d+(?:[.,]\d+)?)')
+    single = raw['suhu'].str.extract(r'(-?\d+(?:[.,]\d+)?)')[0]
+    df = pd.DataFrame({
+        'scrape_time': pd.Timestamp(scrape_time),
+        'source': REFERENCE_SOURCE,
+        'parent_location': raw['provinsi'],
+        'location_name': raw['kabupaten_kota'],
+        'date_day': raw['tanggal'],
+        'low_temp': temps[0].fillna(single).fillna('N/A') + ' °C',
+        'high_temp': temps[1].fillna(single).fillna('N/A') + ' °C',
+        'condition_summary': raw['keterangan_cuaca'],
+        'precipitation_chance': 'N/A',
+        'wind_speed': 'N/A',
+    })
+    return normalize_frame('daily', df)
+
+
+def reconcile(reference, others, index=None, fields=COMPARE_FIELDS):
+    """
+    Sejajarkan sumber lain dengan sumber referensi (BMKG) per lokasi + tanggal target.
+
+    Args:
+        reference: DataFrame harian sumber referensi (kolom source, location_name, parent_location,
+            target_date, scrape_time, field numerik)
+        others: DataFrame harian sumber lain (boleh lebih dari satu source)
+        index: LocationIndex (default: dibangun dari nama lokasi referensi)
+
+    Returns:
+        DataFrame: satu baris per (lokasi referensi, tanggal target, source lain) berisi
+        nilai kedua sumber (<field>_ref / <field>_other), <field>_delta (other - ref),
+        <field>_consensus (rata-rata semua sumber untuk lokasi-hari itu) dan <field>_spread.
+    """
+    reference = latest_per_key(reference)
+    others = latest_per_key(others)
+    if index is None:
+        index = LocationIndex(reference['location_name'].tolist(), reference['parent_location'].tolist())
+
+    reference = reference.assign(match_key=reference['location_name'].map(normalize_name))
+    others = index.match_frame(others)
+    matched = others.dropna(subset=['match_key'])
+
+    keep = ['match_key', 'target_date', 'location_name', 'parent_location', 'condition_summary'] + fields
+    merged = matched[keep + ['source', 'match_score']].merge(
+        reference[keep + ['source']].drop_duplicates(['match_key', 'target_date'], keep='last'),
+        on=['match_key', 'target_date'], suffixes=('_other', '_ref'),
+    )
+
+    # Konsensus per lokasi-hari atas SEMUA sumber (referensi + semua sumber lain yang cocok)
+    stacked = pd.concat([
+        reference[['match_key', 'target_date'] + fields],
+        matched[['match_key', 'target_date'] + fields],
+    ], ignore_index=True)
+    stats = stacked.groupby(['match_key', 'target_date'])[fields].agg(['mean', 'min', 'max'])
+    consensus = pd.DataFrame(index=stats.index)
+    for field in fields:
+        consensus[f'{field}_consensus'] = stats[(field, 'mean')].round(2)
+        consensus[f'{field}_spread'] = (stats[(field, 'max')] - stats[(field, 'min')]).round(2)
+    merged = merged.merge(consensus.reset_index(), on=['match_key', 'target_date'], how='left')
+
+    for field in fields:
+        merged[f'{field}_delta'] = (merged[f'{field}_other'] - merged[f'{field}_ref']).round(2)
+
+    merged = merged.rename(columns={'source_other': 'source', 'source_ref': 'reference_source'})
+    merged['target_date'] = merged['target_date'].dt.date
+    order = ['match_key', 'target_date', 'reference_source', 'location_name_ref', 'parent_location_ref',
+             'source', 'location_name_other', 'match_score', 'condition_summary_ref', 'condition_summary_other']
+    order += [f'{field}_{suffix}' for field in fields
+              for suffix in ('ref', 'other', 'delta', 'consensus', 'spread')]
+    return merged[order].sort_values(['match_key', 'target_date', 'source'], kind='stable').reset_index(drop=True)
+
+
+def unmatched_locations(others, index):
+    """Nama lokasi sumber lain yang tidak menemukan pasangan referensi (untuk menambah alias)."""
+    missing = []
+    for name, parent in others[['location_name', 'parent_location']].drop_duplicates().itertuples(index=False):
+        key, score = index.match(name, province_hint(name, parent))
+        if key is None:
+            missing.append((name, round(score, 2)))
+    return missing
+
+
+def load_from_store(store_root, since_days=2):
+    """(referensi BMKG, sumber lain) dari dataset Parquet harian, scrape `since_days` hari terakhir."""
+    from forecast_storage import ParquetForecastStore
+
+    store = ParquetForecastStore(store_root)
+    since = (datetime.now() - timedelta(days=since_days)).date() if since_days else None
+    daily = store.query('daily', since=since)
+    is_reference = daily['source'] == REFERENCE_SOURCE
+    return daily[is_reference], daily[~is_reference]
+
+
+def save_reconciled(df, path):
+    if path.endswith('.csv'):
+        df.to_csv(path, index=False)
+    else:
+        df.to_parquet(path, index=False)
+    print(f"Hasil rekonsiliasi ({len(df)} baris) disimpan ke: {path}")
+
+
+def main():
+    from forecast_storage import DEFAULT_STORE_ROOT
+
+    parser = argparse.ArgumentParser(description="Rekonsiliasi prakiraan BMKG vs weather.com")
+    parser.add_argument('--store-root', default=DEFAULT_STORE_ROOT)
+    parser.add_argument('--since-days', type=int, default=2, help="hanya scrape N hari terakhir (0 = semua)")
+    parser.add_argument('--bmkg-csv', help="CSV nasional dari `bmkg_scraper.py --semua` sebagai referensi")
+    parser.add_argument('--min-score', type=float, default=DEFAULT_MIN_SCORE)
+    parser.add_argument('--output', default=f"rekonsiliasi_{datetime.now():%Y%m%d_%H%M%S}.parquet",
+                        help=".parquet atau .csv")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    reference, others = load_from_store(args.store_root, args.since_days)
+    if args.bmkg_csv:
+        reference = bmkg_csv_frame(args.bmkg_csv)
+    if reference.empty or others.empty:
+        print(f"Data kurang: {len(reference)} baris referensi, {len(others)} baris sumber lain.")
+        raise SystemExit(1)
+
+    reference = latest_per_key(reference)
+    index = LocationIndex(reference['location_name'].tolist(), reference['parent_location'].tolist(),
+                          min_score=args.min_score)
+    result = reconcile(reference, others, index)
+    print(f"{len(result)} lokasi-hari tersejajarkan dari {len(reference)} baris referensi "
+          f"({len(index)} lokasi) dalam {time.perf_counter() - start:.2f}s.")
+    missing = unmatched_locations(latest_per_key(others), index)
+    if missing:
+        print(f"{len(missing)} lokasi tanpa pasangan (tambahkan ke LOCATION_ALIASES jika perlu), e.g.: {missing[:5]}")
+    save_reconciled(result, args.output)
+
+
+if __name__ == "__main__":
+    main()
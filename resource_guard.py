@@ -0,0 +1,257 @@
+# resource_guard.py (V27)
+# Pengawas memori untuk proses yang berjalan lama (scheduler.py, worker_farm.py).
+# RSS proses dan memori proses anak (driver Playwright, Chromium) dicatat per job.
+# Pohon proses Chromium yang melewati batas dibunuh di tengah job (job gagal, browser
+# diluncurkan ulang oleh job berikutnya). Proses yang RSS-nya masih di atas batas setelah
+# job selesai ditandai untuk dijalankan ulang oleh pemiliknya.
+
+import contextlib
+import gc
+import os
+import sys
+import threading
+import time
+
+import telemetry
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DEFAULT_MAX_RSS_MB = 1024      # RSS proses Python setelah job (setelah gc + malloc_trim)
+DEFAULT_MAX_BROWSER_MB = 1500  # satu pohon proses Chromium (sama dengan browser_service)
+SAMPLE_INTERVAL_S = 2.0
+
+_MB = 1024 * 1024
+_libc = None
+
+
+def rss_mb(pid=None):
+    """RSS proses (MB). Tanpa psutil dibaca dari /proc (Linux); 0 jika tidak tersedia."""
+    pid = pid or os.getpid()
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss / _MB
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return 0.0
+    try:
+        with open(f"/proc/{pid}/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / _MB
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0.0
+
+
+def _children(pid=None):
+    try:
+        return psutil.Process(pid or os.getpid()).children(recursive=True)
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return []
+
+
+def children_mb(pid=None):
+    """RSS total semua proses anak (rekursif), MB. 0 jika psutil tidak tersedia."""
+    if psutil is None:
+        return 0.0
+    total = 0
+    for child in _children(pid):
+        try:
+            total += child.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return total / _MB
+
+
+def browser_trees(pid=None):
+    """{pid root Chromium: MB} untuk setiap browser di bawah proses `pid` (RSS seluruh pohonnya)."""
+    if psutil is None:
+        return {}
+    browsers = {}  # pid -> (ppid, rss)
+    for child in _children(pid):
+        try:
+            if 'chrom' in child.name().lower():
+                browsers[child.pid] = (child.ppid(), child.memory_info().rss)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    trees = {}
+    for child_pid, (_, rss) in browsers.items():
+        root = child_pid
+        while browsers[root][0] in browsers:
+            root = browsers[root][0]
+        trees[root] = trees.get(root, 0.0) + rss / _MB
+    return trees
+
+
+def kill_tree(pid):
+    """Bunuh proses `pid` beserta semua anaknya. Mengembalikan jumlah proses yang dibunuh."""
+    if psutil is None:
+        return 0
+    try:
+        root = psutil.Process(pid)
+        processes = root.children(recursive=True) + [root]
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return 0
+    killed = 0
+    for process in processes:
+        try:
+            process.kill()
+            killed += 1
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return killed
+
+
+def warn_unenforced(max_browser_mb=None, max_children_mb=None):
+    """
+    Peringatan saat start jika batas memori proses anak dikonfigurasi tapi psutil tidak ada
+    (batas itu diam-diam tidak berlaku). Mengembalikan False jika ada batas yang tidak ditegakkan.
+    """
+    if psutil is not None:
+        return True
+    unenforced = [f"{flag}={value}" for flag, value in (('--max-browser-mb', max_browser_mb),
+                                                        ('--max-worker-mb', max_children_mb)) if value]
+    if not unenforced:
+        return True
+    print(f"⚠️ PERINGATAN: psutil tidak terpasang, batas memori {', '.join(unenforced)} TIDAK ditegakkan "
+          f"(memori Chromium/proses anak tidak diukur dan tidak dibunuh). Pasang dengan: pip install psutil")
+    return False
+
+
+def release_memory():
+    """gc penuh, lalu malloc_trim (glibc): arena malloc yang kosong setelah job (DataFrame, HTML) kembali ke OS."""
+    global _libc
+    gc.collect()
+    if not sys.platform.startswith('linux'):
+        return
+    if _libc is None:
+        import ctypes
+        try:
+            _libc = ctypes.CDLL("libc.so.6")
+            _libc.malloc_trim  # musl dan libc lain tidak punya malloc_trim
+        except (OSError, AttributeError):
+            _libc = False
+    if _libc:
+        _libc.malloc_trim(0)
+
+
+class JobUsage:
+    """Memori satu job: RSS proses awal/akhir/puncak dan puncak memori proses anak (MB)."""
+
+    __slots__ = ('name', 'start_rss_mb', 'end_rss_mb', 'peak_rss_mb', 'peak_children_mb',
+                 'browsers_killed', 'started', 'duration_s')
+
+    def __init__(self, name, start_rss_mb):
+        self.name = name
+        self.start_rss_mb = start_rss_mb
+        self.end_rss_mb = None
+        self.peak_rss_mb = start_rss_mb
+        self.peak_children_mb = 0.0
+        self.browsers_killed = 0
+        self.started = time.perf_counter()
+        self.duration_s = None
+
+    @property
+    def growth_mb(self):
+        return (self.end_rss_mb or self.start_rss_mb) - self.start_rss_mb
+
+    def as_dict(self):
+        return {
+            'start_rss_mb': round(self.start_rss_mb, 1),
+            'end_rss_mb': None if self.end_rss_mb is None else round(self.end_rss_mb, 1),
+            'growth_mb': round(self.growth_mb, 2),
+            'peak_rss_mb': round(self.peak_rss_mb, 1),
+            'peak_children_mb': round(self.peak_children_mb, 1),
+            'browsers_killed': self.browsers_killed,
+        }
+
+
+class MemoryGovernor:
+    """
+    Pengawas memori satu proses.
+
+    - job(name): context manager -> JobUsage; setelah job: gc + malloc_trim, lalu RSS akhir dicatat
+    - thread sampler (tiap interval_s selama ada job): puncak RSS/proses anak per job, dan pohon
+      Chromium > max_browser_mb dibunuh
+    - restart_needed(): RSS masih > max_rss_mb setelah memori dibersihkan
+
+    Job yang berjalan bersamaan di thread proses yang sama berbagi angka RSS proses.
+    """
+
+    def __init__(self, max_rss_mb=DEFAULT_MAX_RSS_MB, max_browser_mb=DEFAULT_MAX_BROWSER_MB,
+                 interval_s=SAMPLE_INTERVAL_S):
+        self.max_rss_mb = max_rss_mb
+        self.max_browser_mb = max_browser_mb
+        self.interval_s = interval_s
+        self.jobs = 0
+        self.browsers_killed = 0
+        self._active = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def _ensure_sampler(self):
+        if self._thread is None and self.interval_s and psutil is not None:
+            self._thread = threading.Thread(target=self._run, name="memory-governor", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval_s)
+            with self._lock:
+                if not self._active:
+                    self._wake.clear()
+                    continue
+            self.sample()
+
+    def sample(self):
+        """Ukur sekali: perbarui puncak job aktif, bunuh Chromium yang melewati batas."""
+        rss, children = rss_mb(), children_mb()
+        killed = 0
+        if self.max_browser_mb:
+            for root, used in browser_trees().items():
+                if used > self.max_browser_mb:
+                    print(f"[memori] Chromium pid {root} memakai {used:.0f} MB (> {self.max_browser_mb} MB), dibunuh.")
+                    kill_tree(root)
+                    killed += 1
+                    telemetry.inc('browser_killed_total', reason='memory')
+        with self._lock:
+            self.browsers_killed += killed
+            for usage in self._active:
+                usage.peak_rss_mb = max(usage.peak_rss_mb, rss)
+                usage.peak_children_mb = max(usage.peak_children_mb, children)
+                usage.browsers_killed += killed
+
+    @contextlib.contextmanager
+    def job(self, name):
+        usage = JobUsage(name, rss_mb())
+        with self._lock:
+            self._active.add(usage)
+        self._ensure_sampler()
+        self._wake.set()
+        try:
+            yield usage
+        finally:
+            with self._lock:
+                self._active.discard(usage)
+                self.jobs += 1
+            release_memory()
+            usage.end_rss_mb = rss_mb()
+            usage.peak_rss_mb = max(usage.peak_rss_mb, usage.end_rss_mb)
+            usage.duration_s = time.perf_counter() - usage.started
+            telemetry.observe('job_rss_mb', usage.end_rss_mb)
+            telemetry.observe('job_rss_growth_mb', usage.growth_mb)
+            telemetry.observe('job_children_peak_mb', usage.peak_children_mb)
+
+    def restart_needed(self):
+        return bool(self.max_rss_mb) and rss_mb() > self.max_rss_mb
+
+    def stats(self):
+        return {
+            'rss_mb': round(rss_mb(), 1),
+            'children_mb': round(children_mb(), 1),
+            'jobs': self.jobs,
+            'browsers_killed': self.browsers_killed,
+            'max_rss_mb': self.max_rss_mb,
+            'max_browser_mb': self.max_browser_mb,
+        }
@@ -1,67 +1,428 @@
-import time
-import schedule
+import argparse
+import asyncio
+import contextvars
+import functools
+import importlib.util
+import json
 import os
+import random
+import signal
 import sys
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 
-try:
-    from dynamic_scrapper import UniversalScraperV27, AIScraperContext
-except ImportError:
+import telemetry
+from bmkg_regions import BMKG_PROVINCES, bmkg_province_urls
+from domain_health import get_domain_health, DOMAIN_HEALTH_FILE
+from shared_state import SharedJsonFile
+from resource_guard import (MemoryGovernor, DEFAULT_MAX_RSS_MB, DEFAULT_MAX_BROWSER_MB, browser_trees, kill_tree,
+                            warn_unenforced)
+
+# dynamic_scrapper (Playwright, requests, Gemini) baru diimpor saat job pertama berjalan;
+# di sini cukup dipastikan modulnya ada agar kesalahan setup tetap terlihat saat start.
+if importlib.util.find_spec("dynamic_scrapper") is None:
     print("ERROR: Tidak dapat menemukan file scraper asli.")
     print("Pastikan file scraper (misal: universal_scraper.py) ada di folder yang sama.")
     sys.exit(1)
 
 
-TARGET_URL = "https://www.bmkg.go.id/cuaca/prakiraan-cuaca/62"  # URL statis untuk otomatisasi
+TARGETS_FILE = "targets.json"  # Daftar target + jadwal per target
+MAX_CONCURRENT_JOBS = 4        # Batas job yang berjalan bersamaan (global)
+DEFAULT_JITTER_SECONDS = 300   # Sebar waktu mulai agar tidak semua target jalan di detik yang sama
+SHUTDOWN_TIMEOUT = 600         # Waktu tunggu job yang sedang berjalan saat berhenti (detik), lalu proses diakhiri paksa
+SCHEDULE_STATE_FILE = "scheduler_state_v27.json"  # Jadwal yang belum jalan, disimpan saat restart memori
+
+# Dipakai jika targets.json tidak ada
+WEATHER_COM_URLS = [
+    "https://weather.com/weather/today/l/3bb1168c65db096ad3f82c6fe492d0423bdad78272dc8addcf7fd32a1a874b38",
+]
 SCHEDULE_TIME = "00:00"  # Jam 12 Malam (Format 24 jam)
 
-def job_scraping_otomatis():
-    """Fungsi wrapper yang akan dipanggil oleh scheduler"""
-    print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⏰ Waktunya Scraping Otomatis!")
-    
-    try:
-        
-        print(f"Target URL: {TARGET_URL}")
-        context = AIScraperContext(target_url=TARGET_URL)
-        
-    
-        if "GEMINI_API_KEY" not in os.environ:
-            print("❌ ERROR: GEMINI_API_KEY tidak ditemukan di environment variable.")
-            return
 
-        scraper = UniversalScraperV27(context)
-        
-        # 3. Jalankan Scrape
-        data = scraper.scrape()
-        
-        # 4. Simpan Hasil
+class ScheduledTarget:
+    """Satu target scraping dengan jadwalnya sendiri (harian pada jam tertentu atau interval)."""
+
+    def __init__(self, name, url=None, urls=None, daily_at=None, interval_minutes=None, jitter_seconds=0,
+                 batch_mode=False, priority=0):
+        if not (url or urls):
+            raise ValueError(f"Target '{name}' harus punya 'url' atau 'urls'.")
+        if not (daily_at or interval_minutes):
+            raise ValueError(f"Target '{name}' harus punya 'daily_at' atau 'interval_minutes'.")
+        self.name = name
+        self.url = url
+        self.urls = urls
+        self.daily_at = daily_at
+        self.interval_minutes = interval_minutes
+        self.jitter_seconds = jitter_seconds
+        # Ekstraksi Gemini lewat batch job offline (lebih lambat, cocok untuk run malam)
+        self.batch_mode = batch_mode
+        # Prioritas job di antrian worker_farm (besar = dikerjakan lebih dulu)
+        self.priority = priority
+
+    @classmethod
+    def from_dict(cls, entry, default_jitter=DEFAULT_JITTER_SECONDS):
+        return cls(
+            name=entry['name'],
+            url=entry.get('url'),
+            urls=entry.get('urls'),
+            daily_at=entry.get('daily_at'),
+            interval_minutes=entry.get('interval_minutes'),
+            jitter_seconds=entry.get('jitter_seconds', default_jitter),
+            batch_mode=entry.get('batch_mode', False),
+            priority=entry.get('priority', 0),
+        )
+
+    def next_run_after(self, now):
+        """Waktu jadwal berikutnya (tanpa jitter) setelah `now`."""
+        if self.daily_at:
+            hour, minute = (int(x) for x in self.daily_at.split(':'))
+            candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if candidate <= now:
+                candidate += timedelta(days=1)
+            return candidate
+        return now + timedelta(minutes=self.interval_minutes)
+
+
+def default_targets():
+    """Semua provinsi BMKG + halaman weather.com, harian pukul SCHEDULE_TIME."""
+    targets = [
+        ScheduledTarget(f"bmkg_{code}", url=url, daily_at=SCHEDULE_TIME, jitter_seconds=DEFAULT_JITTER_SECONDS)
+        for code, url in zip(BMKG_PROVINCES, bmkg_province_urls())
+    ]
+    targets += [
+        ScheduledTarget(f"weathercom_{i + 1}", url=url, daily_at=SCHEDULE_TIME, jitter_seconds=DEFAULT_JITTER_SECONDS)
+        for i, url in enumerate(WEATHER_COM_URLS)
+    ]
+    return targets
+
+
+def load_targets(path=TARGETS_FILE):
+    """Baca daftar target dari file JSON. Mengembalikan (targets, max_concurrent_jobs)."""
+    if not os.path.exists(path):
+        print(f"File {path} tidak ditemukan. Memakai target default ({len(BMKG_PROVINCES)} provinsi BMKG + weather.com).")
+        return default_targets(), MAX_CONCURRENT_JOBS
+
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    default_jitter = config.get('default_jitter_seconds', DEFAULT_JITTER_SECONDS)
+    targets = [ScheduledTarget.from_dict(entry, default_jitter) for entry in config['targets']]
+    return targets, config.get('max_concurrent_jobs', MAX_CONCURRENT_JOBS)
+
+
+def job_scraping_otomatis(target):
+    """Fungsi wrapper yang akan dipanggil oleh scheduler (berjalan di thread terpisah)"""
+    print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⏰ Waktunya Scraping Otomatis: {target.name}")
+
+    if "GEMINI_API_KEY" not in os.environ:
+        print("❌ ERROR: GEMINI_API_KEY tidak ditemukan di environment variable.")
+        return False
+
+    from dynamic_scrapper import UniversalScraperV27, AIScraperContext
+
+    context = AIScraperContext(target_url=target.url)
+    context.gemini_batch_mode = target.batch_mode
+    context.return_models = True  # hasil hanya disimpan, tidak perlu dict
+    scraper = UniversalScraperV27(context)
+    if target.urls:
+        results = scraper.scrape_many(target.urls)
+    else:
+        results = {target.url: scraper.scrape()}
+
+    # Simpan Hasil
+    sukses = True
+    for url, data in results.items():
         if data:
-            scraper.save_results(data)
-            print("✅ Scraping Selesai dan Data Tersimpan.")
+            scraper.save_results(data, tag=scraper.url_tag(url), url=url)
+            print(f"✅ {url}: Data Tersimpan.")
+        elif url in scraper.not_modified_urls:
+            print(f"✅ {url}: tidak berubah (304), tidak ada yang disimpan.")
         else:
-            print("⚠️ Scraping selesai tapi tidak ada data yang valid.")
-            
-    except Exception as e:
-        print(f"❌ TERJADI ERROR SAAT SCRAPING: {e}")
+            print(f"⚠️ {url}: tidak ada data yang valid.")
+            sukses = False
+    return sukses
 
-# --- SETUP JADWAL ---
-print("--- 🤖 WEATHER SCRAPER SCHEDULER STARTED ---")
-print(f"Target: {TARGET_URL}")
-print(f"Jadwal: Setiap hari pukul {SCHEDULE_TIME}")
-print("Status: LISTENING (Tekan Ctrl+C untuk berhenti)...")
 
-# Atur jadwal harian
-schedule.every().day.at(SCHEDULE_TIME).do(job_scraping_otomatis)
+class AsyncScheduler:
+    """
+    Scheduler asyncio: tiap target punya loop jadwal sendiri, job dijalankan di thread
+    dengan batas konkurensi global. Run berikutnya dari target yang masih berjalan
+    dilewati (coalesce), sehingga satu target tidak pernah tumpang tindih.
 
-# testing setiap 1 menit
-# schedule.every(1).minutes.do(job_scraping_otomatis)
+    Memori dicatat per job (resource_guard). Chromium di atas max_browser_mb dibunuh; jika
+    RSS proses masih di atas max_rss_mb setelah job, scheduler berhenti dengan
+    restart_requested=True agar main() menjalankannya ulang.
 
-# --- LOOP LISTENING ---
-if __name__ == "__main__":
+    Job berjalan di executor milik scheduler (bukan executor default asyncio) agar
+    asyncio.run() tidak menunggu thread job yang macet. Job yang belum selesai setelah
+    SHUTDOWN_TIMEOUT dicatat di abandoned_jobs; main() lalu mengakhiri proses dengan paksa.
+
+    Sebelum restart, save_pending() menyimpan waktu run (sudah dengan jitter) yang belum
+    dimulai ke state_file; proses baru memakai waktu itu, slot yang terlewat langsung dijalankan.
+    """
+
+    def __init__(self, targets, max_concurrent_jobs=MAX_CONCURRENT_JOBS, job_func=job_scraping_otomatis,
+                 health_file=DOMAIN_HEALTH_FILE, max_rss_mb=DEFAULT_MAX_RSS_MB,
+                 max_browser_mb=DEFAULT_MAX_BROWSER_MB, state_file=None):
+        self.targets = targets
+        self.state_file = state_file
+        self.health = get_domain_health(health_file) if health_file else None
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.job_func = job_func
+        self.governor = MemoryGovernor(max_rss_mb, max_browser_mb)
+        self.restart_requested = False
+        self.abandoned_jobs = 0
+        self._executor = None
+        self._stop = None
+        self._semaphore = None
+        self._running = {}  # nama target -> asyncio.Task
+        self._pending = {}  # nama target -> datetime run berikutnya yang belum dimulai
+        self._resume = {}   # nama target -> datetime dari state_file proses sebelumnya
+        self._metrics = {
+            target.name: {
+                'next_run': None, 'last_scheduled': None, 'last_start': None,
+                'last_lag_s': None, 'last_duration_s': None,
+                'runs': 0, 'failures': 0, 'skipped': 0, 'deferred': 0, 'deferred_until': None,
+                'last_rss_mb': None, 'last_rss_growth_mb': None, 'last_children_peak_mb': None,
+            }
+            for target in targets
+        }
+
+    def metrics(self):
+        """Snapshot metrik per target (next_run, lag, durasi, jumlah run/gagal/skip/tunda)."""
+        return {name: dict(values) for name, values in self._metrics.items()}
+
+    def domain_health(self):
+        """Status circuit breaker per domain (dibagi dengan scraper di proses yang sama)."""
+        return self.health.snapshot() if self.health else {}
+
+    def _blocked_until(self, target):
+        """Waktu circuit domain target dibuka kembali jika SEMUA URL target sedang cool-down, else None."""
+        if not self.health:
+            return None
+        reopen = [self.health.blocked_until(url) for url in (target.urls or [target.url])]
+        if not reopen or not all(reopen):
+            return None
+        return datetime.fromtimestamp(min(reopen))
+
+    def save_pending(self):
+        """Simpan run yang belum dimulai ke state_file (dipanggil main() sebelum restart)."""
+        if not self.state_file:
+            return
+        pending = {name: when.isoformat(timespec='seconds') for name, when in self._pending.items()}
+        SharedJsonFile(self.state_file, indent=2).save(pending)
+        print(f"[scheduler] {len(pending)} jadwal tertunda disimpan ke {self.state_file}.")
+
+    def _load_resume(self):
+        """Baca (lalu hapus) jadwal tertunda dari restart sebelumnya."""
+        if not self.state_file:
+            return {}
+        try:
+            saved = SharedJsonFile(self.state_file).load() or {}
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️ Gagal membaca {self.state_file}: {e}")
+            saved = {}
+        try:
+            os.remove(self.state_file)
+        except OSError:
+            pass
+        names = {target.name for target in self.targets}
+        resume = {}
+        for name, when in saved.items():
+            try:
+                if name in names:
+                    resume[name] = datetime.fromisoformat(when)
+            except (TypeError, ValueError):
+                continue
+        if resume:
+            print(f"[scheduler] Melanjutkan {len(resume)} jadwal dari sebelum restart.")
+        return resume
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+
+    async def _sleep_until(self, when):
+        """Tidur sampai `when`. Mengembalikan False jika scheduler dihentikan lebih dulu."""
+        delay = (when - datetime.now()).total_seconds()
+        if delay <= 0:
+            return not self._stop.is_set()
+        try:
+            await asyncio.wait_for(self._stop.wait(), timeout=delay)
+            return False
+        except asyncio.TimeoutError:
+            return True
+
+    async def _target_loop(self, target):
+        metrics = self._metrics[target.name]
+        while not self._stop.is_set():
+            scheduled = self._resume.pop(target.name, None)
+            if scheduled is None:
+                scheduled = target.next_run_after(datetime.now())
+                scheduled += timedelta(seconds=random.uniform(0, target.jitter_seconds))
+            self._pending[target.name] = scheduled
+            metrics['next_run'] = scheduled.isoformat(timespec='seconds')
+            telemetry.set_gauge('scheduler_next_run_timestamp_seconds', scheduled.timestamp(), target=target.name)
+            print(f"[scheduler] {target.name}: run berikutnya {metrics['next_run']}")
+
+            if not await self._sleep_until(scheduled):
+                break
+
+            if target.name in self._running:
+                del self._pending[target.name]
+                metrics['skipped'] += 1
+                telemetry.inc('scheduler_jobs_total', result='skipped', target=target.name)
+                print(f"[scheduler] {target.name}: run sebelumnya masih berjalan, dilewati.")
+                continue
+
+            # Domain sedang cool-down setelah blokir berulang: tunda sampai circuit dibuka lagi
+            deferred_until = self._blocked_until(target)
+            if deferred_until is not None:
+                metrics['deferred'] += 1
+                metrics['deferred_until'] = deferred_until.isoformat(timespec='seconds')
+                telemetry.inc('scheduler_jobs_total', result='deferred', target=target.name)
+                telemetry.set_gauge('scheduler_next_run_timestamp_seconds', deferred_until.timestamp(),
+                                    target=target.name)
+                print(f"[scheduler] {target.name}: domain dalam cool-down, ditunda sampai {metrics['deferred_until']}.")
+                self._pending[target.name] = deferred_until
+                if not await self._sleep_until(deferred_until):
+                    break
+                metrics['deferred_until'] = None
+                scheduled = deferred_until
+            del self._pending[target.name]
+            self._running[target.name] = asyncio.create_task(self._run_job(target, scheduled))
+
+    async def _run_job(self, target, scheduled):
+        metrics = self._metrics[target.name]
+        try:
+            async with self._semaphore:
+                start = datetime.now()
+                lag = (start - scheduled).total_seconds()
+                metrics['last_scheduled'] = scheduled.isoformat(timespec='seconds')
+                metrics['last_start'] = start.isoformat(timespec='seconds')
+                metrics['last_lag_s'] = round(lag, 3)
+                print(f"[scheduler] {target.name}: mulai (lag {lag:.1f}s, "
+                      f"{len(self._running)}/{self.max_concurrent_jobs} job aktif)")
+                telemetry.observe('scheduler_lag_seconds', max(0.0, lag))
+                telemetry.set_gauge('scheduler_last_lag_seconds', round(lag, 3), target=target.name)
+                with self.governor.job(target.name) as usage:
+                    try:
+                        with telemetry.span('job', target=target.name, lag_s=round(lag, 3)):
+                            # Seperti asyncio.to_thread: konteks (span telemetry) ikut ke thread job
+                            job = functools.partial(contextvars.copy_context().run, self.job_func, target)
+                            ok = await asyncio.get_running_loop().run_in_executor(self._executor, job)
+                    except Exception as e:
+                        print(f"❌ TERJADI ERROR SAAT SCRAPING {target.name}: {e}")
+                        ok = False
+                telemetry.inc('scheduler_jobs_total', result='success' if ok else 'failure', target=target.name)
+                duration = (datetime.now() - start).total_seconds()
+                telemetry.set_gauge('scheduler_last_duration_seconds', round(duration, 3), target=target.name)
+                metrics['last_duration_s'] = round(duration, 3)
+                metrics['runs'] += 1
+                if not ok:
+                    metrics['failures'] += 1
+                metrics['last_rss_mb'] = round(usage.end_rss_mb, 1)
+                metrics['last_rss_growth_mb'] = round(usage.growth_mb, 2)
+                metrics['last_children_peak_mb'] = round(usage.peak_children_mb, 1)
+                print(f"[scheduler] {target.name}: selesai dalam {duration:.1f}s (lag {lag:.1f}s, "
+                      f"RSS {usage.end_rss_mb:.0f} MB, {usage.growth_mb:+.1f} MB).")
+                self._check_memory()
+        finally:
+            self._running.pop(target.name, None)
+
+    def _check_memory(self):
+        """RSS tetap di atas batas setelah job: berhenti (menunggu job aktif) lalu dijalankan ulang oleh main()."""
+        if self.restart_requested or not self.governor.restart_needed():
+            return
+        print(f"[scheduler] RSS proses melewati {self.governor.max_rss_mb} MB. "
+              f"Scheduler dijalankan ulang setelah job yang aktif selesai.")
+        telemetry.inc('scheduler_restarts_total', reason='memory')
+        self.restart_requested = True
+        self.stop()
+
+    async def run(self):
+        self._stop = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.max_concurrent_jobs)
+        self._executor = ThreadPoolExecutor(self.max_concurrent_jobs, thread_name_prefix="scheduler-job")
+        self._resume = self._load_resume()
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: andalkan KeyboardInterrupt
+
+        loops = [asyncio.create_task(self._target_loop(target)) for target in self.targets]
+        try:
+            await self._stop.wait()
+        finally:
+            self._stop.set()
+            await asyncio.gather(*loops, return_exceptions=True)
+            running = list(self._running.values())
+            if running:
+                print(f"[scheduler] Menunggu {len(running)} job yang sedang berjalan selesai...")
+                done, pending = await asyncio.wait(running, timeout=SHUTDOWN_TIMEOUT)
+                if pending:
+                    # Thread tidak bisa dibatalkan: main() mengakhiri proses setelah run() kembali
+                    self.abandoned_jobs = len(pending)
+                    print(f"[scheduler] {len(pending)} job belum selesai setelah {SHUTDOWN_TIMEOUT}s, "
+                          f"proses akan diakhiri paksa.")
+            self._executor.shutdown(wait=not self.abandoned_jobs, cancel_futures=True)
+            print("\n🛑 Scheduler berhenti.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scheduler scraping cuaca")
+    parser.add_argument('--queue', metavar='FILE',
+                        help="mode coordinator: job didorong ke antrian SQLite untuk worker_farm.py, "
+                             "bukan dijalankan di proses ini")
+    parser.add_argument('--max-rss-mb', type=int, default=DEFAULT_MAX_RSS_MB,
+                        help="RSS maksimum setelah job; di atas ini scheduler dijalankan ulang (0 = nonaktif)")
+    parser.add_argument('--max-browser-mb', type=int, default=DEFAULT_MAX_BROWSER_MB,
+                        help="memori maksimum satu Chromium; di atas ini browser dibunuh (0 = nonaktif)")
+    args = parser.parse_args()
+
+    telemetry.configure_from_env()
+    targets, max_concurrent_jobs = load_targets()
+
+    print("--- 🤖 WEATHER SCRAPER SCHEDULER STARTED ---")
+    print(f"Target: {len(targets)} (maks {max_concurrent_jobs} job bersamaan)")
+    print("Status: LISTENING (Tekan Ctrl+C untuk berhenti)...")
+    if not args.queue:
+        warn_unenforced(max_browser_mb=args.max_browser_mb)
+
+    job_func = job_scraping_otomatis
+    if args.queue:
+        from worker_farm import enqueue_target
+        job_func = functools.partial(enqueue_target, queue_path=args.queue)
+        print(f"Mode coordinator: job masuk antrian {args.queue} (jalankan `python worker_farm.py run`).")
+    scheduler = AsyncScheduler(targets, max_concurrent_jobs, job_func=job_func,
+                               max_rss_mb=args.max_rss_mb, max_browser_mb=args.max_browser_mb,
+                               state_file=SCHEDULE_STATE_FILE)
     try:
-        while True:
-            schedule.run_pending()
-            # Tidur sebentar agar CPU tidak boros (cek setiap 1 detik)
-            time.sleep(1)
+        asyncio.run(scheduler.run())
     except KeyboardInterrupt:
-        print("\n🛑 Scheduler dihentikan oleh user.")
\ No newline at end of file
+        print("\n🛑 Scheduler dihentikan oleh user.")
+        return
+
+    if scheduler.abandoned_jobs:
+        # Chromium milik job yang macet tidak ikut mati bersama thread-nya
+        for root in browser_trees():
+            kill_tree(root)
+    if scheduler.restart_requested:
+        # Proses baru: heap, pool dan modul dimuat ulang dari nol; run yang belum dimulai
+        # dilanjutkan dari SCHEDULE_STATE_FILE, bukan dihitung ulang (jendela jitter tidak hilang).
+        # execv mengganti seluruh proses, termasuk thread job yang masih macet.
+        scheduler.save_pending()
+        print("[scheduler] Memulai ulang proses scheduler...")
+        sys.stdout.flush()
+        os.execv(sys.executable, [sys.executable, *sys.argv])
+    if scheduler.abandoned_jobs:
+        # Interpreter menunggu semua thread executor saat keluar normal
+        sys.stdout.flush()
+        os._exit(1)
+
+
+# --- LOOP LISTENING ---
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,20 @@
 # scraper_config.py (V20 Multi-Lokasi)
+# Hanya skema + schema_adapter; pandas tidak lagi diekspor ulang dari sini (impor langsung).
 
-from pydantic import BaseModel, Field
-import pandas as pd
+from functools import lru_cache
+
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+
+
+class _Schema(BaseModel):
+    # Validator pydantic-core dibangun saat validasi pertama, bukan saat impor:
+    # scheduler/CLI yang tidak pernah memvalidasi tidak membayar ~70 ms pembangunan skema.
+    model_config = ConfigDict(defer_build=True)
 
 
 
 # --- Skema Harian (Sama seperti sebelumnya) ---
-class UniversalDailyEntry(BaseModel):
+class UniversalDailyEntry(_Schema):
     date_day: str = Field(description="Hari dan Tanggal (e.g., Thu, 27 Nov).")
     high_temp: str = Field(description="Suhu tertinggi, termasuk unit (e.g., 30 °C).")
     low_temp: str = Field(description="Suhu terendah, termasuk unit (e.g., 25 °C).")
@@ -16,13 +24,13 @@ class UniversalDailyEntry(BaseModel):
 
 # --- SKEMA BARU: Prakiraan untuk Satu Lokasi (LocationForecast) ---
 # Ini adalah objek yang akan diulang untuk setiap kota
-class LocationForecast(BaseModel):
+class LocationForecast(_Schema):
     location_name: str = Field(description="Nama kota/kabupaten spesifik yang diekstrak (e.g., Sampit, Pangkalan Bun).")
     daily_forecasts: list[UniversalDailyEntry] = Field(description="Daftar prakiraan harian untuk lokasi ini.")
 
 
 # --- SKEMA CUACA UNIVERSAL OUTPUT (Multi-Lokasi) ---
-class MultiLocationOutput(BaseModel):
+class MultiLocationOutput(_Schema):
     # Nama daerah yang lebih besar (misal Provinsi)
     parent_location: str = Field(description="Nama provinsi, negara bagian, atau area induk yang ditemukan di halaman web (e.g., Kalimantan Tengah). Jika tidak ada, isi 'N/A'.")
     source_url: str = Field(description="URL dari mana data ini diambil.")
@@ -34,7 +42,7 @@ class MultiLocationOutput(BaseModel):
     @classmethod
     def default_data(cls, url):
         return cls(parent_location="N/A", source_url=url, forecast_period="N/A", all_locations_forecast=[])
-class HourlyEntry(BaseModel):
+class HourlyEntry(_Schema):
     time_of_day: str = Field(description="Waktu dalam jam (e.g., 1 PM, 14:00, 08:00).")
     temp: str = Field(description="Suhu pada jam tersebut, termasuk unit (e.g., 28°C).")
     condition: str = Field(description="Deskripsi cuaca per jam (e.g., Cloudy, Light Rain).")
@@ -43,12 +51,12 @@ class HourlyEntry(BaseModel):
 
 
 # --- SKEMA CUACA UNIVERSAL OUTPUT (V21: Multi-Lokasi + Hourly) ---
-class DailyHourlyGroup(BaseModel):
+class DailyHourlyGroup(_Schema):
     date_day_name: str = Field(description="Nama hari untuk grup ini (e.g., Thursday, Friday, Saturday).")
     hourly_entries: list[HourlyEntry] = Field(description="Daftar prakiraan per jam yang hanya berlaku untuk hari ini.")
 
 # --- SKEMA CUACA UNIVERSAL OUTPUT (V22: Multi-Lokasi + Hourly Grouped) ---
-class MonthlyEntry(BaseModel):
+class MonthlyEntry(_Schema):
     date_month_day: str = Field(description="Tanggal (e.g., Nov 27, Dec 1).")
     day_temp: str = Field(description="Suhu rata-rata siang, termasuk unit (e.g., 30°C).")
     night_temp: str = Field(description="Suhu rata-rata malam, termasuk unit (e.g., 23°C).")
@@ -56,7 +64,7 @@ class MonthlyEntry(BaseModel):
     precipitation_chance: str = Field(description="Peluang Presipitasi. Jika tidak ada, isi 'N/A'.")
 
 # --- SKEMA CUACA UNIVERSAL OUTPUT (V27: Monthly + Grouped Hourly + Multi-Lokasi) ---
-class UniversalOutputV27(BaseModel):
+class UniversalOutputV27(_Schema):
     parent_location: str = Field(description="Nama kota/area induk.")
     source_url: str = Field(description="URL dari mana data ini diambil.")
     forecast_period: str = Field(description="Rentang tanggal prakiraan (e.g., Monthly forecast for November 2025).")
@@ -75,4 +83,63 @@ class UniversalOutputV27(BaseModel):
         return cls(parent_location="N/A", source_url=url, forecast_period="N/A", 
                    all_locations_forecast=[], hourly_forecasts_grouped=[], monthly_forecasts=[])
 
-TARGET_SCHEMA = UniversalOutputV27
\ No newline at end of file
+    @classmethod
+    def merge(cls, parts, url):
+        """
+        Gabungkan hasil ekstraksi per-chunk secara deterministik (urutan chunk dipertahankan).
+
+        - all_locations_forecast: digabung per location_name, entri harian dedupe per date_day
+        - hourly_forecasts_grouped: digabung per date_day_name, entri dedupe per time_of_day
+        - monthly_forecasts: dedupe per date_month_day
+        Chunk yang gagal (default_data) hanya menyumbang list kosong.
+        """
+        parts = list(parts)
+
+        def first_known(attr):
+            for part in parts:
+                value = getattr(part, attr)
+                if value and value != "N/A":
+                    return value
+            return "N/A"
+
+        locations = {}
+        for part in parts:
+            for loc in part.all_locations_forecast:
+                merged = locations.setdefault(loc.location_name, LocationForecast(location_name=loc.location_name, daily_forecasts=[]))
+                seen = {entry.date_day for entry in merged.daily_forecasts}
+                for entry in loc.daily_forecasts:
+                    if entry.date_day not in seen:
+                        seen.add(entry.date_day)
+                        merged.daily_forecasts.append(entry)
+
+        groups = {}
+        for part in parts:
+            for group in part.hourly_forecasts_grouped:
+                merged = groups.setdefault(group.date_day_name, DailyHourlyGroup(date_day_name=group.date_day_name, hourly_entries=[]))
+                seen = {entry.time_of_day for entry in merged.hourly_entries}
+                for entry in group.hourly_entries:
+                    if entry.time_of_day not in seen:
+                        seen.add(entry.time_of_day)
+                        merged.hourly_entries.append(entry)
+
+        monthly = {}
+        for part in parts:
+            for entry in part.monthly_forecasts:
+                monthly.setdefault(entry.date_month_day, entry)
+
+        return cls(parent_location=first_known('parent_location'), source_url=url,
+                   forecast_period=first_known('forecast_period'),
+                   all_locations_forecast=list(locations.values()),
+                   hourly_forecasts_grouped=list(groups.values()),
+                   monthly_forecasts=list(monthly.values()))
+
+TARGET_SCHEMA = UniversalOutputV27
+
+
+@lru_cache(maxsize=None)
+def schema_adapter(schema):
+    """TypeAdapter per skema, dibangun sekali per proses. validate_json() langsung dari str/bytes."""
+    return TypeAdapter(schema)
+
+# --- DAFTAR PROVINSI BMKG: dipindah ke bmkg_regions.py (tanpa pydantic, agar CLI cepat start) ---
+from bmkg_regions import BMKG_BASE_URL, BMKG_PROVINCES, bmkg_province_urls  # noqa: E402,F401
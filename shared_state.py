@@ -0,0 +1,87 @@
+# shared_state.py (V27)
+# File state yang dipakai bersama beberapa proses (worker_farm, scheduler --queue):
+# lock file antar proses (fcntl.flock / msvcrt.locking) dan file JSON dengan pola
+# baca-gabung-tulis. Di dalam lock, state dibaca ulang dari disk, perubahan proses ini
+# diterapkan, lalu ditulis atomik; pembaca memuat ulang hanya jika file berubah.
+
+import contextlib
+import json
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Lock eksklusif antar proses untuk `path` (via file <path>.lock). path None: tanpa lock."""
+    if not path:
+        yield
+        return
+    lock_path = f"{path}.lock"
+    directory = os.path.dirname(lock_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(lock_path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class SharedJsonFile:
+    """
+    File state JSON bersama.
+
+    - changed(): True jika file diganti proses lain sejak load()/save() terakhir proses ini
+    - load(): isi file (None jika belum ada); json.JSONDecodeError/OSError diteruskan
+    - save(data): tulis atomik (file tmp per proses + os.replace)
+    - lock(): file_lock() untuk baca-gabung-tulis
+    """
+
+    def __init__(self, path, **dump_options):
+        self.path = path
+        self.dump_options = dump_options
+        self._stamp = None
+
+    def _current_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def changed(self):
+        return self._current_stamp() != self._stamp
+
+    def load(self):
+        stamp = self._current_stamp()
+        if stamp is None:
+            self._stamp = None
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self._stamp = stamp
+        return data
+
+    def save(self, data):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, **self.dump_options)
+        os.replace(tmp_path, self.path)
+        self._stamp = self._current_stamp()
+
+    def lock(self):
+        return file_lock(self.path)
@@ -0,0 +1,144 @@
+# site_adapters.py (V27)
+# Registry ekstraktor berbasis aturan per domain. Untuk situs yang strukturnya
+# sudah diketahui (misal tabel BMKG), data dipetakan langsung ke skema V27
+# tanpa memanggil Gemini.
+
+import re
+from urllib.parse import urlparse
+
+import lxml.html
+
+from bmkg_regions import BMKG_PROVINCES
+
+# Daftar (domain, fungsi adapter). Fungsi menerima (html, url) dan
+# mengembalikan dict sesuai UniversalOutputV27, atau None jika gagal.
+_ADAPTERS = []
+
+
+def register_adapter(domain):
+    """Decorator untuk mendaftarkan adapter bagi sebuah domain (termasuk subdomain)."""
+    def decorator(func):
+        _ADAPTERS.append((domain.lower(), func))
+        return func
+    return decorator
+
+
+def find_adapter(url):
+    """Cari adapter yang cocok dengan host URL. Mengembalikan fungsi adapter atau None."""
+    host = (urlparse(url).hostname or "").lower()
+    for domain, func in _ADAPTERS:
+        if host == domain or host.endswith("." + domain):
+            return func
+    return None
+
+
+# --- BMKG (bmkg.go.id/cuaca/prakiraan-cuaca/<kode>) ---
+
+_TEMP_RANGE_RE = re.compile(r'(-?\d+(?:[.,]\d+)?)\s*(?:-|–|s/d)\s*(-?\d+(?:[.,]\d+)?)\s*(°\s*[CF]?)?')
+_TEMP_SINGLE_RE = re.compile(r'(-?\d+(?:[.,]\d+)?)\s*(°\s*[CF]?)?')
+
+
+def iter_bmkg_rows(html):
+    """
+    Parse tabel prakiraan BMKG dengan lxml.
+
+    Yields:
+        dict: kabupaten_kota, tanggal, keterangan_cuaca, suhu, kelembapan
+        (kolom sama dengan bmkg_scraper.scrape_bmkg_weather)
+    """
+    doc = lxml.html.fromstring(html)
+    tables = doc.xpath('//table')
+    if not tables:
+        return
+    table = tables[0]
+
+    # Header tanggal (skip kolom pertama: Kab/Kota)
+    dates = []
+    for i, th in enumerate(table.xpath('./thead//th')):
+        if i > 0:
+            date_text = th.text_content().strip()
+            if date_text:
+                dates.append(date_text)
+
+    for row in table.xpath('./tbody/tr'):
+        cells = row.xpath('./td')
+        if not cells:
+            continue
+
+        links = cells[0].xpath('.//a')
+        kab_kota = (links[0] if links else cells[0]).text_content().strip()
+
+        for i, cell in enumerate(cells[1:]):
+            tanggal = dates[i] if i < len(dates) else f"Hari ke-{i+1}"
+            lines = [t.strip() for t in cell.itertext() if t.strip()]
+
+            keterangan_cuaca = lines[0] if len(lines) >= 1 else ''
+            suhu = lines[1] if len(lines) >= 2 else ''
+            kelembapan = lines[2] if len(lines) >= 3 else ''
+
+            if kab_kota and keterangan_cuaca:
+                yield {
+                    'kabupaten_kota': kab_kota,
+                    'tanggal': tanggal,
+                    'keterangan_cuaca': keterangan_cuaca,
+                    'suhu': suhu,
+                    'kelembapan': kelembapan,
+                }
+
+
+def split_temp_range(suhu):
+    """'23 - 32 °C' -> ('23 °C', '32 °C'). Nilai tunggal dipakai untuk keduanya."""
+    match = _TEMP_RANGE_RE.search(suhu or "")
+    if match:
+        unit = (match.group(3) or "°C").replace(" ", "")
+        return f"{match.group(1)} {unit}", f"{match.group(2)} {unit}"
+    match = _TEMP_SINGLE_RE.search(suhu or "")
+    if match:
+        unit = (match.group(2) or "°C").replace(" ", "")
+        value = f"{match.group(1)} {unit}"
+        return value, value
+    return "N/A", "N/A"
+
+
+def bmkg_rows_to_output(rows, url, parent_location="N/A"):
+    """Kelompokkan baris tabel BMKG per kabupaten/kota ke format UniversalOutputV27 (dict)."""
+    locations = {}
+    dates = []
+    for row in rows:
+        low, high = split_temp_range(row['suhu'])
+        locations.setdefault(row['kabupaten_kota'], []).append({
+            'date_day': row['tanggal'],
+            'high_temp': high,
+            'low_temp': low,
+            'condition_summary': row['keterangan_cuaca'],
+            'precipitation_chance': 'N/A',
+            'wind_speed': 'N/A',
+        })
+        if row['tanggal'] not in dates:
+            dates.append(row['tanggal'])
+
+    if dates:
+        forecast_period = f"{len(dates)} hari ({dates[0]} - {dates[-1]})"
+    else:
+        forecast_period = "N/A"
+
+    return {
+        'parent_location': parent_location,
+        'source_url': url,
+        'forecast_period': forecast_period,
+        'all_locations_forecast': [
+            {'location_name': name, 'daily_forecasts': entries}
+            for name, entries in locations.items()
+        ],
+        'hourly_forecasts_grouped': [],
+        'monthly_forecasts': [],
+    }
+
+
+@register_adapter("bmkg.go.id")
+def bmkg_adapter(html, url):
+    rows = list(iter_bmkg_rows(html))
+    if not rows:
+        return None
+    code = urlparse(url).path.rstrip('/').rsplit('/', 1)[-1]
+    return bmkg_rows_to_output(rows, url, BMKG_PROVINCES.get(code, "N/A"))
@@ -0,0 +1,267 @@
+# stream_extraction.py (V27)
+# Parser JSON incremental untuk respons Gemini streaming (generate_content_stream).
+# Setiap item list skema (LocationForecast, DailyHourlyGroup, MonthlyEntry, dan entri di
+# dalamnya) divalidasi begitu kurung tutupnya diterima, sehingga item lengkap bisa dipakai
+# sebelum respons selesai. Stream dihentikan lebih awal jika ada pelanggaran skema,
+# loop entri duplikat (model mengulang entri per jam tanpa henti), atau batas token.
+
+import json
+import re
+import time
+import typing
+
+from pydantic import BaseModel, ValidationError
+
+from scraper_config import schema_adapter
+from text_reducer import estimate_tokens
+
+DEFAULT_MAX_OUTPUT_TOKENS = 16000  # respons normal terbesar (BMKG multi-lokasi) jauh di bawah ini
+MAX_DUPLICATE_RUN = 3              # item duplikat berturut-turut dalam satu list sebelum stream dihentikan
+MAX_ITEMS_PER_LIST = 500
+
+ABORT_SCHEMA, ABORT_DUPLICATES, ABORT_TOKENS, ABORT_INVALID_JSON = (
+    "schema_violation", "duplicate_loop", "token_limit", "invalid_json")
+
+_STRUCTURAL_RE = re.compile(r'[{}\[\]",]')
+_STRING_END_RE = re.compile(r'["\\]')
+
+
+class StreamAborted(Exception):
+    def __init__(self, reason, detail=""):
+        super().__init__(f"{reason}: {detail}" if detail else reason)
+        self.reason = reason
+        self.detail = detail
+
+
+def item_models(schema, prefix=()):
+    """{path: model} untuk setiap list model di dalam skema, path berbentuk ('field', '*', ...)."""
+    models = {}
+    for name, field in schema.model_fields.items():
+        if typing.get_origin(field.annotation) is not list:
+            continue
+        (item,) = typing.get_args(field.annotation)
+        if isinstance(item, type) and issubclass(item, BaseModel):
+            path = (*prefix, name, '*')
+            models[path] = item
+            models.update(item_models(item, path))
+    return models
+
+
+class _Frame:
+    __slots__ = ('is_object', 'start', 'path', 'key', 'expect_key', 'seen', 'count', 'duplicate_run')
+
+    def __init__(self, is_object, start, path):
+        self.is_object = is_object
+        self.start = start
+        self.path = path
+        self.key = None
+        self.expect_key = is_object
+        self.seen = set()
+        self.count = 0
+        self.duplicate_run = 0
+
+
+class StreamingExtraction:
+    """
+    Konsumen incremental untuk satu respons streaming.
+
+    - feed(text): tambahkan potongan teks; StreamAborted jika stream harus dihentikan
+    - on_item(field, model): dipanggil untuk setiap item list tingkat atas yang sudah lengkap
+    - result(url): model skema lengkap, atau hasil parsial dari item yang sudah valid jika dihentikan
+    - stats(): time_to_first_record_s, output_tokens, wasted_tokens, items, abort_reason
+    """
+
+    def __init__(self, schema, on_item=None, max_output_tokens=DEFAULT_MAX_OUTPUT_TOKENS,
+                 max_duplicate_run=MAX_DUPLICATE_RUN, max_items=MAX_ITEMS_PER_LIST):
+        self.schema = schema
+        self.on_item = on_item
+        self.max_output_tokens = max_output_tokens
+        self.max_duplicate_run = max_duplicate_run
+        self.max_items = max_items
+        self._models = item_models(schema)
+        self._buf = ""
+        self._pos = 0
+        self._in_string = False
+        self._string_start = 0
+        self._stack = []
+        self._done = False
+        self._scalars = {}
+        self._items = {}          # field tingkat atas -> [model]
+        self._safe_end = 0        # akhir item valid terakhir (untuk perbaikan JSON terpotong)
+        self._safe_closers = ""
+        self._duplicate_tokens = 0
+        self.started = time.perf_counter()
+        self.first_record_s = None
+        self.output_tokens = 0
+        self.abort_reason = None
+
+    def start(self):
+        """Tandai awal request (setelah antrian rate limit) untuk time-to-first-record."""
+        self.started = time.perf_counter()
+
+    # --- scanner ---
+    def feed(self, text):
+        if self.abort_reason:
+            raise StreamAborted(self.abort_reason)
+        if not text:
+            return
+        self._buf += text
+        self.output_tokens += estimate_tokens(text)
+        try:
+            self._scan()
+            if self.max_output_tokens and self.output_tokens > self.max_output_tokens:
+                raise StreamAborted(ABORT_TOKENS, f"> {self.max_output_tokens} token output")
+        except StreamAborted as e:
+            self.abort_reason = e.reason
+            raise
+
+    def _scan(self):
+        buf, pos = self._buf, self._pos
+        while pos < len(buf):
+            if self._in_string:
+                match = _STRING_END_RE.search(buf, pos)
+                if match is None:
+                    pos = len(buf)
+                    break
+                if match.group() == '\\':
+                    if match.end() >= len(buf):
+                        pos = match.start()  # escape terpotong di batas chunk: tunggu chunk berikutnya
+                        break
+                    pos = match.end() + 1
+                    continue
+                pos = match.end()
+                self._in_string = False
+                self._close_string(buf[self._string_start:pos])
+                continue
+
+            match = _STRUCTURAL_RE.search(buf, pos)
+            if match is None:
+                pos = len(buf)
+                break
+            char, pos = match.group(), match.end()
+            if self._done:
+                raise StreamAborted(ABORT_INVALID_JSON, "teks setelah objek JSON selesai")
+            if char == '"':
+                self._in_string = True
+                self._string_start = match.start()
+            elif char in '{[':
+                if not self._stack and (char != '{' or buf[:match.start()].strip()):
+                    raise StreamAborted(ABORT_INVALID_JSON, "respons bukan objek JSON")
+                self._push(char == '{', match.start())
+            elif char in '}]':
+                self._close(char, pos)
+            elif char == ',' and self._stack:
+                top = self._stack[-1]
+                top.expect_key = top.is_object
+        self._pos = pos
+
+    def _push(self, is_object, start):
+        if self._stack:
+            parent = self._stack[-1]
+            path = (*parent.path, parent.key if parent.is_object else '*')
+        else:
+            path = ()
+        self._stack.append(_Frame(is_object, start, path))
+
+    def _close_string(self, raw):
+        if not self._stack:
+            return
+        top = self._stack[-1]
+        if top.is_object and top.expect_key:
+            top.key = json.loads(raw)
+            top.expect_key = False
+        elif top.is_object and len(self._stack) == 1:
+            self._scalars[top.key] = json.loads(raw)
+
+    def _close(self, char, end):
+        if not self._stack or self._stack[-1].is_object != (char == '}'):
+            raise StreamAborted(ABORT_INVALID_JSON, f"'{char}' tidak berpasangan")
+        frame = self._stack.pop()
+        if not self._stack:
+            self._done = True
+            return
+        parent = self._stack[-1]
+        path = (*parent.path, parent.key if parent.is_object else '*')
+        model = self._models.get(path) if not parent.is_object else None
+        if model is not None:
+            self._accept_item(parent, model, path, self._buf[frame.start:end], end)
+
+    def _accept_item(self, parent, model, path, raw, end):
+        try:
+            item = schema_adapter(model).validate_json(raw)
+        except ValidationError as e:
+            raise StreamAborted(ABORT_SCHEMA, f"{'.'.join(p for p in path if p != '*')}: "
+                                              f"{e.error_count()} error") from e
+        parent.count += 1
+        if parent.count > self.max_items:
+            raise StreamAborted(ABORT_DUPLICATES, f"lebih dari {self.max_items} item dalam satu list")
+
+        key = item.model_dump_json()
+        if key in parent.seen:
+            parent.duplicate_run += 1
+            self._duplicate_tokens += estimate_tokens(raw)
+            if parent.duplicate_run >= self.max_duplicate_run:
+                raise StreamAborted(ABORT_DUPLICATES, f"{parent.duplicate_run} item berulang pada "
+                                                      f"{'.'.join(p for p in path if p != '*')}")
+            return
+        parent.seen.add(key)
+        parent.duplicate_run = 0
+        self._safe_end = end
+        self._safe_closers = "".join('}' if f.is_object else ']' for f in reversed(self._stack))
+
+        if len(path) == 2:  # item langsung di bawah skema: LocationForecast / DailyHourlyGroup / MonthlyEntry
+            self._items.setdefault(path[0], []).append(item)
+            if self.first_record_s is None:
+                self.first_record_s = time.perf_counter() - self.started
+            if self.on_item is not None:
+                self.on_item(path[0], item)
+
+    # --- hasil ---
+    @property
+    def complete(self):
+        return self._done and not self.abort_reason
+
+    def text(self):
+        return self._buf
+
+    def result(self, url):
+        """
+        Model skema. Respons lengkap divalidasi utuh; respons yang dihentikan dirakit dari
+        item yang sudah valid (entri duplikat dibuang lewat schema.merge).
+
+        Raises:
+            ValidationError: respons lengkap tidak valid terhadap skema
+        """
+        if self.complete:
+            return schema_adapter(self.schema).validate_json(self._buf)
+        return self.schema.merge([self._partial(url)], url)
+
+    def _partial(self, url):
+        base = self.schema.default_data(url).model_dump()
+        base.update({key: value for key, value in self._scalars.items() if key in base})
+        if self._safe_end:
+            # JSON terpotong setelah item valid terakhir + kurung penutup -> item setengah jadi
+            # (e.g. grup per jam yang entrinya berulang) tetap terselamatkan
+            try:
+                repaired = json.loads(self._buf[:self._safe_end] + self._safe_closers)
+                return self.schema.model_validate({**base, **repaired, 'source_url': url})
+            except (ValueError, ValidationError):
+                pass
+        for field, items in self._items.items():
+            base[field] = [item.model_dump() for item in items]
+        return self.schema.model_validate(base)
+
+    def wasted_tokens(self):
+        """Token output yang tidak menghasilkan data: duplikat + ekor setelah item valid terakhir."""
+        if self.complete:
+            return self._duplicate_tokens
+        return self._duplicate_tokens + estimate_tokens(self._buf[self._safe_end:])
+
+    def stats(self):
+        return {
+            'time_to_first_record_s': self.first_record_s,
+            'output_tokens': self.output_tokens,
+            'wasted_tokens': self.wasted_tokens(),
+            'items': {field: len(items) for field, items in self._items.items()},
+            'abort_reason': self.abort_reason,
+        }
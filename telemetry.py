@@ -0,0 +1,268 @@
+# telemetry.py (V27)
+# Instrumentasi ringan tanpa dependensi: span per tahap (diekspor sebagai JSON Lines
+# dengan field mirip OpenTelemetry), counter, dan histogram yang bisa di-scrape
+# Prometheus dari endpoint /metrics. Saat nonaktif (default), span() mengembalikan
+# context manager no-op bersama dan inc()/observe()/set_gauge() langsung return.
+#
+# Aktifkan lewat environment (configure_from_env) atau enable():
+#   SCRAPER_TELEMETRY=1                 aktifkan metrik in-memory
+#   SCRAPER_TRACE_FILE=spans.jsonl      ekspor span ke file JSONL
+#   SCRAPER_METRICS_PORT=9464           endpoint Prometheus http://0.0.0.0:9464/metrics
+
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DURATION_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+HISTOGRAM_BUCKETS = {
+    'stage_duration_seconds': DURATION_BUCKETS,
+    'llm_latency_seconds': DURATION_BUCKETS,
+    'page_text_chars': (500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000),
+    'llm_tokens': (250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000),
+    'llm_wasted_tokens': (0, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000),
+    'llm_time_to_first_record_seconds': DURATION_BUCKETS,
+    'job_rss_mb': (128, 256, 512, 768, 1024, 1536, 2048, 4096),
+    'job_rss_growth_mb': (0, 0.5, 1, 5, 10, 25, 50, 100, 250),
+    'job_children_peak_mb': (0, 128, 256, 512, 1024, 1536, 2048, 4096),
+}
+
+_enabled = False
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_gauges = {}      # (name, labels) -> value terakhir
+_histograms = {}  # (name, labels) -> [bucket_counts, sum, count]
+_span_file = None
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+def enabled():
+    return _enabled
+
+
+def enable(trace_file=None, metrics_port=None):
+    """Aktifkan telemetri. trace_file: ekspor span JSONL; metrics_port: endpoint Prometheus."""
+    global _enabled, _span_file
+    with _lock:
+        _enabled = True
+        if trace_file and _span_file is None:
+            _span_file = open(trace_file, 'a', encoding='utf-8')
+    if metrics_port:
+        start_metrics_server(int(metrics_port))
+
+
+def configure_from_env():
+    """Aktifkan dari SCRAPER_TELEMETRY / SCRAPER_TRACE_FILE / SCRAPER_METRICS_PORT. True jika aktif."""
+    trace_file = os.environ.get('SCRAPER_TRACE_FILE')
+    metrics_port = os.environ.get('SCRAPER_METRICS_PORT')
+    if os.environ.get('SCRAPER_TELEMETRY', '').lower() in ('1', 'true', 'yes') or trace_file or metrics_port:
+        enable(trace_file, metrics_port)
+    return _enabled
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, value=1, **labels):
+    """Tambah counter `name` (label bebas, e.g. result='success')."""
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    """Set gauge `name` ke nilai terbaru (e.g. waktu run berikutnya per target)."""
+    if not _enabled or value is None:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _gauges[key] = value
+
+
+def observe(name, value, **labels):
+    """Catat satu nilai ke histogram `name` (bucket dari HISTOGRAM_BUCKETS)."""
+    if not _enabled or value is None:
+        return
+    buckets = HISTOGRAM_BUCKETS.get(name, DURATION_BUCKETS)
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+        hist[0][bisect_left(buckets, value)] += 1
+        hist[1] += value
+        hist[2] += 1
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """Span aktif. Durasi dicatat ke histogram stage_duration_seconds{stage=<nama>}."""
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.parent = _current_span.get()
+        self.trace_id = self.parent.trace_id if self.parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self._token = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self._start_ns = time.time_ns()
+        self._start = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._start
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            inc('stage_errors_total', stage=self.name, error=exc_type.__name__)
+        self._finish(self._start_ns, duration, 'ERROR' if exc_type is not None else 'OK')
+        return False
+
+    def _finish(self, start_ns, duration, status='OK'):
+        observe('stage_duration_seconds', duration, stage=self.name)
+        if _span_file is None:
+            return
+        record = {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_span_id': self.parent.span_id if self.parent else None,
+            'name': self.name,
+            'start_time_unix_nano': start_ns,
+            'end_time_unix_nano': start_ns + int(duration * 1e9),
+            'attributes': self.attributes,
+            'status': status,
+        }
+        line = json.dumps(record, default=str) + "\n"
+        with _lock:
+            _span_file.write(line)
+            _span_file.flush()
+
+
+def span(name, **attributes):
+    """
+    Context manager untuk satu tahap pipeline:
+
+        with telemetry.span('navigate', url=url):
+            page.goto(url)
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+    return Span(name, attributes)
+
+
+def record_span(name, duration, **attributes):
+    """Catat span yang sudah selesai (durasi diukur sendiri), sebagai anak span aktif."""
+    if not _enabled:
+        return
+    Span(name, attributes)._finish(time.time_ns() - int(duration * 1e9), duration)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def render_prometheus():
+    """Semua metrik dalam format teks eksposisi Prometheus."""
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        gauges = sorted(_gauges.items())
+        histograms = sorted((key, [list(h[0]), h[1], h[2]]) for key, h in _histograms.items())
+
+    seen = set()
+    for (name, labels), value in counters:
+        if name not in seen:
+            lines.append(f"# TYPE {name} counter")
+            seen.add(name)
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for (name, labels), value in gauges:
+        if name not in seen:
+            lines.append(f"# TYPE {name} gauge")
+            seen.add(name)
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for (name, labels), (counts, total, count) in histograms:
+        if name not in seen:
+            lines.append(f"# TYPE {name} histogram")
+            seen.add(name)
+        buckets = HISTOGRAM_BUCKETS.get(name, DURATION_BUCKETS)
+        cumulative = 0
+        for bound, bucket_count in zip(list(buckets) + ['+Inf'], counts):
+            cumulative += bucket_count
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def snapshot():
+    """Counter, gauge dan ringkasan histogram sebagai dict (untuk log atau tes)."""
+    with _lock:
+        return {
+            'counters': {f"{name}{_format_labels(labels)}": value for (name, labels), value in _counters.items()},
+            'gauges': {f"{name}{_format_labels(labels)}": value for (name, labels), value in _gauges.items()},
+            'histograms': {f"{name}{_format_labels(labels)}": {'count': h[2], 'sum': h[1]}
+                           for (name, labels), h in _histograms.items()},
+        }
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip('/') != '/metrics':
+            self.send_error(404)
+            return
+        body = render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_metrics_server = None
+
+
+def start_metrics_server(port, host='0.0.0.0'):
+    """Endpoint Prometheus /metrics di thread daemon (sekali per proses)."""
+    global _metrics_server
+    if _metrics_server is None:
+        _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+        print(f"[telemetry] Metrik Prometheus tersedia di http://{host}:{port}/metrics")
+    return _metrics_server
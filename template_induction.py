@@ -0,0 +1,444 @@
+# template_induction.py (V27)
+# Template ekstraksi hasil induksi LLM: halaman dengan layout DOM yang sama (e.g. semua
+# halaman monthly/daily/hourly weather.com) cukup satu kali diekstrak Gemini. Setelah itu
+# Gemini diminta menulis XPath untuk setiap field UniversalOutputV27, XPath tersebut diuji
+# ulang pada halaman yang sama terhadap hasil ekstraksi LLM, lalu disimpan per fingerprint
+# struktur DOM. Halaman berikutnya dengan fingerprint sama diekstrak lokal dengan lxml.
+# Fingerprint baru (layout berubah) atau template yang tidak lagi cocok -> kembali ke LLM.
+
+import contextlib
+import hashlib
+import json
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+import lxml.etree
+import lxml.html
+from pydantic import BaseModel, Field
+
+from shared_state import SharedJsonFile
+
+TEMPLATE_FILE = "extraction_templates_v27.json"
+MIN_AGREEMENT = 0.9               # porsi nilai yang harus sama dengan ekstraksi LLM
+MAX_INDUCTION_ATTEMPTS = 2        # induksi gagal per fingerprint sebelum menyerah ...
+RETRY_REJECTED_AFTER_S = 7 * 24 * 3600  # ... sampai jeda ini lewat
+MAX_TEMPLATE_FAILURES = 2         # penerapan gagal berturut-turut sebelum template dibuang
+REVALIDATE_EVERY = 25             # setiap N pemakaian, hasil template dicek ulang dengan LLM
+MAX_NA_RATIO = 0.5                # hasil template dengan porsi 'N/A' lebih besar dianggap drift
+PROMPT_HTML_CHARS = 60000         # batas HTML ringkas yang dikirim saat induksi
+PROMPT_EXAMPLE_ITEMS = 3          # contoh item per list yang disertakan dari hasil LLM
+
+# Tag yang tidak memengaruhi layout prakiraan (boilerplate, aset, widget)
+_SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'link', 'meta', 'iframe',
+              'header', 'nav', 'footer', 'aside', 'form'}
+_KEEP_ATTRS = {'class', 'id', 'role', 'data-testid', 'aria-label'}
+# Sufiks hash CSS module (e.g. DailyContent--daypartName--3VGlz) berubah setiap deploy
+_HASH_SUFFIX_RE = re.compile(r'--[A-Za-z0-9_]{5}$')
+_DIGITS_RE = re.compile(r'\d+')
+_WORDS_RE = re.compile(r'\w+')
+
+# Error saat menerapkan template (XPath/regex dari LLM yang tidak valid)
+TEMPLATE_ERRORS = (lxml.etree.XPathError, re.error)
+
+LIST_FIELDS = ('all_locations_forecast', 'hourly_forecasts_grouped', 'monthly_forecasts')
+
+
+# --- Skema template (response_schema untuk Gemini) ---
+class FieldXPath(BaseModel):
+    field: str = Field(description="Nama field skema target (e.g., high_temp, time_of_day).")
+    xpath: str = Field(description="XPath 1.0 relatif terhadap item (diawali './'), e.g. './span[2]'. "
+                                   "Kosong '' jika field tidak ada di halaman.")
+    pattern: str = Field(description="Regex opsional untuk memotong teks node; grup pertama yang diambil "
+                                     "(e.g. '(\\d+°)'). Kosong '' jika teks dipakai utuh.")
+
+
+class ListTemplate(BaseModel):
+    item_xpath: str = Field(description="XPath yang mengembalikan SETIAP item berulang (satu node per item). "
+                                        "Kosong '' jika list ini tidak ada di halaman.")
+    fields: list[FieldXPath] = Field(description="XPath per field item, relatif terhadap node item.")
+
+
+class ExtractionTemplate(BaseModel):
+    parent_location_xpath: str = Field(description="XPath absolut untuk parent_location, atau ''.")
+    forecast_period_xpath: str = Field(description="XPath absolut untuk forecast_period, atau ''.")
+    location_item_xpath: str = Field(description="XPath absolut untuk setiap blok lokasi (multi-lokasi). "
+                                                 "Kosong '' jika halaman hanya berisi satu lokasi.")
+    location_name_xpath: str = Field(description="XPath location_name, relatif terhadap blok lokasi "
+                                                 "(absolut jika location_item_xpath kosong).")
+    daily: ListTemplate = Field(description="Item UniversalDailyEntry, relatif terhadap blok lokasi.")
+    hourly_group: ListTemplate = Field(description="Grup per hari (field: date_day_name), XPath absolut.")
+    hourly_entry: ListTemplate = Field(description="Item HourlyEntry, relatif terhadap node grup per hari.")
+    monthly: ListTemplate = Field(description="Item MonthlyEntry, XPath absolut.")
+
+
+TEMPLATE_PROMPT = (
+    "Anda menulis template ekstraksi untuk layout halaman cuaca. Di bawah ini ada HTML ringkas halaman "
+    "dan contoh data yang sudah diekstrak dari halaman yang sama.\n\n"
+    "Tulis XPath 1.0 yang menghasilkan data tersebut dari HTML, untuk dipakai ulang pada halaman lain "
+    "dengan layout yang sama:\n"
+    "1. Gunakan predikat class/atribut yang stabil, e.g. //div[contains(@class, 'DailyContent')]. "
+    "Jangan memakai sufiks hash class (e.g. '--3VGlz') atau posisi absolut dari root dokumen.\n"
+    "2. item_xpath harus mengembalikan SEMUA item berulang pada list, bukan hanya contoh yang diberikan.\n"
+    "3. XPath field relatif terhadap node item dan diawali './'. Teks node (atau hasil fungsi string XPath) "
+    "menjadi nilai field; gunakan 'pattern' jika teks perlu dipotong (e.g. 'Feels Like 88°' -> '(\\d+°)').\n"
+    "4. List yang kosong pada contoh data: isi item_xpath dengan '' dan fields dengan [].\n\n"
+    "--- URL ---\n"
+    "{url}\n"
+    "--- Contoh Data (JSON) ---\n"
+    "{example}\n"
+    "--- HTML Ringkas ---\n"
+    "{html}\n"
+)
+
+
+def parse_html(html):
+    """Dokumen lxml, atau None jika HTML kosong/tidak bisa di-parse."""
+    try:
+        return lxml.html.fromstring(html)
+    except (ValueError, lxml.etree.ParserError):
+        return None
+
+
+def _content_root(doc):
+    # Area prakiraan bisa tersebar di beberapa blok (harian, per jam, bulanan): pakai seluruh
+    # konten utama halaman, boilerplate dibuang lewat _SKIP_TAGS
+    for xpath in ('//main', "//*[@role='main']", '//body'):
+        found = doc.xpath(xpath)
+        if found:
+            return found[0]
+    return doc
+
+
+def _content_elements(root):
+    """Elemen konten di bawah root, tanpa subtree _SKIP_TAGS."""
+    stack = [root]
+    while stack:
+        element = stack.pop()
+        if not isinstance(element.tag, str) or element.tag in _SKIP_TAGS:
+            continue
+        yield element
+        stack.extend(reversed(element))
+
+
+def _signature(element):
+    classes = sorted({_HASH_SUFFIX_RE.sub('', c) for c in (element.get('class') or '').split()})
+    return ".".join([element.tag, *classes])
+
+
+def dom_fingerprint(doc, url):
+    """
+    Hash struktur DOM konten utama: himpunan pasangan (induk > anak) tag+class.
+
+    Jumlah baris/hari dan isi teks tidak memengaruhi hasil, jadi halaman lain dengan layout
+    yang sama (lokasi berbeda, jumlah hari berbeda) mendapat fingerprint yang sama.
+    """
+    edges = set()
+    for element in _content_elements(_content_root(doc)):
+        parent = element.getparent()
+        edges.add(f"{_signature(parent) if parent is not None else ''}>{_signature(element)}")
+    host = (urlparse(url).hostname or "").lower()
+    digest = hashlib.sha1("\n".join([host, *sorted(edges)]).encode('utf-8')).hexdigest()
+    return f"{host}:{digest[:16]}"
+
+
+def compact_html(doc, max_chars=PROMPT_HTML_CHARS):
+    """HTML konten utama tanpa boilerplate/script dan atribut non-struktural, dipotong max_chars."""
+    root = lxml.html.fromstring(lxml.html.tostring(_content_root(doc)))  # salinan, dokumen asli tidak diubah
+    for node in root.xpath('|'.join(f'.//{tag}' for tag in _SKIP_TAGS)):
+        node.drop_tree()
+    for element in root.iter():
+        if isinstance(element.tag, str):
+            for attr in [a for a in element.attrib if a not in _KEEP_ATTRS]:
+                del element.attrib[attr]
+    return re.sub(r'\s+', ' ', lxml.html.tostring(root, encoding='unicode'))[:max_chars]
+
+
+def _examples(extracted):
+    """Potong list hasil LLM menjadi beberapa contoh per list (hemat token prompt)."""
+    example = dict(extracted)
+    for name in LIST_FIELDS:
+        example[name] = example.get(name, [])[:PROMPT_EXAMPLE_ITEMS]
+    for location in example['all_locations_forecast']:
+        location['daily_forecasts'] = location['daily_forecasts'][:PROMPT_EXAMPLE_ITEMS]
+    for group in example['hourly_forecasts_grouped']:
+        group['hourly_entries'] = group['hourly_entries'][:PROMPT_EXAMPLE_ITEMS]
+    return example
+
+
+def build_template_prompt(doc, url, extracted):
+    """Prompt induksi: HTML ringkas + contoh hasil ekstraksi LLM (dict UniversalOutputV27)."""
+    example = json.dumps(_examples(json.loads(json.dumps(extracted))), ensure_ascii=False, indent=1)
+    return TEMPLATE_PROMPT.format(url=url, example=example, html=compact_html(doc))
+
+
+# --- Penerapan template ---
+def _xpath(node, xpath):
+    """XPath '//...' dievaluasi di bawah node (pada root dokumen hasilnya sama dengan absolut)."""
+    return node.xpath(f".{xpath}" if xpath.startswith('//') else xpath)
+
+
+def _node_text(node, xpath, pattern=""):
+    if not xpath:
+        return "N/A"
+    result = _xpath(node, xpath)
+    if isinstance(result, list):
+        result = result[0] if result else ""
+    if isinstance(result, lxml.etree._Element):
+        result = " ".join(result.itertext())
+    text = " ".join(str(result).split())
+    if text and pattern:
+        match = re.search(pattern, text)
+        text = ((match.group(1) if match.groups() else match.group(0)) or "") if match else ""
+    return text or "N/A"
+
+
+def _nodes(node, xpath):
+    if not xpath:
+        return []
+    result = _xpath(node, xpath)
+    return [item for item in result if isinstance(item, lxml.etree._Element)] if isinstance(result, list) else []
+
+
+def _item_dict(item, list_template, field_names):
+    rules = {rule.field: rule for rule in list_template.fields}
+    return {name: _node_text(item, rules[name].xpath, rules[name].pattern) if name in rules else "N/A"
+            for name in field_names}
+
+
+DAILY_FIELDS = ('date_day', 'high_temp', 'low_temp', 'condition_summary', 'precipitation_chance', 'wind_speed')
+HOURLY_FIELDS = ('time_of_day', 'temp', 'condition', 'feels_like', 'wind')
+MONTHLY_FIELDS = ('date_month_day', 'day_temp', 'night_temp', 'condition_summary', 'precipitation_chance')
+
+
+def apply_template(template, doc, url):
+    """
+    Ekstrak halaman dengan template (dict berbentuk UniversalOutputV27).
+
+    Raises:
+        lxml.etree.XPathError / re.error: XPath atau pattern template tidak valid
+    """
+    root = doc.getroottree().getroot()
+    locations = []
+    blocks = _nodes(root, template.location_item_xpath) if template.location_item_xpath else [root]
+    for block in blocks:
+        daily = [_item_dict(item, template.daily, DAILY_FIELDS) for item in _nodes(block, template.daily.item_xpath)]
+        if daily:
+            locations.append({'location_name': _node_text(block, template.location_name_xpath),
+                              'daily_forecasts': daily})
+
+    groups = []
+    for group in _nodes(root, template.hourly_group.item_xpath):
+        entries = [_item_dict(item, template.hourly_entry, HOURLY_FIELDS)
+                   for item in _nodes(group, template.hourly_entry.item_xpath)]
+        if entries:
+            name = _item_dict(group, template.hourly_group, ('date_day_name',))['date_day_name']
+            groups.append({'date_day_name': name, 'hourly_entries': entries})
+
+    return {
+        'parent_location': _node_text(root, template.parent_location_xpath),
+        'source_url': url,
+        'forecast_period': _node_text(root, template.forecast_period_xpath),
+        'all_locations_forecast': locations,
+        'hourly_forecasts_grouped': groups,
+        'monthly_forecasts': [_item_dict(item, template.monthly, MONTHLY_FIELDS)
+                              for item in _nodes(root, template.monthly.item_xpath)],
+    }
+
+
+# --- Validasi terhadap ekstraksi LLM ---
+def _leaves(data):
+    """{(path...): nilai} untuk semua nilai prakiraan di dalam list (tanpa field tingkat atas)."""
+    leaves = {}
+
+    def walk(value, path):
+        if isinstance(value, dict):
+            for key, child in value.items():
+                walk(child, (*path, key))
+        elif isinstance(value, list):
+            for i, child in enumerate(value):
+                walk(child, (*path, i))
+        else:
+            leaves[path] = value
+
+    for name in LIST_FIELDS:
+        walk(data.get(name) or [], (name,))
+    return leaves
+
+
+def _comparable(value):
+    """Angka jika ada ('Feels Like 88°' ~ '88 °F'), selain itu kata-kata huruf kecil."""
+    text = str(value or "").strip()
+    if text.upper() in ("", "N/A", "NA", "-", "--"):
+        return ()
+    digits = _DIGITS_RE.findall(text)
+    return tuple(digits) if digits else tuple(_WORDS_RE.findall(text.casefold()))
+
+
+def agreement(expected, actual):
+    """Porsi nilai (0..1) yang sama antara hasil LLM dan hasil template, per posisi item."""
+    expected_leaves, actual_leaves = _leaves(expected), _leaves(actual)
+    total = max(len(expected_leaves), len(actual_leaves))
+    if not total:
+        return 0.0
+    same = sum(1 for path, value in expected_leaves.items()
+               if path in actual_leaves and _comparable(value) == _comparable(actual_leaves[path]))
+    return same / total
+
+
+def na_ratio(data):
+    leaves = _leaves(data)
+    return sum(1 for value in leaves.values() if not _comparable(value)) / len(leaves) if leaves else 1.0
+
+
+def non_empty_lists(data):
+    return [name for name in LIST_FIELDS if data.get(name)]
+
+
+def drift_reason(data, expected_lists):
+    """Alasan hasil template dianggap drift, atau None jika hasilnya layak dipakai."""
+    missing = [name for name in expected_lists if not data.get(name)]
+    if missing:
+        return f"list kosong: {', '.join(missing)}"
+    if na_ratio(data) > MAX_NA_RATIO:
+        return "terlalu banyak N/A"
+    return None
+
+
+class TemplateStore:
+    """
+    Template per fingerprint DOM, disimpan di file JSON.
+
+    Status entri: 'active' (dipakai), 'rejected' (induksi gagal validasi; dicoba lagi
+    sampai MAX_INDUCTION_ATTEMPTS, lalu setelah RETRY_REJECTED_AFTER_S). File dipakai bersama
+    proses worker lain: dibaca ulang jika berubah, disimpan dengan baca-gabung-tulis.
+    """
+
+    def __init__(self, path=TEMPLATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._inducing = set()
+        self._parsed = {}  # fingerprint -> (dict template, ExtractionTemplate) (hindari validasi ulang per halaman)
+        self._file = SharedJsonFile(path, indent=2, ensure_ascii=False) if path else None
+        self._refresh()
+
+    def _refresh(self):
+        if self._file is None or not self._file.changed():
+            return
+        try:
+            self._entries = self._file.load() or {}
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: {self.path} tidak terbaca ({e}), template dimulai dari kosong.")
+
+    @contextlib.contextmanager
+    def _updating(self):
+        with self._lock, (self._file.lock() if self._file else contextlib.nullcontext()):
+            self._refresh()
+            yield
+            if self._file is not None:
+                self._file.save(self._entries)
+
+    def template(self, fingerprint):
+        """ExtractionTemplate aktif untuk fingerprint, atau None."""
+        with self._lock:
+            self._refresh()
+            entry = self._entries.get(fingerprint)
+            if not entry or entry['status'] != 'active':
+                return None
+            cached = self._parsed.get(fingerprint)
+            if cached is None or cached[0] != entry['template']:
+                cached = self._parsed[fingerprint] = (entry['template'],
+                                                      ExtractionTemplate.model_validate(entry['template']))
+            return cached[1]
+
+    def expected_lists(self, fingerprint):
+        with self._lock:
+            self._refresh()
+            return self._entries.get(fingerprint, {}).get('lists', [])
+
+    def begin_induction(self, fingerprint):
+        """True jika fingerprint perlu (dan boleh) diinduksi sekarang; satu thread per fingerprint."""
+        with self._updating():
+            if fingerprint in self._inducing:
+                return False
+            entry = self._entries.get(fingerprint)
+            if entry and entry['status'] == 'active':
+                return False
+            if entry and entry['attempts'] >= MAX_INDUCTION_ATTEMPTS:
+                if time.time() - entry['updated_at'] < RETRY_REJECTED_AFTER_S:
+                    return False
+                entry['attempts'] = 0
+            self._inducing.add(fingerprint)
+            return True
+
+    def finish_induction(self, fingerprint, url, template, score, lists):
+        """Simpan hasil induksi: template aktif jika lolos validasi, selain itu 'rejected'."""
+        with self._updating():
+            self._inducing.discard(fingerprint)
+            previous = self._entries.get(fingerprint, {})
+            accepted = template is not None and score >= MIN_AGREEMENT
+            self._entries[fingerprint] = {
+                'status': 'active' if accepted else 'rejected',
+                'domain': (urlparse(url).hostname or "").lower(),
+                'sample_url': url,
+                'template': template.model_dump() if accepted else None,
+                'agreement': round(score, 3),
+                'lists': lists,
+                'attempts': 0 if accepted else previous.get('attempts', 0) + 1,
+                'uses': 0,
+                'failures': 0,
+                'created_at': previous.get('created_at', time.time()),
+                'updated_at': time.time(),
+            }
+            self._parsed.pop(fingerprint, None)
+            return accepted
+
+    def record_use(self, fingerprint):
+        """Catat pemakaian sukses. True jika pemakaian ini jatuh pada jadwal validasi ulang."""
+        with self._updating():
+            entry = self._entries.get(fingerprint)
+            if not entry or entry['status'] != 'active':
+                return False
+            entry['uses'] += 1
+            entry['failures'] = 0
+            entry['last_used'] = time.time()
+            return REVALIDATE_EVERY and entry['uses'] % REVALIDATE_EVERY == 0
+
+    def record_failure(self, fingerprint, reason):
+        """Template gagal pada halaman ini. True jika template dibuang (akan diinduksi ulang)."""
+        with self._updating():
+            entry = self._entries.get(fingerprint)
+            if not entry or entry['status'] != 'active':
+                return False
+            entry['failures'] += 1
+            entry['last_failure'] = reason
+            dropped = entry['failures'] >= MAX_TEMPLATE_FAILURES or reason == 'revalidation'
+            if dropped:
+                entry.update(status='rejected', template=None, attempts=0, updated_at=time.time())
+                self._parsed.pop(fingerprint, None)
+            return dropped
+
+    def stats(self):
+        with self._lock:
+            self._refresh()
+            active = [e for e in self._entries.values() if e['status'] == 'active']
+            return {
+                'layouts': len(self._entries),
+                'active': len(active),
+                'rejected': len(self._entries) - len(active),
+                'uses': sum(e['uses'] for e in active),
+            }
+
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_template_store(path=TEMPLATE_FILE):
+    """Satu TemplateStore per file, dipakai bersama semua scraper dalam proses yang sama."""
+    with _STORES_LOCK:
+        if path not in _STORES:
+            _STORES[path] = TemplateStore(path)
+        return _STORES[path]
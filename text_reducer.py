@@ -0,0 +1,166 @@
+# text_reducer.py (V27)
+# Reduksi teks halaman sebelum dikirim ke Gemini: ambil area prakiraan,
+# buang boilerplate (navbar, footer, cookie banner), dedupe baris berulang,
+# dan potong sesuai anggaran token.
+
+import re
+
+DEFAULT_TOKEN_BUDGET = 8000
+# Mode chunk: teks di atas ambang ini dipecah, tiap chunk maksimal DEFAULT_CHUNK_TOKENS
+DEFAULT_CHUNK_THRESHOLD_TOKENS = 4000
+DEFAULT_CHUNK_TOKENS = 2500
+# Area prakiraan di bawah ukuran ini dianggap tidak lengkap -> pakai seluruh body
+MIN_REGION_CHARS = 500
+# Baris pendek (angka suhu, "Cloudy", dll.) boleh berulang; hanya baris panjang yang di-dedupe
+DEDUPE_MIN_LINE_CHARS = 40
+BOILERPLATE_MAX_LINE_CHARS = 200
+
+BOILERPLATE_RE = re.compile(
+    r"cookie|privacy|privasi|terms of (use|service)|syarat( dan|&) ketentuan|hak cipta|copyright|©|"
+    r"all rights reserved|advertisement|\biklan\b|sign in|log ?in\b|masuk akun|subscribe|berlangganan|"
+    r"newsletter|download (the )?app|unduh aplikasi|follow us|ikuti kami|skip to (main )?content|"
+    r"accept all|terima semua|manage preferences|feedback|umpan balik|careers|karir|"
+    r"facebook|twitter|instagram|youtube|tiktok|linkedin",
+    re.IGNORECASE,
+)
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+# Baris yang menandai awal blok tanggal/hari -> titik potong chunk yang aman
+_DAY_NAMES = (
+    r"mon|tue|wed|thu|fri|sat|sun|monday|tuesday|wednesday|thursday|friday|saturday|sunday|"
+    r"sen|sel|rab|kam|jum|sab|min|senin|selasa|rabu|kamis|jumat|sabtu|minggu|today|tonight|hari ini"
+)
+_MONTH_NAMES = r"jan|feb|mar|apr|mei|may|jun|jul|agu|aug|sep|okt|oct|nov|des|dec"
+ANCHOR_RE = re.compile(
+    rf"^(?:(?:{_DAY_NAMES})\b[,.]?(?:\s+\d{{1,2}})?|(?:{_MONTH_NAMES})[a-z]*\.?\s+\d{{1,2}}|\d{{1,2}}\s+(?:{_MONTH_NAMES})[a-z]*)\b",
+    re.IGNORECASE,
+)
+# Token tanggal/hari/jam di mana saja dalam teks ("Sel", "02 Des", "2025-12-02", "02/12", "5 pm", "07:00")
+DATE_TOKEN_RE = re.compile(
+    rf"\b(?:{_DAY_NAMES}|(?:{_MONTH_NAMES})[a-z]*)\b|\b\d{{4}}-\d{{2}}-\d{{2}}\b|\b\d{{1,2}}/\d{{1,2}}\b|"
+    r"\b\d{1,2}(?::\d{2})?\s*(?:am|pm)\b|\b\d{1,2}[:.]\d{2}\b",
+    re.IGNORECASE,
+)
+# Suhu dengan satuan derajat ("31°C", "24 °", "30℃")
+TEMPERATURE_RE = re.compile(r"-?\d{1,2}(?:[.,]\d)?\s*(?:°|º|℃|℉)")
+
+
+def estimate_tokens(text):
+    """
+    Estimasi jumlah token lokal (tanpa memanggil API).
+
+    Teks cuaca padat angka dan simbol (°, %, km/h) sehingga rasio 4 karakter/token
+    terlalu optimis; diambil nilai terbesar dari jumlah potongan kata/simbol dan len/4.
+    """
+    if not text:
+        return 0
+    return max(len(_TOKEN_RE.findall(text)), (len(text) + 3) // 4)
+
+
+def _is_boilerplate(line):
+    return len(line) <= BOILERPLATE_MAX_LINE_CHARS and BOILERPLATE_RE.search(line) is not None
+
+
+def reduce_page_text(region_texts, body_text, token_budget=DEFAULT_TOKEN_BUDGET):
+    """
+    Kecilkan teks halaman untuk prompt Gemini.
+
+    Args:
+        region_texts: inner_text dari elemen yang cocok dengan COMBINED_SELECTOR
+        body_text: inner_text dari <body> (fallback jika area prakiraan tidak ditemukan)
+        token_budget: batas token hasil (None = tanpa batas)
+
+    Returns:
+        tuple: (teks hasil reduksi dengan baris dipertahankan, jumlah region yang dipakai)
+    """
+    # Elemen bisa bersarang (MonthlyContent berisi table-responsive) -> buang region duplikat
+    regions = []
+    for text in sorted((t for t in region_texts if t and t.strip()), key=len, reverse=True):
+        if not any(text in kept for kept in regions):
+            regions.append(text)
+
+    if sum(len(t) for t in regions) >= MIN_REGION_CHARS:
+        source = "\n".join(regions)
+    else:
+        regions = []
+        source = body_text or ""
+
+    lines = []
+    seen = set()
+    used_tokens = 0
+    for line in source.split("\n"):
+        line = " ".join(line.split())
+        if not line or _is_boilerplate(line):
+            continue
+        if len(line) >= DEDUPE_MIN_LINE_CHARS:
+            if line in seen:
+                continue
+            seen.add(line)
+
+        line_tokens = estimate_tokens(line) + 1  # +1 untuk pemisah baris
+        if token_budget is not None and used_tokens + line_tokens > token_budget:
+            break
+        used_tokens += line_tokens
+        lines.append(line)
+
+    return "\n".join(lines), len(regions)
+
+
+def truncate_to_budget(text, token_budget):
+    """Potong teks (per baris) agar muat dalam token_budget (None = tanpa batas)."""
+    if token_budget is None or estimate_tokens(text) <= token_budget:
+        return text
+    lines = []
+    used_tokens = 0
+    for line in text.split("\n"):
+        line_tokens = estimate_tokens(line) + 1
+        if used_tokens + line_tokens > token_budget:
+            break
+        used_tokens += line_tokens
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def split_into_chunks(text, max_tokens=DEFAULT_CHUNK_TOKENS, header_lines=2):
+    """
+    Pecah teks hasil reduksi menjadi chunk yang selaras dengan blok tanggal/hari.
+
+    Potongan dilakukan pada baris anchor (e.g., "Sel, 02 Des", "Thursday", "Dec 1")
+    terakhir di dalam chunk agar satu hari tidak terbelah. Beberapa baris pertama
+    halaman (judul/lokasi) disisipkan di setiap chunk sebagai konteks parent_location.
+
+    Returns:
+        list[str]: teks tiap chunk (baris dipertahankan)
+    """
+    lines = [line for line in text.split("\n") if line.strip()]
+    header = lines[:header_lines]
+    body = lines[header_lines:]
+    header_tokens = sum(estimate_tokens(line) + 1 for line in header)
+    budget = max(max_tokens - header_tokens, 1)
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    last_anchor = None  # indeks anchor terakhir di dalam current
+
+    for line in body:
+        line_tokens = estimate_tokens(line) + 1
+        if current and current_tokens + line_tokens > budget:
+            # Potong di anchor terakhir jika chunk tidak menjadi terlalu kecil
+            if last_anchor and last_anchor >= len(current) // 2:
+                chunks.append(current[:last_anchor])
+                current = current[last_anchor:]
+            else:
+                chunks.append(current)
+                current = []
+            current_tokens = sum(estimate_tokens(l) + 1 for l in current)
+            last_anchor = None
+        if ANCHOR_RE.match(line):
+            last_anchor = len(current)
+        current.append(line)
+        current_tokens += line_tokens
+
+    if current:
+        chunks.append(current)
+    return ["\n".join(header + chunk) for chunk in chunks] or ["\n".join(header)]
@@ -0,0 +1,315 @@
+# worker_farm.py (V27)
+# Mode worker multi-proses: coordinator mengisi antrian job SQLite (job_queue.py),
+# N proses worker masing-masing memegang browser Chromium hangat sendiri, me-lease job,
+# menjaga lease dengan heartbeat, dan menyimpan hasilnya. Worker yang crash atau macet
+# (lease kedaluwarsa) dibunuh dan diganti; job-nya kembali ke antrian untuk dicoba lagi.
+# Memori dijaga resource_guard: worker yang RSS-nya melewati batas setelah job berhenti dan
+# diganti, Chromium yang terlalu besar dibunuh, dan worker (beserta Chromium-nya) yang
+# melewati batas keras di tengah job dibunuh coordinator.
+#
+#   python worker_farm.py enqueue --targets targets.json   # isi antrian dari daftar target
+#   python worker_farm.py run --workers 4 --drain          # proses sampai antrian kosong
+#   python worker_farm.py stats
+
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+
+from job_queue import JobQueue, DEFAULT_QUEUE_FILE, DEFAULT_MAX_ATTEMPTS
+from resource_guard import (MemoryGovernor, rss_mb, children_mb, warn_unenforced, DEFAULT_MAX_RSS_MB,
+                            DEFAULT_MAX_BROWSER_MB)
+
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+JOB_TIMEOUT_S = 15 * 60          # batas keras satu job; setelah ini heartbeat berhenti
+HEARTBEAT_INTERVAL_S = 30
+LEASE_S = 3 * HEARTBEAT_INTERVAL_S  # worker yang mati terdeteksi paling lambat dalam LEASE_S
+POLL_INTERVAL_S = 5              # jeda worker saat antrian kosong
+MONITOR_INTERVAL_S = 5           # jeda pemeriksaan coordinator
+PAGES_PER_BROWSER = 50           # browser hangat didaur ulang setelah N halaman
+SHUTDOWN_TIMEOUT_S = 60
+MAX_WORKER_MB = 3 * 1024         # batas keras RSS worker + proses anaknya; di atas ini dibunuh di tengah job
+
+
+def enqueue_target(target, queue_path=DEFAULT_QUEUE_FILE):
+    """Dorong semua URL sebuah ScheduledTarget ke antrian (dipakai scheduler.py --queue)."""
+    queue = JobQueue(queue_path)
+    try:
+        options = {'batch_mode': True} if target.batch_mode else None
+        ids = queue.enqueue_many(
+            [(url, target.name, target.priority, options) for url in (target.urls or [target.url])]
+        )
+    finally:
+        queue.close()
+    added = sum(1 for job_id in ids if job_id is not None)
+    print(f"[farm] {target.name}: {added} job masuk antrian ({len(ids) - added} sudah antre).")
+    return True
+
+
+class _Heartbeat(threading.Thread):
+    """Perpanjang lease job selama dikerjakan, maksimal sampai job_timeout_s sejak mulai."""
+
+    def __init__(self, queue, job, job_timeout_s):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.job = job
+        self.deadline = time.monotonic() + job_timeout_s
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(HEARTBEAT_INTERVAL_S):
+            if time.monotonic() > self.deadline:
+                print(f"[farm] {self.job.url}: melewati batas waktu job, lease dibiarkan kedaluwarsa.")
+                return
+            if not self.queue.heartbeat(self.job, LEASE_S):
+                return
+
+    def stop(self):
+        self._done.set()
+
+
+def _run_job(queue, job, browser, job_timeout_s, workers=1):
+    from dynamic_scrapper import UniversalScraperV27, AIScraperContext
+
+    heartbeat = _Heartbeat(queue, job, job_timeout_s)
+    heartbeat.start()
+    try:
+        context = AIScraperContext(target_url=job.url)
+        context.gemini_batch_mode = job.options.get('batch_mode', False)
+        # Batch job + fallback online harus selesai sebelum batas waktu job
+        context.gemini_batch_timeout_s = min(context.gemini_batch_timeout_s, job_timeout_s // 2)
+        # Tiap worker punya broker (token bucket) sendiri: kuota Gemini dibagi rata antar worker
+        context.gemini_rpm = max(1, context.gemini_rpm // workers)
+        context.gemini_tpm = max(1, context.gemini_tpm // workers)
+        context.return_models = True
+        scraper = UniversalScraperV27(context)
+        data = scraper.scrape_url(job.url, browser)
+        if data:
+            scraper.save_results(data, tag=scraper.url_tag(job.url), url=job.url)
+            queue.complete(job, {'records': len(data)})
+            print(f"[farm] ✅ {job.url}: data tersimpan.")
+        elif job.url in scraper.not_modified_urls:
+            queue.complete(job, {'records': 0, 'not_modified': True})
+            print(f"[farm] ✅ {job.url}: tidak berubah (304).")
+        else:
+            # Domain dalam cool-down: coba lagi setelah circuit dibuka, bukan setelah backoff biasa
+            retry_at = scraper.health.blocked_until(job.url) if scraper.health else None
+            status = queue.fail(job, "tidak ada data yang valid", retry_at)
+            print(f"[farm] ⚠️ {job.url}: tidak ada data yang valid (percobaan {job.attempts}, status {status}).")
+    except Exception as e:
+        status = queue.fail(job, f"{type(e).__name__}: {e}")
+        print(f"[farm] ❌ {job.url}: {e} (percobaan {job.attempts}, status {status}).")
+    finally:
+        heartbeat.stop()
+
+
+def worker_main(name, queue_path, job_timeout_s, max_attempts, stop_event,
+                max_rss_mb=DEFAULT_MAX_RSS_MB, max_browser_mb=DEFAULT_MAX_BROWSER_MB, workers=1):
+    """
+    Loop satu proses worker: satu browser hangat, lease -> scrape -> simpan -> complete/fail.
+    Worker berhenti sendiri (lalu diganti coordinator) jika RSS-nya > max_rss_mb setelah job.
+    Batas rpm/tpm Gemini worker ini = kuota total / workers.
+    """
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()  # grup proses sendiri: coordinator bisa membunuh worker beserta Chromium-nya
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C ditangani coordinator lewat stop_event
+
+    from playwright.sync_api import sync_playwright
+    from dynamic_scrapper import BROWSER_ARGS
+
+    owner = f"{name}:{os.getpid()}"
+    queue = JobQueue(queue_path, max_attempts=max_attempts)
+    governor = MemoryGovernor(max_rss_mb, max_browser_mb)
+    print(f"[farm] {owner} siap.")
+    with sync_playwright() as p:
+        browser, pages = None, 0
+        try:
+            while not stop_event.is_set():
+                job = queue.lease(owner, LEASE_S, reclaim=False)  # lease kedaluwarsa diurus coordinator
+                if job is None:
+                    stop_event.wait(POLL_INTERVAL_S)
+                    continue
+                if browser is None or not browser.is_connected() or pages >= PAGES_PER_BROWSER:
+                    if browser is not None:
+                        browser.close()
+                    start = time.perf_counter()
+                    browser = p.chromium.launch(headless=True, channel="chrome", args=BROWSER_ARGS)
+                    pages = 0
+                    print(f"[farm] {owner}: browser siap dalam {time.perf_counter() - start:.2f}s.")
+                print(f"[farm] {owner}: {job}")
+                with governor.job(job.url) as usage:
+                    _run_job(queue, job, browser, job_timeout_s, workers)
+                pages += 1
+                print(f"[farm] {owner}: RSS {usage.end_rss_mb:.0f} MB ({usage.growth_mb:+.1f} MB), "
+                      f"proses anak puncak {usage.peak_children_mb:.0f} MB.")
+                if governor.restart_needed():
+                    print(f"[farm] {owner}: RSS melewati {max_rss_mb} MB, worker berhenti untuk diganti.")
+                    break
+        finally:
+            if browser is not None:
+                browser.close()
+            queue.close()
+    print(f"[farm] {owner} berhenti.")
+
+
+class WorkerFarm:
+    """
+    Coordinator: menjalankan N proses worker, mengganti worker yang mati, dan membunuh
+    worker yang macet (lease job-nya kedaluwarsa). Job milik worker tersebut dikembalikan
+    ke antrian sehingga run tetap berlanjut.
+    """
+
+    def __init__(self, queue_path=DEFAULT_QUEUE_FILE, workers=DEFAULT_WORKERS, job_timeout_s=JOB_TIMEOUT_S,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, drain=False, max_rss_mb=DEFAULT_MAX_RSS_MB,
+                 max_browser_mb=DEFAULT_MAX_BROWSER_MB, max_worker_mb=MAX_WORKER_MB):
+        self.queue_path = queue_path
+        self.workers = max(1, int(workers))
+        self.job_timeout_s = job_timeout_s
+        self.max_attempts = max_attempts
+        self.drain = drain
+        self.max_rss_mb = max_rss_mb
+        self.max_browser_mb = max_browser_mb
+        self.max_worker_mb = max_worker_mb
+        self._mp = multiprocessing.get_context('spawn')
+        self._stop_event = self._mp.Event()
+        self._processes = {}  # nama worker -> Process
+        self.restarts = 0
+
+    def stop(self, *args):
+        self._stop_event.set()
+
+    def _spawn(self, name):
+        process = self._mp.Process(target=worker_main, name=name,
+                                   args=(name, self.queue_path, self.job_timeout_s, self.max_attempts,
+                                         self._stop_event, self.max_rss_mb, self.max_browser_mb, self.workers))
+        process.start()
+        self._processes[name] = process
+
+    def _kill(self, process):
+        try:
+            if hasattr(os, 'killpg'):
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except (ProcessLookupError, PermissionError):
+            pass
+        process.join(5)
+
+    def _check_workers(self, queue):
+        # Worker macet: lease kedaluwarsa tapi prosesnya masih hidup
+        owners = {f"{name}:{process.pid}": process for name, process in self._processes.items()}
+        for job_id, owner in queue.expired_leases():
+            process = owners.get(owner)
+            if process is not None and process.is_alive():
+                print(f"[farm] {owner} macet pada job {job_id} (lease kedaluwarsa). Worker dibunuh.")
+                self._kill(process)
+
+        # Worker (beserta Chromium-nya) melewati batas keras memori: dibunuh, job-nya dicoba lagi
+        if self.max_worker_mb:
+            for name, process in self._processes.items():
+                if not process.is_alive():
+                    continue
+                used = rss_mb(process.pid) + children_mb(process.pid)
+                if used > self.max_worker_mb:
+                    print(f"[farm] {name} memakai {used:.0f} MB (> {self.max_worker_mb} MB). Worker dibunuh.")
+                    self._kill(process)
+
+        # Worker mati/crash: kembalikan job-nya dan ganti dengan proses baru
+        for name, process in list(self._processes.items()):
+            if process.is_alive():
+                continue
+            released = queue.release_owner(f"{name}:{process.pid}", f"worker {name} berhenti (exit {process.exitcode})")
+            if self._stop_event.is_set():
+                continue
+            print(f"[farm] {name} berhenti (exit {process.exitcode}), {len(released)} job dikembalikan. Memulai ulang.")
+            self.restarts += 1
+            self._spawn(name)
+
+        # Lease kedaluwarsa milik owner yang bukan worker hidup farm ini (e.g. sisa run sebelumnya)
+        for job_id, _, owner in queue.reclaim_expired():
+            print(f"[farm] Lease job {job_id} milik {owner} kedaluwarsa, dikembalikan ke antrian.")
+
+    def run(self):
+        queue = JobQueue(self.queue_path, max_attempts=self.max_attempts)
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self.stop)
+
+        print(f"--- Worker farm: {self.workers} worker, antrian {self.queue_path} {queue.stats()} ---")
+        for i in range(self.workers):
+            self._spawn(f"worker-{i + 1}")
+        try:
+            while not self._stop_event.wait(MONITOR_INTERVAL_S):
+                self._check_workers(queue)
+                if self.drain and not queue.pending():
+                    print("[farm] Antrian kosong, selesai.")
+                    break
+        finally:
+            self._stop_event.set()
+            deadline = time.monotonic() + SHUTDOWN_TIMEOUT_S
+            for name, process in self._processes.items():
+                process.join(max(0.0, deadline - time.monotonic()))
+                if process.is_alive():
+                    print(f"[farm] {name} belum berhenti setelah {SHUTDOWN_TIMEOUT_S}s, dihentikan paksa.")
+                    self._kill(process)
+                queue.release_owner(f"{name}:{process.pid}", f"worker {name} dihentikan")
+            stats = queue.stats()
+            queue.close()
+        print(f"[farm] Selesai. Status antrian: {stats}, worker dimulai ulang: {self.restarts}.")
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker farm multi-proses untuk UniversalScraperV27")
+    parser.add_argument('--queue', default=DEFAULT_QUEUE_FILE, help="file antrian SQLite")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    enqueue = commands.add_parser('enqueue', help="isi antrian")
+    enqueue.add_argument('--targets', help="file target (format targets.json)")
+    enqueue.add_argument('--url', action='append', default=[], help="URL tambahan (boleh berulang)")
+    enqueue.add_argument('--profile', help="label profil situs untuk --url")
+    enqueue.add_argument('--priority', type=int, default=0, help="prioritas untuk --url (besar = duluan)")
+
+    run = commands.add_parser('run', help="jalankan worker")
+    run.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    run.add_argument('--job-timeout', type=int, default=JOB_TIMEOUT_S, help="batas waktu per job (detik)")
+    run.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS)
+    run.add_argument('--drain', action='store_true', help="berhenti saat antrian kosong")
+    run.add_argument('--max-rss-mb', type=int, default=DEFAULT_MAX_RSS_MB,
+                     help="RSS worker maksimum setelah job; di atas ini worker diganti (0 = nonaktif)")
+    run.add_argument('--max-browser-mb', type=int, default=DEFAULT_MAX_BROWSER_MB,
+                     help="memori maksimum satu Chromium; di atas ini browser dibunuh (0 = nonaktif)")
+    run.add_argument('--max-worker-mb', type=int, default=MAX_WORKER_MB,
+                     help="batas keras worker + proses anak; di atas ini worker dibunuh di tengah job (0 = nonaktif)")
+
+    commands.add_parser('stats', help="status antrian")
+    args = parser.parse_args()
+
+    if args.command == 'enqueue':
+        if args.targets:
+            from scheduler import load_targets
+            targets, _ = load_targets(args.targets)
+            for target in targets:
+                enqueue_target(target, args.queue)
+        if args.url:
+            queue = JobQueue(args.queue)
+            ids = queue.enqueue_many([(url, args.profile, args.priority, None) for url in args.url])
+            queue.close()
+            print(f"[farm] {sum(1 for i in ids if i is not None)} URL masuk antrian.")
+    elif args.command == 'run':
+        if "GEMINI_API_KEY" not in os.environ:
+            print("❌ ERROR: GEMINI_API_KEY tidak ditemukan di environment variable.")
+            sys.exit(1)
+        warn_unenforced(max_browser_mb=args.max_browser_mb, max_children_mb=args.max_worker_mb)
+        WorkerFarm(args.queue, args.workers, args.job_timeout, args.max_attempts, args.drain,
+                   args.max_rss_mb, args.max_browser_mb, args.max_worker_mb).run()
+
+    queue = JobQueue(args.queue)
+    print(f"Status antrian {args.queue}: {queue.stats()}")
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()